@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# Benchmark for the AST node classes: parses a generated program of 100k
+# lines with the nodes plox/generate_ast.py emits, and with the frozen
+# dataclasses it used to emit (rebuilt below from the same fields), then
+# reports the parse time and the memory the nodes take.
+#
+# Run with: python3 -m benchmarks.ast_nodes [lines] [repeats]
+
+import sys
+import timeit
+import tracemalloc
+from abc import ABC
+from dataclasses import dataclass, make_dataclass, field
+
+import plox.parser
+import plox.expr
+import plox.stmt
+from plox.parser import Parser
+from plox.scanner import RegexScanner
+
+CHUNK = """fun f%(i)d(a, b) {
+  var s = a * 2 + b / (a - %(i)d);
+  if (s > 10 and b != nil) s = -s; else s = s + 1;
+  while (s < 100) s = s * 2;
+  return s + f%(i)d(b, a);
+}
+print f%(i)d(1, 2) + "x";
+var l%(i)d = fun (x) { return x or false; };
+"""
+
+def generate(lines: int) -> str:
+    per_chunk = CHUNK.count("\n")
+    return "".join(CHUNK % {"i": i} for i in range(lines // per_chunk))
+
+def dataclass_nodes() -> dict[str, type]:
+    """The node classes as frozen dataclasses, by name."""
+    classes: dict[str, type] = {}
+    for module in (plox.expr, plox.stmt):
+        base_name = module.__name__.rsplit(".", 1)[1].capitalize()
+        base = dataclass(eq=False, frozen=True)(type(base_name, (ABC,), {}))
+        classes[base_name] = base
+
+        for name, node in vars(module).items():
+            if isinstance(node, type) and node.__bases__ == (getattr(module, base_name),):
+                defaults = node.__init__.__defaults__ or ()
+                required = len(node.__slots__) - len(defaults)
+                fields = [(slot, object) if i < required else
+                          (slot, object, field(default=defaults[i - required]))
+                          for i, slot in enumerate(node.__slots__)]
+                classes[name] = make_dataclass(name, fields, bases=(base,),
+                                               eq=False, frozen=True)
+    return classes
+
+def parse(tokens, nodes: dict[str, type] | None = None) -> list:
+    if nodes is None:
+        return Parser(tokens).parse()
+
+    saved = {name: vars(plox.parser)[name] for name in nodes}
+    vars(plox.parser).update(nodes)
+    try:
+        return Parser(tokens).parse()
+    finally:
+        vars(plox.parser).update(saved)
+
+def walk(node, node_types: tuple[type, ...]):
+    if isinstance(node, list):
+        for child in node:
+            yield from walk(child, node_types)
+    elif isinstance(node, node_types):
+        yield node
+        for name in getattr(node, "__dataclass_fields__", None) or node.__slots__:
+            yield from walk(getattr(node, name), node_types)
+
+def node_size(node) -> int:
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+def measure(tokens, nodes: dict[str, type] | None) -> tuple[int, int, int]:
+    """Returns the node count, the bytes the nodes take and the bytes
+    allocated by a parse."""
+    tracemalloc.start()
+    statements = parse(tokens, nodes)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    node_types = (nodes["Expr"], nodes["Stmt"]) if nodes else (plox.expr.Expr, plox.stmt.Stmt)
+    all_nodes = list(walk(statements, node_types))
+    return len(all_nodes), sum(map(node_size, all_nodes)), allocated
+
+def main(argv: list):
+    lines = int(argv[0]) if len(argv) > 0 else 100_000
+    repeats = int(argv[1]) if len(argv) > 1 else 3
+
+    source = generate(lines)
+    tokens = RegexScanner(source).scan_array()
+    before = dataclass_nodes()
+    assert repr(parse(tokens, before)) == repr(parse(tokens))
+
+    variants = [("before (dataclasses)", before), ("after (__slots__)", None)]
+    # Taking turns, so that both see the same noise
+    timings: dict[str, list[float]] = {name: [] for name, _ in variants}
+    for _ in range(repeats):
+        for name, nodes in variants:
+            timings[name] += timeit.repeat(lambda: parse(tokens, nodes), number=1, repeat=1)
+
+    print(f"{source.count(chr(10))} lines, {len(tokens)} tokens, best of {repeats}")
+    for name, nodes in variants:
+        seconds = min(timings[name])
+        count, size, allocated = measure(tokens, nodes)
+        print(f"{name + ':':22} parse {seconds:6.3f}s  {count} nodes  "
+              f"{size / count:5.1f} bytes/node  {allocated / 2**20:6.1f} MB allocated")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+# Microbenchmark for @visitor dispatch: the cost of getting from visit(node)
+# to the right handler, with handlers that do nothing.
+#
+# "before" is the original scheme (qualified-name string built on every call,
+# then a (class name, type) lookup), "after" is the per-class table from
+# plox.visitor.
+#
+# Run with: python3 -m benchmarks.dispatch [nodes] [repeats]
+
+import sys
+import timeit
+
+from plox.visitor import visitor
+from plox.token import Token, TokenType
+from plox.expr import *
+from plox.stmt import *
+
+# The original implementation, kept here for comparison
+
+def _qualname(obj):
+    return obj.__module__ + '.' + obj.__qualname__
+
+def _declaring_class(obj):
+    name = _qualname(obj)
+    return name[:name.rfind('.')]
+
+_methods = {}
+
+def _visitor_impl(self, arg):
+    method = _methods[(_qualname(type(self)), type(arg))]
+    return method(self, arg)
+
+def legacy_visitor(arg_type):
+    def decorator(fn):
+        _methods[(_declaring_class(fn), arg_type)] = fn
+        return _visitor_impl
+    return decorator
+
+class Before:
+    @legacy_visitor(Literal)
+    def visit(self, expr): pass
+
+    @legacy_visitor(Variable)
+    def visit(self, expr): pass
+
+    @legacy_visitor(Binary)
+    def visit(self, expr): pass
+
+    @legacy_visitor(Unary)
+    def visit(self, expr): pass
+
+    @legacy_visitor(Grouping)
+    def visit(self, expr): pass
+
+    @legacy_visitor(Expression)
+    def visit(self, stmt): pass
+
+class After:
+    @visitor(Literal)
+    def visit(self, expr): pass
+
+    @visitor(Variable)
+    def visit(self, expr): pass
+
+    @visitor(Binary)
+    def visit(self, expr): pass
+
+    @visitor(Unary)
+    def visit(self, expr): pass
+
+    @visitor(Grouping)
+    def visit(self, expr): pass
+
+    @visitor(Expression)
+    def visit(self, stmt): pass
+
+def make_nodes(count: int) -> list:
+    name = Token(TokenType.IDENTIFIER, "x", None, 1)
+    plus = Token(TokenType.PLUS, "+", None, 1)
+    minus = Token(TokenType.MINUS, "-", None, 1)
+    literal = Literal(1.0)
+    samples = [
+        literal,
+        Variable(name),
+        Binary(literal, plus, literal),
+        Unary(minus, literal),
+        Grouping(literal),
+        Expression(literal),
+    ]
+    return [samples[i % len(samples)] for i in range(count)]
+
+def measure(visitor_class, nodes: list, repeats: int) -> float:
+    """Best time per visit, in nanoseconds."""
+    visit = visitor_class().visit
+
+    def run():
+        for node in nodes:
+            visit(node)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeats))
+    return best / len(nodes) * 1e9
+
+def main(argv: list):
+    count = int(argv[0]) if len(argv) > 0 else 600_000
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    nodes = make_nodes(count)
+
+    before = measure(Before, nodes, repeats)
+    after = measure(After, nodes, repeats)
+
+    print(f"{count} nodes, best of {repeats}")
+    print(f"before: {before:6.1f} ns/visit")
+    print(f"after:  {after:6.1f} ns/visit")
+    print(f"speedup: {before / after:.2f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
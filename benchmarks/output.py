@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Benchmark for the Output sink: a script printing lots of lines, with its
+# output buffered (Output as it is) and with the print() call per line it
+# replaced, reimplemented below as an Output subclass. Printed to a file, as
+# in 'plox script.lox > file', and to a StringIO, as in the tests.
+#
+# Run with: python3 -m benchmarks.output [lines] [engine]
+
+import sys
+import io
+import os
+import contextlib
+import tempfile
+import time
+
+from plox.plox import Plox
+from plox.output import Output
+
+SOURCE = """
+for (var i = 0; i < %(lines)d; i = i + 1) print i;
+"""
+
+class PrintOutput(Output):
+    # What every engine did before
+    print = staticmethod(print)
+
+def run(source: str, engine: str, output: Output, stdout) -> float:
+    plox = Plox(engine=engine, output=output)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stdout):
+        plox.run(source)
+    return time.perf_counter() - start
+
+def to_file(source: str, engine: str, output: Output) -> tuple[float, int]:
+    with tempfile.TemporaryFile("w+") as f:
+        seconds = run(source, engine, output, f)
+        f.flush()
+        return seconds, os.fstat(f.fileno()).st_size
+
+def to_string(source: str, engine: str, output: Output) -> tuple[float, int]:
+    f = io.StringIO()
+    return run(source, engine, output, f), len(f.getvalue())
+
+def main(argv: list):
+    lines = int(argv[0]) if len(argv) > 0 else 10_000_000
+    engine = argv[1] if len(argv) > 1 else "python"
+    source = SOURCE % {"lines": lines}
+
+    print(f"{lines:,} lines on the {engine} engine")
+    for name, target in [("file", to_file), ("StringIO", to_string)]:
+        before, before_size = target(source, engine, PrintOutput())
+        after, after_size = target(source, engine, Output())
+        assert before_size == after_size
+
+        print(f"to a {name}:")
+        print(f"  before (print() per line): {before:7.3f}s {lines / before:12,.0f} lines/s")
+        print(f"  after (Output):            {after:7.3f}s {lines / after:12,.0f} lines/s")
+        print(f"  speedup: {before / after:.2f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+# Benchmark for the expression parser: parses an expression-heavy generated
+# program with the operator-precedence automaton (Parser as it is) and with
+# the recursive descent it replaced, one method per precedence level,
+# reimplemented below as a Parser subclass.
+#
+# Run with: python3 -m benchmarks.parser [lines] [repeats]
+
+import sys
+import timeit
+
+from plox.parser import Parser
+from plox.error import error
+from plox.scanner import RegexScanner
+from plox.token import Token, TokenType
+from plox.expr import *
+
+globals().update(TokenType.__members__)
+
+LINES = [
+    "var a%(i)d = (%(i)d + 2) * 3 - 4 / 5 < 6 == !false or nil and -7;",
+    "a%(i)d = f(a%(i)d, 1 + 2 * 3, g(x)(y)) - -a%(i)d * (b + c) / d;",
+    "print %(i)d >= 1 and 2 <= 3 or \"s\" + \"t\" != \"u\";",
+    "x = y = z = a%(i)d * a%(i)d + b * b - c * c;",
+]
+
+def generate(lines: int) -> str:
+    return "\n".join(LINES[i % len(LINES)] % {"i": i} for i in range(lines)) + "\n"
+
+# The original, recursive descent implementation
+
+class DescentParser(Parser):
+    def parse_expression(self, pending=None):
+        self.values.append(self.assignment())
+
+    def expression(self) -> Expr:
+        return self.assignment()
+
+    def assignment(self) -> Expr:
+        expr: Expr = self.or_expression()
+
+        if self.match(EQUAL):
+            equals: Token = self.previous()
+            value: Expr = self.assignment()
+
+            if isinstance(expr, Variable):
+                name = expr.name
+                return Assign(name, value)
+
+            error(equals, "Invalid assignment target.")
+
+        return expr
+
+    def or_expression(self) -> Expr:
+        expr: Expr = self.and_expression()
+
+        while self.match(OR):
+            operator: Token = self.previous()
+            right: Expr = self.and_expression()
+            expr = Logical(expr, operator, right)
+
+        return expr
+
+    def and_expression(self) -> Expr:
+        expr: Expr = self.equality()
+
+        while self.match(AND):
+            operator: Token = self.previous()
+            right: Expr = self.equality()
+            expr = Logical(expr, operator, right)
+
+        return expr
+
+    # TODO: Re-activate and implement this in Interpreter
+    def ternary(self) -> Expr:
+        expr : Expr = self.equality()
+
+        # If the next operator is a question mark
+        while self.match(QUESTION_MARK):
+            operator: Token = self.previous()
+            condition : Expr = self.expression()
+            if self.match(COLON):
+                right : Expr = self.ternary()
+                expr = Ternary(operator, expr, condition, right)
+            else:
+                raise self.error(self.peek(), "Expected colon in ternary expression.")
+        return expr
+
+    def equality(self) -> Expr:
+        expr : Expr = self.comparison()
+
+        while self.match(BANG_EQUAL, EQUAL_EQUAL):
+            operator : Token = self.previous()
+            right: Expr = self.comparison()
+            expr = Binary(expr, operator, right)
+
+        return expr
+
+    def comparison(self) -> Expr:
+        expr : Expr = self.term()
+
+        while self.match(GREATER, GREATER_EQUAL, LESS, LESS_EQUAL):
+            operator : Token = self.previous()
+            right : Expr = self.term()
+            expr = Binary(expr, operator, right)
+
+        return expr
+
+    def term(self) -> Expr:
+        expr : Expr = self.factor()
+
+        while self.match(MINUS, PLUS):
+            operator : token = self.previous()
+            right : Expr = self.factor()
+            expr = Binary(expr, operator, right)
+
+        return expr
+
+    def factor(self) -> Expr:
+        expr = self.unary_expression()
+
+        while self.match(SLASH, STAR):
+            operator: Token = self.previous()
+            right : expr = self.unary_expression()
+            expr = Binary(expr, operator, right)
+
+        return expr
+
+    def unary_expression(self) -> Expr:
+        if self.match(BANG, MINUS):
+            operator : Token = self.previous()
+            right : Expr = self.unary_expression()
+            return Unary(operator, right)
+
+        return self.call()
+
+    def call(self) -> Expr:
+        expr: Expr = self.primary()
+
+        while True:
+            if self.match(LEFT_PAREN):
+                expr = self.finish_call(expr)
+            else:
+                break
+
+        return expr
+
+    def finish_call(self, callee: Expr) -> Expr:
+        arguments: list[Expr] = []
+
+        if not self.check(RIGHT_PAREN):
+            # HACK: This is supposed to mimic the do while loop in the original Java
+            arguments.append(self.expression())
+            while self.match(COMMA):
+                if len(arguments) >= 255:
+                    error(self.peek(), "Can't have more than 255 arguments.")
+                arguments.append(self.expression())
+
+        paren: Token = self.consume(RIGHT_PAREN,
+                                    "Expected ')' after arguments.")
+
+        return Call(callee, paren, arguments)
+
+    def primary(self) -> Expr:
+        if self.match(FALSE):
+            return Literal(False)
+        if self.match(TRUE):
+            return Literal(True)
+        if self.match(NIL):
+            return Literal(None)
+        if self.match(NUMBER, STRING):
+            return Literal(self.previous().literal)
+        if self.match(IDENTIFIER):
+            return Variable(self.previous())
+
+        if self.match(FUN):
+            return self.run(lambda _: self.lambda_expression())
+
+        if self.match(LEFT_PAREN):
+            expr : Expr = self.expression()
+            self.expect(RIGHT_PAREN, "Expected ')' after expression.")
+            return Grouping(expr)
+
+
+        binary_operators = set([COMMA, BANG_EQUAL, EQUAL_EQUAL,
+                                GREATER, GREATER_EQUAL, LESS, LESS_EQUAL,
+                                MINUS, PLUS,
+                                SLASH, STAR])
+
+        for op in binary_operators:
+            if self.match(op):
+                operator_token = self.previous()
+                expr = self.expression() # will be discarded?
+                raise self.error(
+                    operator_token,
+                    f"Expected left-hand side of binary operator {operator_token.lexeme}."
+                )
+
+        raise self.error(self.peek(), "Expected expression.")
+
+def parse(parser: type[Parser], source: str) -> list:
+    return parser(RegexScanner(source).scan_array()).parse()
+
+def main(argv: list):
+    lines = int(argv[0]) if len(argv) > 0 else 20_000
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    source = generate(lines)
+
+    assert repr(parse(DescentParser, source)) == repr(parse(Parser, source))
+
+    tokens = RegexScanner(source).scan_array()
+    # Taking turns, so that both see the same noise
+    timings: dict[str, list[float]] = {"before": [], "after": []}
+    for _ in range(repeats):
+        for name, parser in [("before", DescentParser), ("after", Parser)]:
+            timings[name] += timeit.repeat(lambda: parser(tokens).parse(), number=1, repeat=1)
+
+    before, after = min(timings["before"]), min(timings["after"])
+    print(f"{lines} lines, {len(tokens)} tokens, best of {repeats}")
+    print(f"before (recursive descent): {before:6.3f}s {len(tokens) / before:12,.0f} tokens/s")
+    print(f"after (automaton):          {after:6.3f}s {len(tokens) / after:12,.0f} tokens/s")
+    print(f"speedup: {before / after:.2f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# Benchmark for the overhead of the profilers: a call-heavy script and a
+# loop-heavy one, run on the tree-walker as it is, with --profile, with
+# --call-graph and with --counters.
+#
+# Run with: python3 -m benchmarks.profiler [repeats] [interval in ms]
+
+import sys
+import io
+import contextlib
+import timeit
+
+from plox.plox import Plox
+from plox.profiler import SamplingProfiler, INTERVAL
+from plox.call_graph import CallGraphInterpreter
+from plox.instrumentation import InstrumentedInterpreter
+
+SOURCES = {
+    "fib(22)": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 2) + fib(n - 1);
+}
+print fib(22);
+""",
+    "loop": """
+var sum = 0;
+for (var i = 0; i < 100000; i = i + 1) sum = sum + i;
+print sum;
+""",
+}
+
+def run(source: str, profiler: SamplingProfiler | None = None, engine=None):
+    plox = Plox(memoize=False)
+    if engine:
+        plox.engine = engine
+    with contextlib.redirect_stdout(io.StringIO()):
+        if profiler:
+            with profiler:
+                plox.run(source)
+        else:
+            plox.run(source)
+
+def main(argv: list):
+    repeats = int(argv[0]) if len(argv) > 0 else 5
+    interval = float(argv[1]) / 1000 if len(argv) > 1 else INTERVAL
+
+    print(f"best of {repeats}, sampling every {interval * 1000:g}ms")
+    for name, source in SOURCES.items():
+        profilers = []
+        def profiled():
+            profilers.append(SamplingProfiler(interval))
+            run(source, profilers[-1])
+
+        before = min(timeit.repeat(lambda: run(source), number=1, repeat=repeats))
+        sampled = min(timeit.repeat(profiled, number=1, repeat=repeats))
+        call_graph = min(timeit.repeat(lambda: run(source, engine=CallGraphInterpreter),
+                                       number=1, repeat=repeats))
+        counters = min(timeit.repeat(lambda: run(source, engine=InstrumentedInterpreter),
+                                     number=1, repeat=repeats))
+
+        print(f"{name}:")
+        print(f"  without profiling: {before:6.3f}s")
+        print(f"  with --profile:    {sampled:6.3f}s {sampled / before - 1:+7.1%} "
+              f"({profilers[-1].samples} samples)")
+        print(f"  with --call-graph: {call_graph:6.3f}s {call_graph / before - 1:+7.1%}")
+        print(f"  with --counters:   {counters:6.3f}s {counters / before - 1:+7.1%}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
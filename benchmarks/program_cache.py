@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Benchmark for the ProgramCache: start-up time of a generated script that
+# declares lots of functions and runs next to nothing, resolved from scratch,
+# resolved and stored, and loaded from the cache.
+#
+# Run with: python3 -m benchmarks.program_cache [lines] [repeats]
+
+import sys
+import io
+import contextlib
+import tempfile
+import timeit
+from pathlib import Path
+
+from plox.plox import Plox
+from plox.program_cache import ProgramCache
+
+CHUNK = """fun f%(i)d(a, b) {
+  var s = a * 2 + b / (a + %(i)d);
+  if (s > 10 and b != nil) s = -s; else s = s + 1;
+  while (s < 100) s = s * 2;
+  return fun (x) { return s + x or false; };
+}
+var v%(i)d = f%(i)d(1, 2)(3);
+"""
+
+def generate(lines: int) -> str:
+    per_chunk = CHUNK.count("\n")
+    return "".join(CHUNK % {"i": i} for i in range(lines // per_chunk)) + "print v0;\n"
+
+def run(path: Path, cache: ProgramCache | None) -> str:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        Plox(cache=cache).run_file(str(path))
+    return output.getvalue()
+
+def main(argv: list):
+    lines = int(argv[0]) if len(argv) > 0 else 20_000
+    repeats = int(argv[1]) if len(argv) > 1 else 3
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "script.lox"
+        path.write_text(generate(lines))
+
+        def cold():
+            return run(path, ProgramCache(tempfile.mkdtemp(dir=directory)))
+
+        cache = ProgramCache(Path(directory) / "warm")
+        expected = run(path, None)
+        assert cold() == run(path, cache) == expected
+
+        key = cache.key(path.read_text(), False, True)
+        timings = {
+            "no cache": lambda: run(path, None),
+            "miss and store": cold,
+            "hit": lambda: run(path, cache),
+            "loading alone": lambda: cache.load(key),
+        }
+
+        print(f"{lines} lines, entry of {cache.path(key).stat().st_size / 2**20:.1f} MB, "
+              f"best of {repeats}")
+        for name, function in timings.items():
+            seconds = min(timeit.repeat(function, number=1, repeat=repeats))
+            print(f"{name + ':':16} {seconds:6.3f}s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# Benchmark for quickening on the tree-walker: numeric loops and string
+# concatenation run with Binary nodes quickened (the Interpreter as it is) and
+# through the original, generic binary(), reimplemented below as an
+# Interpreter subclass that leaves nodes be.
+#
+# Run with: python3 -m benchmarks.quickening [n] [repeats]
+
+import sys
+import io
+import math
+import contextlib
+import timeit
+
+from plox.plox import Plox
+from plox.exceptions import PloxRuntimeError
+from plox.interpreter import Interpreter, stringify
+from plox.token import Token, TokenType
+from plox.expr import *
+from plox.visitor import visitor
+
+SOURCE = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 2) + fib(n - 1);
+}
+
+var sum = 0;
+var s = "";
+for (var i = 0; i < %(n)d; i = i + 1) {
+  sum = sum + i * 2 - i / 4;
+  if (i <= 100) s = s + "x";
+}
+print sum;
+print s;
+print fib(%(fib)d);
+"""
+
+# The original, generic implementation
+
+def check_number_operands(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        if math.isclose(right, 0.0) and operator.type == TokenType.SLASH:
+            raise PloxRuntimeError(operator, "Attempting division by zero.")
+        return
+    raise PloxRuntimeError(operator, f"Token: {operator}\nLeft: {left}\nRight: {right}\nOperands must be numbers.")
+
+class GenericInterpreter(Interpreter):
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        return self.binary(expr, left, right)
+
+    def binary(self, expr: Binary, left, right):
+        match expr.operator.type:
+            case TokenType.GREATER:
+                check_number_operands(expr.operator, left, right)
+                return float(left) > float(right)
+            case TokenType.GREATER_EQUAL:
+                check_number_operands(expr.operator, left, right)
+                return float(left) >= float(right)
+            case TokenType.LESS:
+                check_number_operands(expr.operator, left, right)
+                return float(left) < float(right)
+            case TokenType.LESS_EQUAL:
+                check_number_operands(expr.operator, left, right)
+                return float(left) <= float(right)
+
+            case TokenType.MINUS:
+                check_number_operands(expr.operator, left, right)
+                return float(left) - float(right)
+            case TokenType.PLUS:
+                if isinstance(left, float) and isinstance(right, float):
+                    return float(left) + float(right)
+                if isinstance(left, str) and isinstance(right, str):
+                    return str(left) + str(right)
+                if isinstance(left, (str, float)) and isinstance(right, (str, float)):
+                    return stringify(left) + stringify(right)
+                raise PloxRuntimeError(expr.operator,
+                                       "Operands must be two numbers or two strings, or either of each.")
+            case TokenType.SLASH:
+                check_number_operands(expr.operator, left, right)
+                return float(left) / float(right)
+            case TokenType.STAR:
+                check_number_operands(expr.operator, left, right)
+                return float(left) * float(right)
+
+            case TokenType.BANG_EQUAL: return False
+            case TokenType.EQUAL_EQUAL: return True
+
+        return None
+
+def run(engine, source: str) -> str:
+    plox = Plox()
+    plox.engine = engine
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        plox.run(source)
+    return output.getvalue()
+
+def measure(engine, source: str, repeats: int) -> float:
+    return min(timeit.repeat(lambda: run(engine, source), number=1, repeat=repeats))
+
+def main(argv: list):
+    n = int(argv[0]) if len(argv) > 0 else 50_000
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    source = SOURCE % {"n": n, "fib": 20}
+
+    assert run(GenericInterpreter, source) == run(Interpreter, source)
+
+    before = measure(GenericInterpreter, source, repeats)
+    after = measure(Interpreter, source, repeats)
+
+    print(f"fib(20) and {n} loops of arithmetic, best of {repeats}")
+    print(f"before (generic binary()):  {before:6.3f}s")
+    print(f"after (quickened nodes):    {after:6.3f}s")
+    print(f"speedup: {before / after:.2f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
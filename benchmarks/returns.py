@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+# Benchmark for 'return'/'break' on the tree-walker: call-heavy code run with
+# completion values (the Interpreter as it is) and with the original scheme of
+# raising PloxReturnException/LoopBreakException, reimplemented below as an
+# Interpreter subclass.
+#
+# Run with: python3 -m benchmarks.returns [n] [repeats]
+
+import sys
+import io
+import contextlib
+import timeit
+
+from plox.plox import Plox
+from plox.exceptions import PloxReturnException, LoopBreakException
+from plox.interpreter import Interpreter, is_truthy
+from plox.plox_callable import PloxFunction, PloxLambda
+from plox.environment import Environment, Cell
+from plox.stmt import *
+from plox.expr import *
+from plox.visitor import visitor
+
+SOURCE = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 2) + fib(n - 1);
+}
+
+fun first(limit) {
+  var i = 0;
+  while (true) {
+    if (i >= limit) break;
+    i = i + 1;
+  }
+  return i;
+}
+
+var sum = 0;
+for (var i = 0; i < %(n)d; i = i + 1) {
+  sum = sum + first(3);
+}
+print fib(%(fib)d) + sum;
+"""
+
+# The original, exception-based implementation
+
+def enter(function, arguments: list) -> Environment:
+    environment = Environment(function.closure)
+    for i, param in enumerate(function.declaration.params):
+        environment.define(param.lexeme, arguments[i])
+    for i in function.cells:
+        environment.values[i] = Cell(environment.values[i])
+    return environment
+
+def raising_call(function, interpreter, arguments: list):
+    environment = enter(function, arguments)
+    try:
+        interpreter.execute_block(function.declaration.body, environment)
+    except PloxReturnException as return_exception:
+        return return_exception.value
+    return None
+
+class RaisingFunction(PloxFunction):
+    def call(self, interpreter, arguments: list):
+        return raising_call(self, interpreter, arguments)
+
+class RaisingLambda(PloxLambda):
+    def call(self, interpreter, arguments: list):
+        return raising_call(self, interpreter, arguments)
+
+class RaisingInterpreter(Interpreter):
+    def execute_block(self, statements, environment):
+        previous = self.environment
+        try:
+            self.environment = environment
+            for statement in statements:
+                self.execute(statement)
+        finally:
+            self.environment = previous
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        self.execute_block(stmt.statements, Environment(self.environment))
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        if is_truthy(self.evaluate(stmt.condition)):
+            self.execute(stmt.then_branch)
+        elif stmt.else_branch:
+            self.execute(stmt.else_branch)
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        value = None
+        if stmt.value:
+            value = self.evaluate(stmt.value)
+        raise PloxReturnException(value, stmt.keyword)
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        while is_truthy(self.evaluate(stmt.condition)):
+            try:
+                self.execute(stmt.body)
+            except LoopBreakException:
+                return None
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        raise LoopBreakException(stmt.token, "'break' statements are only allowed inside loops.")
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        _, cells = self.closures[stmt]
+        self.environment.define(stmt.name.lexeme,
+                                RaisingFunction(stmt, self.capture(stmt), cells))
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        _, cells = self.closures[expr]
+        return RaisingLambda(expr, self.capture(expr), cells)
+
+def run(engine, source: str) -> str:
+    plox = Plox()
+    plox.engine = engine
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        plox.run(source)
+    return output.getvalue()
+
+def measure(engine, source: str, repeats: int) -> float:
+    return min(timeit.repeat(lambda: run(engine, source), number=1, repeat=repeats))
+
+def main(argv: list):
+    n = int(argv[0]) if len(argv) > 0 else 5000
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    source = SOURCE % {"n": n, "fib": 20}
+
+    assert run(RaisingInterpreter, source) == run(Interpreter, source)
+
+    before = measure(RaisingInterpreter, source, repeats)
+    after = measure(Interpreter, source, repeats)
+
+    print(f"fib(20) and {n} loops with 'break', best of {repeats}")
+    print(f"before (exceptions):  {before:6.3f}s")
+    print(f"after (completions):  {after:6.3f}s")
+    print(f"speedup: {before / after:.2f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
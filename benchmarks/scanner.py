@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# Benchmark for the scanners, in tokens per second over a generated program
+# of a few megabytes:
+#   - "before" is Scanner with Token as the frozen dataclass it used to be
+#   - "Scanner" is the character-by-character scanner as it is
+#   - "RegexScanner" scans into a list of Tokens
+#   - "TokenArray" is RegexScanner.scan_array(), which plox uses
+# and in bytes per token, for a list of Tokens and for a TokenArray.
+#
+# Run with: python3 -m benchmarks.scanner [megabytes] [repeats]
+
+import sys
+import timeit
+import itertools
+from dataclasses import dataclass
+
+import plox.scanner
+from plox.scanner import Scanner, RegexScanner
+from plox.token import TokenType
+
+@dataclass(eq=True, frozen=True, unsafe_hash=True)
+class DataclassToken:
+    type: TokenType
+    lexeme: str
+    literal: object
+    line: int
+
+CHUNK = """
+// Function %(i)d
+fun f%(i)d(a, b) {
+  var s = "string %(i)d";
+  /* block
+     comment */
+  if (a >= b and b != nil) {
+    return a * 2.5 + (b - %(i)d) / 3;
+  }
+  for (var i = 0; i < 10; i = i + 1) { print s + i; }
+  return !true or false;
+}
+"""
+
+def generate(megabytes: float) -> str:
+    chunks = []
+    size = 0
+    i = 0
+    while size < megabytes * 1_000_000:
+        chunk = CHUNK % {"i": i}
+        chunks.append(chunk)
+        size += len(chunk)
+        i += 1
+    return "".join(chunks)
+
+def measure(scan, repeats: int) -> float:
+    return min(timeit.repeat(scan, number=1, repeat=repeats))
+
+def before(source: str):
+    plox.scanner.Token = DataclassToken
+    try:
+        return Scanner(source).scan_tokens()
+    finally:
+        plox.scanner.Token = plox.token.Token
+
+def list_size(tokens: list) -> int:
+    """Bytes held by a list of Tokens, counting objects shared between
+    tokens (enum members, cached strings, None) once."""
+    seen: set[int] = set()
+    size = sys.getsizeof(tokens)
+    for token in tokens:
+        for item in itertools.chain((token,), token):
+            if id(item) not in seen:
+                seen.add(id(item))
+                size += sys.getsizeof(item)
+    return size
+
+def main(argv: list):
+    megabytes = float(argv[0]) if len(argv) > 0 else 2
+    repeats = int(argv[1]) if len(argv) > 1 else 3
+    source = generate(megabytes)
+
+    tokens = RegexScanner(source).scan_tokens()
+    assert tokens == Scanner(source).scan_tokens()
+    count = len(tokens)
+
+    timings = {
+        "before": measure(lambda: before(source), repeats),
+        "Scanner": measure(lambda: Scanner(source).scan_tokens(), repeats),
+        "RegexScanner": measure(lambda: RegexScanner(source).scan_tokens(), repeats),
+        "TokenArray": measure(lambda: RegexScanner(source).scan_array(), repeats),
+    }
+
+    print(f"{len(source) / 1_000_000:.1f} MB, {count} tokens, best of {repeats}")
+    for name, seconds in timings.items():
+        print(f"{name + ':':14} {seconds:6.3f}s {count / seconds:12,.0f} tokens/s")
+    print(f"speedup over before:  {timings['before'] / timings['RegexScanner']:.2f}x")
+    print(f"speedup over Scanner: {timings['Scanner'] / timings['RegexScanner']:.2f}x")
+
+    array = RegexScanner(source).scan_array()
+    assert list(array) == tokens
+    print(f"list of Tokens: {list_size(tokens) / count:6.1f} bytes/token")
+    print(f"TokenArray:     {array.nbytes() / count:6.1f} bytes/token, plus the source")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Benchmark for plox --stream: runs a generated data-as-code file, a long list
+# of top-level statements, with and without --stream, and reports the peak
+# memory of each run.
+#
+# Run with: python3 -m benchmarks.streaming [lines] [engine]
+
+import os
+import sys
+import subprocess
+import tempfile
+import time
+
+STATEMENT = "total = total + %d * 2; count = count + 1;\n"
+
+def generate(path: str, lines: int):
+    with open(path, "w") as f:
+        f.write("var total = 0;\nvar count = 0;\n")
+        for i in range(lines):
+            f.write(STATEMENT % i)
+        f.write("print total; print count;\n")
+
+def measure(path: str, engine: str, stream: bool) -> tuple[float, float, str]:
+    """Returns seconds, peak RSS in MB and the output of one run."""
+    script = ("import resource, sys, plox.plox; "
+              "sys.setrecursionlimit(10000); "
+              f"plox.plox.Plox(engine={engine!r}).run_file({path!r}, stream={stream}); "
+              "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)")
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", script],
+                            capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    rss = int(result.stderr.split()[-1]) / 1024
+    return seconds, rss, result.stdout
+
+def main(argv: list):
+    lines = int(argv[0]) if len(argv) > 0 else 100_000
+    engine = argv[1] if len(argv) > 1 else "tree"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "data.lox")
+        generate(path, lines)
+        size = os.path.getsize(path) / 2**20
+
+        batch = measure(path, engine, False)
+        streamed = measure(path, engine, True)
+        assert batch[2] == streamed[2]
+
+    print(f"{lines} lines ({size:.1f} MB), engine {engine}")
+    print(f"batch:   {batch[0]:6.2f}s  {batch[1]:7.1f} MB peak")
+    print(f"stream:  {streamed[0]:6.2f}s  {streamed[1]:7.1f} MB peak")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+# The standard Lox benchmarks, after those of Crafting Interpreters, as far
+# as plox can run them: fib, binary_trees, equality, string_equality and zoo,
+# in benchmarks/lox. There are no classes yet, so binary_trees and zoo make
+# do with closures, and there's no instantiation benchmark.
+#
+# Each benchmark runs in each configuration asked for (an engine, and maybe
+# options, see CONFIGURATIONS), a few times to warm up and then a few more
+# timed, in this process and without the program cache. What it prints has to
+# be what the '// expect: ' comments at its end say. The median and standard
+# deviation of the timed runs can be saved as JSON, and two such files
+# compared to find what got slower.
+#
+# Run with: python3 -m benchmarks.suite [benchmark ...] [-c config ...]
+#                                       [--warmup N] [--repeat N] [-o FILE]
+#           python3 -m benchmarks.suite --compare BASE NEW [--threshold 0.05]
+#           python3 -m benchmarks.suite --list
+
+import sys
+import io
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+from datetime import datetime, timezone
+
+from plox.plox import Plox, ENGINES
+
+BENCHMARKS = Path(__file__).parent / "lox"
+
+EXPECT = "// expect: "
+
+# Plox() options of each configuration: every engine as it is, and then with
+# some of their modes turned on or off
+CONFIGURATIONS: dict[str, dict] = {
+    **{engine: {"engine": engine} for engine in ENGINES},
+    **{f"{engine}-O": {"engine": engine, "optimize": True} for engine in ENGINES},
+    "tree-memo": {"engine": "tree", "memoize": True},
+    "stack-memo": {"engine": "stack", "memoize": True},
+}
+
+# Every engine as it is. Not memoized: fib and the like would time a lookup
+# of their result rather than any calls
+DEFAULT_CONFIGURATIONS = list(ENGINES)
+
+# How much slower a median has to get to count as a regression
+THRESHOLD = 0.05
+
+class BenchmarkError(Exception):
+    pass
+
+def benchmarks() -> list[str]:
+    return sorted(path.stem for path in BENCHMARKS.glob("*.lox"))
+
+def load(name: str) -> tuple[str, str]:
+    """Source of a benchmark, and what it should print."""
+    source = (BENCHMARKS / f"{name}.lox").read_text()
+    expected = "".join(line[len(EXPECT):] + "\n"
+                       for line in source.splitlines() if line.startswith(EXPECT))
+    return source, expected
+
+def run(source: str, options: dict) -> tuple[float, str]:
+    Plox.had_error = False
+    Plox.had_runtime_error = False
+    plox = Plox(**options)
+
+    output = io.StringIO()
+    gc.collect()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        plox.run(source)
+        seconds = time.perf_counter() - start
+
+    if Plox.had_error or Plox.had_runtime_error:
+        raise BenchmarkError(" ".join(output.getvalue().split()) or "syntax error")
+    return seconds, output.getvalue()
+
+def measure(name: str, configuration: str, warmup: int, repeat: int) -> dict:
+    source, expected = load(name)
+    options = CONFIGURATIONS[configuration]
+
+    times = []
+    for i in range(warmup + repeat):
+        seconds, output = run(source, options)
+        if output != expected:
+            raise BenchmarkError(f"printed {output!r} instead of {expected!r}")
+        if i >= warmup:
+            times.append(seconds)
+
+    return {
+        "benchmark": name,
+        "configuration": configuration,
+        "times": times,
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+def revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCHMARKS, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(names: list[str], configurations: list[str], warmup: int, repeat: int) -> dict:
+    results = []
+    failed = 0
+    print(f"{'benchmark':<16} {'configuration':<16} {'median':>9} {'stddev':>9}")
+    for name in names:
+        for configuration in configurations:
+            try:
+                result = measure(name, configuration, warmup, repeat)
+            except BenchmarkError as error:
+                print(f"{name:<16} {configuration:<16} failed: {error}")
+                failed += 1
+                continue
+
+            results.append(result)
+            print(f"{name:<16} {configuration:<16} "
+                  f"{result['median']:8.3f}s {result['stddev']:8.3f}s")
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "failed": failed,
+        "results": results,
+    }
+
+def compare(base: dict, new: dict, threshold: float) -> int:
+    """Print how every result in both changed, returns how many regressed."""
+    medians = {(result["benchmark"], result["configuration"]): result["median"]
+               for result in base["results"]}
+
+    regressions = 0
+    print(f"{'benchmark':<16} {'configuration':<16} {'base':>9} {'new':>9} {'change':>8}")
+    for result in new["results"]:
+        key = (result["benchmark"], result["configuration"])
+        if key not in medians:
+            continue
+
+        before, after = medians[key], result["median"]
+        change = after / before - 1
+        verdict = ""
+        if change > threshold:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            verdict = "improvement"
+        print(f"{key[0]:<16} {key[1]:<16} {before:8.3f}s {after:8.3f}s "
+              f"{change:+7.1%}  {verdict}".rstrip())
+
+    print(f"{regressions} regressions past {threshold:.0%}.")
+    return regressions
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.suite")
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("-c", "--configuration", action="append", dest="configurations",
+                        choices=CONFIGURATIONS, metavar="CONFIGURATION",
+                        help=f"configuration to run in, repeatable (default: "
+                        f"{', '.join(DEFAULT_CONFIGURATIONS)})")
+    parser.add_argument("--warmup", type=int, default=1, metavar="N",
+                        help="untimed runs first (default: 1)")
+    parser.add_argument("--repeat", type=int, default=5, metavar="N",
+                        help="timed runs (default: 5)")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="save the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+                        help="compare two saved results instead of running anything")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"slowdown of a median that's a regression (default: {THRESHOLD})")
+    parser.add_argument("--list", action="store_true",
+                        help="list benchmarks and configurations")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("benchmarks:", " ".join(benchmarks()))
+        print("configurations:", " ".join(CONFIGURATIONS))
+        return 0
+
+    if args.compare:
+        base, new = (json.loads(Path(path).read_text()) for path in args.compare)
+        return 1 if compare(base, new, args.threshold) else 0
+
+    unknown = set(args.benchmarks) - set(benchmarks())
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    results = run_suite(args.benchmarks or benchmarks(),
+                        args.configurations or DEFAULT_CONFIGURATIONS,
+                        args.warmup, args.repeat)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    return 1 if results["failed"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
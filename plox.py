@@ -1,18 +1,148 @@
 #!/usr/bin/env python3
 
 import sys
-from plox.plox import Plox
+import argparse
+from plox.plox import Plox, ENGINES
+from plox.program_cache import ProgramCache
+from plox.output import Output, FLUSH_POLICIES
+from plox.profiler import SamplingProfiler, INTERVAL
+from plox.call_graph import CallGraphInterpreter, CALL_GRAPH_FORMATS
+from plox.instrumentation import InstrumentedInterpreter, COUNTERS_FORMATS
 
-def main(argv: list):
-    if len(argv) > 1:
-        print("Usage: plox [script]")
+class ArgumentParser(argparse.ArgumentParser):
+    # Keep the sysexits.h usage code instead of argparse's default of 2
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        print(f"{self.prog}: error: {message}", file=sys.stderr)
         sys.exit(64)
-    elif len(argv) == 1:
-        plox = Plox()
-        plox.run_file(argv[0])
-    else:
-        plox = Plox()
-        plox.run_prompt()
+
+def main(argv: list):
+    parser = ArgumentParser(prog="plox")
+    parser.add_argument("script", nargs="?")
+    parser.add_argument("--engine", choices=ENGINES, default="tree",
+                        help="execution engine (default: tree)")
+    parser.add_argument("--vm", dest="engine", action="store_const", const="vm",
+                        help="run on the bytecode VM, same as --engine vm")
+    parser.add_argument("--dump-python", action="store_true",
+                        help="print the generated Python to stderr (python engine only)")
+    parser.add_argument("--tail-calls", action="store_true",
+                        help="run 'return f(...)' without growing the stack (tree engine only)")
+    parser.add_argument("--max-depth", type=int, metavar="N",
+                        help="maximum depth of Lox calls (stack and vm engines only)")
+    parser.add_argument("--stream", action="store_true",
+                        help="run the script statement by statement as it's parsed, in constant memory")
+    parser.add_argument("--memoize", action="store_true",
+                        help="cache the results of pure functions, which then run fewer times "
+                        "(tree and stack engines, off by default)")
+    parser.add_argument("--memo-size", type=int, metavar="N",
+                        help="number of results of pure functions to cache (tree and stack engines)")
+    parser.add_argument("--cache", action="store_true",
+                        help="cache the resolved script on disk, and load it from there next time")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="where to cache resolved scripts, implies --cache "
+                        "(default: $PLOX_CACHE_DIR or ~/.cache/plox)")
+    parser.add_argument("--flush", choices=FLUSH_POLICIES,
+                        help="when to write out what the script prints: after every line, "
+                        "once the buffer is full, or when the script is done "
+                        "(default: line on a terminal, size otherwise)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="fold constants and drop dead branches before running")
+    parser.add_argument("--stats", action="store_true",
+                        help="print optimizer and inline cache statistics to stderr when done")
+    parser.add_argument("--profile", action="store_true",
+                        help="sample what the script is running and print its hottest lines "
+                        "and functions to stderr when done (tree engine only)")
+    parser.add_argument("--profile-interval", type=float, metavar="MS", default=INTERVAL * 1000,
+                        help=f"milliseconds of CPU time between samples (default: {INTERVAL * 1000:g})")
+    parser.add_argument("--call-graph", metavar="FILE",
+                        help="time every call and write the call graph to FILE when done "
+                        "(tree engine only)")
+    parser.add_argument("--call-graph-format", choices=CALL_GRAPH_FORMATS, default="collapsed",
+                        help="collapsed stacks, for flame graphs, or JSON (default: collapsed)")
+    parser.add_argument("--counters", metavar="FILE",
+                        help="count node executions, environments, calls and the like, and "
+                        "write them to FILE when done (tree engine only)")
+    parser.add_argument("--counters-format", choices=COUNTERS_FORMATS, default="json",
+                        help="JSON or Prometheus text format (default: json)")
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.dump_python:
+        if args.engine != "python":
+            parser.error("--dump-python requires --engine python")
+        options["dump_python"] = True
+    if args.tail_calls:
+        if args.engine != "tree":
+            parser.error("--tail-calls requires --engine tree")
+        options["tail_calls"] = True
+    if args.max_depth is not None:
+        if args.engine not in ("stack", "vm"):
+            parser.error("--max-depth requires --engine stack or vm")
+        options["max_depth"] = args.max_depth
+    if args.memo_size is not None and not args.memoize:
+        parser.error("--memo-size requires --memoize")
+    if args.memoize:
+        if args.engine not in ("tree", "stack"):
+            parser.error("--memoize requires --engine tree or stack")
+        options["memoize"] = True
+        if args.memo_size is not None:
+            options["memo_size"] = args.memo_size
+
+    profiler = None
+    if args.profile:
+        if args.engine != "tree":
+            parser.error("--profile requires --engine tree")
+        profiler = SamplingProfiler(args.profile_interval / 1000)
+
+    if args.call_graph and args.engine != "tree":
+        parser.error("--call-graph requires --engine tree")
+    if args.counters and args.engine != "tree":
+        parser.error("--counters requires --engine tree")
+    if args.call_graph and args.counters:
+        parser.error("--call-graph and --counters can't be used together")
+
+    cache = ProgramCache(args.cache_dir) if args.cache or args.cache_dir else None
+
+    output = Output(flush=args.flush) if args.flush else None
+
+    plox = Plox(engine=args.engine, optimize=args.optimize, cache=cache, output=output,
+                **options)
+    if args.call_graph:
+        plox.engine = CallGraphInterpreter
+    if args.counters:
+        plox.engine = InstrumentedInterpreter
+    if profiler:
+        profiler.start()
+    try:
+        if args.script:
+            plox.run_file(args.script, stream=args.stream)
+        else:
+            plox.run_prompt()
+    finally:
+        if profiler:
+            profiler.stop()
+            profiler.report(sys.stderr, args.script)
+        if args.call_graph and plox.interpreter:
+            with open(args.call_graph, "w") as f:
+                plox.interpreter.call_graph.write(f, args.call_graph_format)
+        if args.counters and plox.interpreter:
+            with open(args.counters, "w") as f:
+                plox.interpreter.counters.write(f, args.counters_format)
+        if args.stats and cache and cache.hits + cache.misses:
+            print(f"Program cache: {'hit' if cache.hits else 'miss'} in {cache.directory}.",
+                  file=sys.stderr)
+        if args.stats and plox.optimizer:
+            print(f"Optimizer removed {plox.optimizer.removed} nodes.", file=sys.stderr)
+        if args.stats and plox.interpreter and plox.interpreter.call_sites:
+            stats = plox.interpreter.call_stats()
+            print(f"Inline caches: {stats['sites']} call sites "
+                  f"({stats['megamorphic']} megamorphic), "
+                  f"{stats['hit_rate']:.1%} of {stats['calls']} calls hit.", file=sys.stderr)
+        if args.stats and plox.interpreter and plox.interpreter.memo_stats():
+            stats = plox.interpreter.memo_stats()
+            print(f"Memo: {stats['functions']} pure functions, "
+                  f"{stats['hit_rate']:.1%} of {stats['calls']} calls hit, "
+                  f"{stats['evictions']} evictions.", file=sys.stderr)
 
 if __name__ == '__main__':
     main(sys.argv[1:])
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
 from .token import Token, TokenType
-from .expr import Expr, Binary, Grouping, Unary, Literal, Ternary
-from .visitor import visitor
+from .expr import Expr, Binary, Grouping, Unary, Literal, Ternary, Logical, Variable, \
+    Assign, Call, Lambda
+from .stmt import Stmt
+from .visitor import visitor, visits
 
+# Matches expressions; statements and lambdas are left out
+@visits(Expr, Stmt, exclude=(Lambda, Stmt))
 class AstMatcher:
     def match(self, left: Expr, right: Expr):
         return self.visit(left) == self.visit(right)
@@ -22,7 +26,7 @@ class AstMatcher:
 
     @visitor(Grouping)
     def visit(self, expr: Grouping): #pyright: ignore
-        return "group", expr.expression
+        return "group", self.visit(expr.expression)
 
     @visitor(Literal)
     def visit(self, expr: Literal): #pyright: ignore
@@ -33,6 +37,23 @@ class AstMatcher:
     def visit(self, expr: Unary): #pyright: ignore
         return expr.operator.lexeme, self.visit(expr.right) #pyright: ignore
 
+    @visitor(Logical)
+    def visit(self, expr: Logical): #pyright: ignore
+        return expr.operator.lexeme, self.visit(expr.left), self.visit(expr.right) #pyright: ignore
+
+    @visitor(Variable)
+    def visit(self, expr: Variable): #pyright: ignore
+        return "variable", expr.name.lexeme
+
+    @visitor(Assign)
+    def visit(self, expr: Assign): #pyright: ignore
+        return "=", expr.name.lexeme, self.visit(expr.value) #pyright: ignore
+
+    @visitor(Call)
+    def visit(self, expr: Call): #pyright: ignore
+        return "call", self.visit(expr.callee), \
+            tuple(self.visit(argument) for argument in expr.arguments) #pyright: ignore
+
 if __name__ == "__main__":
     expression = Binary(
         Unary(
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
 from .token import Token, TokenType
-from .expr import Expr, Binary, Grouping, Unary, Literal, Ternary
-from .visitor import visitor
+from .expr import Expr, Binary, Grouping, Unary, Literal, Ternary, Logical, Variable, \
+    Assign, Call, Lambda
+from .stmt import Stmt
+from .visitor import visitor, visits
 
+# Prints expressions; statements and lambdas are left out
+@visits(Expr, Stmt, exclude=(Lambda, Stmt))
 class AstPrinter():
     def print(self, expr: Expr):
         return self.visit(expr).strip()
@@ -30,6 +34,23 @@ class AstPrinter():
     def visit(self, expr: Unary):
         return self.__parenthesize(expr.operator.lexeme, expr.right)
 
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        return self.__parenthesize(expr.operator.lexeme,
+                                   expr.left, expr.right)
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        return expr.name.lexeme
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        return self.__parenthesize(f"= {expr.name.lexeme}", expr.value)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        return self.__parenthesize("call", expr.callee, *expr.arguments)
+
     def __parenthesize(self, name: str, *exprs: Expr):
         return f" ({name} {' '.join(self.visit(expr) for expr in exprs)} )"
 
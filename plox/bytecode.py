@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+# Bytecode representation for the VM backend, modelled on clox's chunk.h:
+# a flat list of opcodes with their operands inlined, a constant pool and a
+# line table with one entry per code unit.
+#
+# See:
+#   - https://craftinginterpreters.com/chunks-of-bytecode.html
+
+from enum import IntEnum
+from math import copysign
+from typing import Any
+
+class OpCode(IntEnum):
+    CONSTANT = 0          # constant index
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    UNINITIALIZED = 4
+    POP = 5
+    GET_LOCAL = 6         # slot
+    SET_LOCAL = 7         # slot
+    GET_GLOBAL = 8        # constant index of name
+    DEFINE_GLOBAL = 9     # constant index of name
+    SET_GLOBAL = 10       # constant index of name
+    GET_UPVALUE = 11      # upvalue index
+    SET_UPVALUE = 12      # upvalue index
+    EQUAL = 13
+    NOT_EQUAL = 14
+    GREATER = 15
+    GREATER_EQUAL = 16
+    LESS = 17
+    LESS_EQUAL = 18
+    ADD = 19
+    SUBTRACT = 20
+    MULTIPLY = 21
+    DIVIDE = 22
+    NOT = 23
+    NEGATE = 24
+    PRINT = 25
+    JUMP = 26             # absolute target
+    JUMP_IF_FALSE = 27    # absolute target
+    LOOP = 28             # absolute target
+    CALL = 29             # argument count
+    CLOSURE = 30          # constant index of prototype, then (is_local, index) per upvalue
+    CLOSE_UPVALUE = 31
+    RETURN = 32
+    BREAK_OUTSIDE_LOOP = 33
+
+# Number of inline operands following each opcode (CLOSURE has a variable
+# number of trailing pairs on top of this)
+OPERANDS = {
+    OpCode.CONSTANT: 1,
+    OpCode.GET_LOCAL: 1,
+    OpCode.SET_LOCAL: 1,
+    OpCode.GET_GLOBAL: 1,
+    OpCode.DEFINE_GLOBAL: 1,
+    OpCode.SET_GLOBAL: 1,
+    OpCode.GET_UPVALUE: 1,
+    OpCode.SET_UPVALUE: 1,
+    OpCode.JUMP: 1,
+    OpCode.JUMP_IF_FALSE: 1,
+    OpCode.LOOP: 1,
+    OpCode.CALL: 1,
+    OpCode.CLOSURE: 1,
+}
+
+class Chunk:
+    def __init__(self):
+        self.code: list[int] = []
+        self.lines: list[int] = []
+        self.constants: list[Any] = []
+        self._constant_index: dict[tuple[type, Any], int] = {}
+
+    def write(self, byte: int, line: int) -> int:
+        """Append a code unit and return its offset."""
+        self.code.append(byte)
+        self.lines.append(line)
+        return len(self.code) - 1
+
+    def add_constant(self, value: Any) -> int:
+        # Deduplicate names and literals, but never fold e.g. 1.0 and True,
+        # or 0.0 and -0.0, together (they compare equal in Python)
+        key = (type(value), value, copysign(1.0, value)) if type(value) is float \
+            else (type(value), value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+class FunctionProto:
+    """Compiled form of a Function or Lambda (or the top-level script)."""
+
+    def __init__(self, name: str | None, arity: int = 0):
+        self.name = name
+        self.arity = arity
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+        # (body start, body end, exit, slots) of every loop, inner ones first:
+        # where a 'break' from a function called in the body goes, and how
+        # many stack slots the frame has there
+        self.loops: list[tuple[int, int, int, int]] = []
+
+    def __str__(self) -> str:
+        if self.name is None:
+            return "<script>"
+        return f"<fn {self.name}>"
+
+def disassemble(proto: FunctionProto) -> str:
+    """Human-readable listing of a prototype and every prototype nested in it."""
+    chunk = proto.chunk
+    lines = [f"== {proto} =="]
+    nested = []
+
+    offset = 0
+    while offset < len(chunk.code):
+        op = OpCode(chunk.code[offset])
+        line = chunk.lines[offset]
+        same_line = offset > 0 and chunk.lines[offset - 1] == line
+        prefix = f"{offset:04d} {'   |' if same_line else f'{line:4d}'} {op.name:<20}"
+
+        operands = OPERANDS.get(op, 0)
+        if operands == 0:
+            lines.append(prefix.rstrip())
+            offset += 1
+            continue
+
+        operand = chunk.code[offset + 1]
+        if op in (OpCode.CONSTANT, OpCode.GET_GLOBAL, OpCode.DEFINE_GLOBAL,
+                  OpCode.SET_GLOBAL, OpCode.CLOSURE):
+            constant = chunk.constants[operand]
+            lines.append(f"{prefix}{operand:4d} '{constant}'")
+        else:
+            lines.append(f"{prefix}{operand:4d}")
+        offset += 2
+
+        if op == OpCode.CLOSURE:
+            function: FunctionProto = chunk.constants[operand]
+            nested.append(function)
+            for _ in range(function.upvalue_count):
+                is_local, index = chunk.code[offset], chunk.code[offset + 1]
+                kind = "local" if is_local else "upvalue"
+                lines.append(f"{offset:04d}    |   {kind} {index}")
+                offset += 2
+
+    for function in nested:
+        lines.append(disassemble(function))
+
+    return "\n".join(lines)
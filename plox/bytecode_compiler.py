@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+# Single-pass compiler from the (already resolved) AST to bytecode, following
+# clox's compiler.c: locals live in stack slots, variables captured by inner
+# functions become upvalues, everything else is a global.
+#
+# See:
+#   - https://craftinginterpreters.com/local-variables.html
+#   - https://craftinginterpreters.com/closures.html
+
+from .bytecode import OpCode, FunctionProto
+from .token import Token, TokenType
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+BINARY_OPCODES = {
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.STAR: OpCode.MULTIPLY,
+}
+
+class Local:
+    __slots__ = ("name", "depth", "is_captured")
+
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.is_captured = False
+
+class Loop:
+    __slots__ = ("scope_depth", "breaks")
+
+    def __init__(self, scope_depth: int):
+        self.scope_depth = scope_depth
+        self.breaks: list[int] = []
+
+class FunctionState:
+    """Per-function compiler state, chained to the enclosing function's."""
+
+    def __init__(self, enclosing: 'FunctionState | None', proto: FunctionProto):
+        self.enclosing = enclosing
+        self.proto = proto
+        # Slot zero holds the closure being called
+        self.locals: list[Local] = [Local("", 0)]
+        self.upvalues: list[tuple[int, int]] = []
+        self.scope_depth = 0
+        self.loops: list[Loop] = []
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class BytecodeCompiler:
+    def __init__(self):
+        self.state: FunctionState | None = None
+        self.line = 0
+
+    def compile(self, statements: list[Stmt]) -> FunctionProto:
+        """Compile a program into the prototype of its top-level script."""
+        self.state = FunctionState(None, FunctionProto(None))
+
+        for statement in statements:
+            self.visit(statement)
+
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        return self.state.proto
+
+    def compile_expression(self, expr: Expr) -> FunctionProto:
+        """Compile a lone expression into a script that returns its value."""
+        self.state = FunctionState(None, FunctionProto(None))
+
+        self.visit(expr)
+        self.emit(OpCode.RETURN)
+        return self.state.proto
+
+    # Emitting code
+
+    def emit(self, *units: int) -> int:
+        chunk = self.state.proto.chunk
+        for unit in units:
+            offset = chunk.write(unit, self.line)
+        return offset
+
+    def emit_constant(self, value) -> int:
+        return self.state.proto.chunk.add_constant(value)
+
+    def emit_jump(self, op: OpCode) -> int:
+        """Emit a jump with a placeholder target, returning the target's offset."""
+        return self.emit(op, 0xffff)
+
+    def patch_jump(self, offset: int):
+        chunk = self.state.proto.chunk
+        chunk.code[offset] = len(chunk.code)
+
+    def at(self, token: Token):
+        self.line = token.line
+
+    # Scopes and variables
+
+    def begin_scope(self):
+        self.state.scope_depth += 1
+
+    def end_scope(self):
+        state = self.state
+        state.scope_depth -= 1
+
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            local = state.locals.pop()
+            self.emit(OpCode.CLOSE_UPVALUE if local.is_captured else OpCode.POP)
+
+    def add_local(self, name: Token):
+        self.state.locals.append(Local(name.lexeme, self.state.scope_depth))
+
+    def resolve_local(self, state: FunctionState, name: str) -> int:
+        for i in range(len(state.locals) - 1, -1, -1):
+            if state.locals[i].name == name:
+                return i
+        return -1
+
+    def add_upvalue(self, state: FunctionState, is_local: bool, index: int) -> int:
+        upvalue = (int(is_local), index)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+
+        state.upvalues.append(upvalue)
+        state.proto.upvalue_count = len(state.upvalues)
+        return len(state.upvalues) - 1
+
+    def resolve_upvalue(self, state: FunctionState, name: str) -> int:
+        if state.enclosing is None:
+            return -1
+
+        local = self.resolve_local(state.enclosing, name)
+        if local != -1:
+            state.enclosing.locals[local].is_captured = True
+            return self.add_upvalue(state, True, local)
+
+        upvalue = self.resolve_upvalue(state.enclosing, name)
+        if upvalue != -1:
+            return self.add_upvalue(state, False, upvalue)
+
+        return -1
+
+    def named_variable(self, name: Token, get: bool):
+        slot = self.resolve_local(self.state, name.lexeme)
+        if slot != -1:
+            self.emit(OpCode.GET_LOCAL if get else OpCode.SET_LOCAL, slot)
+            return
+
+        upvalue = self.resolve_upvalue(self.state, name.lexeme)
+        if upvalue != -1:
+            self.emit(OpCode.GET_UPVALUE if get else OpCode.SET_UPVALUE, upvalue)
+            return
+
+        constant = self.emit_constant(name.lexeme)
+        self.emit(OpCode.GET_GLOBAL if get else OpCode.SET_GLOBAL, constant)
+
+    def define_global(self, name: Token):
+        """Bind the value on top of the stack to a global.
+
+        Locals need no such thing: their value already sits in their slot.
+        """
+        self.emit(OpCode.DEFINE_GLOBAL, self.emit_constant(name.lexeme))
+
+    def function(self, declaration: Function | Lambda, name: str):
+        proto = FunctionProto(name, len(declaration.params))
+        self.state = FunctionState(self.state, proto)
+        self.begin_scope()
+
+        for param in declaration.params:
+            self.add_local(param)
+
+        for statement in declaration.body:
+            self.visit(statement)
+
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+
+        state = self.state
+        self.state = state.enclosing
+
+        self.emit(OpCode.CLOSURE, self.emit_constant(proto))
+        for is_local, index in state.upvalues:
+            self.emit(is_local, index)
+
+    # Statements
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        self.begin_scope()
+        for statement in stmt.statements:
+            self.visit(statement)
+        self.end_scope()
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        self.visit(stmt.expression)
+        self.emit(OpCode.POP)
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        self.at(stmt.name)
+
+        if self.state.scope_depth > 0:
+            # Declare the local before compiling the body so it can recurse
+            self.add_local(stmt.name)
+            self.function(stmt, stmt.name.lexeme)
+            return
+
+        self.function(stmt, stmt.name.lexeme)
+        self.define_global(stmt.name)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        self.visit(stmt.condition)
+
+        then_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        self.visit(stmt.then_branch)
+
+        else_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(then_jump)
+        self.emit(OpCode.POP)
+
+        if stmt.else_branch:
+            self.visit(stmt.else_branch)
+        self.patch_jump(else_jump)
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        self.visit(stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        self.at(stmt.keyword)
+
+        if stmt.value:
+            self.visit(stmt.value)
+        else:
+            self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        self.at(stmt.name)
+        is_local = self.state.scope_depth > 0
+        if is_local:
+            # Like the resolver, declare before the initializer so that
+            # functions in it can close over the variable
+            self.add_local(stmt.name)
+
+        if stmt.initializer != None:
+            self.visit(stmt.initializer)
+        else:
+            self.emit(OpCode.UNINITIALIZED)
+
+        if not is_local:
+            self.at(stmt.name)
+            self.define_global(stmt.name)
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        chunk = self.state.proto.chunk
+        loop_start = len(chunk.code)
+
+        self.visit(stmt.condition)
+        exit_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        body_start = len(chunk.code)
+
+        loop = Loop(self.state.scope_depth)
+        self.state.loops.append(loop)
+        self.visit(stmt.body)
+        self.state.loops.pop()
+
+        body_end = len(chunk.code)
+        self.emit(OpCode.LOOP, loop_start)
+        self.patch_jump(exit_jump)
+        self.emit(OpCode.POP)
+
+        # Breaks skip the POP above, they never leave the condition on the stack
+        for offset in loop.breaks:
+            self.patch_jump(offset)
+
+        self.state.proto.loops.append(
+            (body_start, body_end, len(chunk.code), len(self.state.locals)))
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        self.at(stmt.token)
+
+        if not self.state.loops:
+            self.emit(OpCode.BREAK_OUTSIDE_LOOP)
+            return
+
+        loop = self.state.loops[-1]
+
+        # Discard the locals of every scope we are jumping out of, without
+        # forgetting about them: code after the break is still compiled
+        for local in reversed(self.state.locals):
+            if local.depth <= loop.scope_depth:
+                break
+            self.emit(OpCode.CLOSE_UPVALUE if local.is_captured else OpCode.POP)
+
+        loop.breaks.append(self.emit_jump(OpCode.JUMP))
+
+    # Expressions
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        self.visit(expr.value)
+        self.at(expr.name)
+        self.named_variable(expr.name, get=False)
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        match expr.value:
+            case None:
+                self.emit(OpCode.NIL)
+            case True:
+                self.emit(OpCode.TRUE)
+            case False:
+                self.emit(OpCode.FALSE)
+            case value:
+                self.emit(OpCode.CONSTANT, self.emit_constant(value))
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        self.visit(expr.left)
+        self.at(expr.operator)
+
+        if expr.operator.type == TokenType.OR:
+            else_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+            end_jump = self.emit_jump(OpCode.JUMP)
+            self.patch_jump(else_jump)
+            self.emit(OpCode.POP)
+            self.visit(expr.right)
+            self.patch_jump(end_jump)
+        else:
+            end_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+            self.emit(OpCode.POP)
+            self.visit(expr.right)
+            self.patch_jump(end_jump)
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        self.visit(expr.expression)
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        self.visit(expr.right)
+        self.at(expr.operator)
+
+        match expr.operator.type:
+            case TokenType.MINUS:
+                self.emit(OpCode.NEGATE)
+            case TokenType.BANG:
+                self.emit(OpCode.NOT)
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        self.at(expr.name)
+        self.named_variable(expr.name, get=True)
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        self.visit(expr.left)
+        self.visit(expr.right)
+        self.at(expr.operator)
+        self.emit(BINARY_OPCODES[expr.operator.type])
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        self.visit(expr.callee)
+        for argument in expr.arguments:
+            self.visit(argument)
+
+        self.at(expr.paren)
+        self.emit(OpCode.CALL, len(expr.arguments))
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        self.at(expr.token)
+        self.function(expr, "lambda")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Deterministic call-graph profiler for the tree-walker (--call-graph).
+#
+# CallGraphInterpreter times every call it runs, of Lox functions, lambdas
+# and natives alike, into a CallGraph: a tree of the call stacks seen, each
+# with how many times it was called and how long those calls took. Exclusive
+# times, per-function totals and caller -> callee edges are all worked out
+# from that tree afterwards, so a call costs little more than reading the
+# clock twice.
+#
+# Only CallGraphInterpreter pays for any of this, the Interpreter itself is
+# left as it is.
+
+import json
+import time
+from collections import Counter
+from typing import Any, Callable, TextIO
+
+from .interpreter import Interpreter
+from .profiler import SCRIPT, function_name
+from .plox_callable import PloxCallable
+from .stmt import Stmt, Function
+from .expr import *
+from .visitor import visitor
+
+CALL_GRAPH_FORMATS = ("collapsed", "json")
+
+class StackNode:
+    """One call stack: the calls of name made from its parent's."""
+    __slots__ = ("name", "parent", "children", "calls", "time")
+
+    def __init__(self, name: str | None, parent: "StackNode | None"):
+        self.name = name
+        self.parent = parent
+        self.children: dict[str, StackNode] = {}
+        self.calls = 0
+        # Inclusive, in seconds
+        self.time = 0.0
+
+    @property
+    def exclusive(self) -> float:
+        # Calls of the children are all made from within calls of this one
+        return self.time - sum(child.time for child in self.children.values())
+
+    def path(self) -> list[str]:
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        names.reverse()
+        return names
+
+class CallGraph:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.root = StackNode(None, None)
+        self.current = self.root
+
+    def measure(self, name: str, run: Callable, *arguments) -> Any:
+        """run(*arguments), timed as a call of name from the current stack."""
+        parent = self.current
+        node = parent.children.get(name)
+        if node is None:
+            node = parent.children[name] = StackNode(name, parent)
+
+        self.current = node
+        start = self.clock()
+        try:
+            return run(*arguments)
+        finally:
+            node.time += self.clock() - start
+            node.calls += 1
+            self.current = parent
+
+    def nodes(self):
+        """Every call stack, in the order they were first seen, with the
+        functions and caller -> callee edges further up the stack."""
+        active: Counter = Counter()
+        pending = list(reversed(self.root.children.values()))
+        while pending:
+            node = pending.pop()
+            if node is None:
+                # Done with the children of this one
+                node = pending.pop()
+                active[node.name] -= 1
+                active[node.parent.name, node.name] -= 1
+                continue
+
+            yield node, active
+            active[node.name] += 1
+            active[node.parent.name, node.name] += 1
+            pending += [node, None]
+            pending.extend(reversed(node.children.values()))
+
+    def functions(self) -> dict[str, dict[str, int | float]]:
+        """Calls, inclusive and exclusive time of each function. Recursive
+        calls only count towards inclusive time once."""
+        functions = {}
+        for node, active in self.nodes():
+            stats = functions.setdefault(
+                node.name, {"calls": 0, "inclusive": 0.0, "exclusive": 0.0})
+            stats["calls"] += node.calls
+            stats["exclusive"] += node.exclusive
+            if not active[node.name]:
+                stats["inclusive"] += node.time
+        return functions
+
+    def edges(self) -> dict[tuple[str, str], dict[str, int | float]]:
+        """Calls and inclusive time of each caller -> callee, the latter
+        counting recursive calls once like functions() does."""
+        edges = {}
+        for node, active in self.nodes():
+            if node.parent is self.root:
+                continue
+            edge = (node.parent.name, node.name)
+            stats = edges.setdefault(edge, {"calls": 0, "inclusive": 0.0})
+            stats["calls"] += node.calls
+            if not active[edge]:
+                stats["inclusive"] += node.time
+        return edges
+
+    def write_collapsed(self, file: TextIO):
+        """Write the exclusive time of every call stack, in microseconds, in
+        the collapsed format of flamegraph.pl and the like."""
+        for node, _ in self.nodes():
+            microseconds = round(node.exclusive * 1_000_000)
+            if microseconds > 0:
+                file.write(f"{';'.join(node.path())} {microseconds}\n")
+
+    def write_json(self, file: TextIO):
+        json.dump({
+            "unit": "seconds",
+            "functions": self.functions(),
+            "edges": [{"caller": caller, "callee": callee, **stats}
+                      for (caller, callee), stats in self.edges().items()],
+        }, file, indent=2)
+        file.write("\n")
+
+    def write(self, file: TextIO, format: str = "collapsed"):
+        if format not in CALL_GRAPH_FORMATS:
+            raise ValueError(f"Unknown call graph format {format!r}.")
+        if format == "json":
+            self.write_json(file)
+        else:
+            self.write_collapsed(file)
+
+def callee_name(function: PloxCallable, expr: Call) -> str:
+    if hasattr(function, "declaration"):
+        return function_name(function)
+    # Natives are only known by the name they're called by
+    if expr.callee.__class__ is Variable:
+        return expr.callee.name.lexeme
+    return str(function)
+
+class CallGraphInterpreter(Interpreter):
+    """Interpreter timing every call into call_graph.
+
+    With tail_calls, a function tail called is counted as part of the call
+    that called it, which is the one that runs it."""
+
+    def __init__(self, call_graph: CallGraph | None = None, **options):
+        super().__init__(**options)
+        self.call_graph = call_graph if call_graph is not None else CallGraph()
+        # Name of the callee of each call site and declaration
+        self.callee_names: dict[Call | Function | Lambda, str] = {}
+
+    def interpret(self, statements: list[Stmt]):
+        self.call_graph.measure(SCRIPT, super().interpret, statements)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        function, arguments = self.evaluate_call(expr)
+        key = getattr(function, "declaration", expr)
+        name = self.callee_names.get(key)
+        if name is None:
+            name = self.callee_names[key] = callee_name(function, expr)
+        return self.call_graph.measure(name, function.call, self, arguments)
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+
+# Closure compilation: instead of dispatching on every node each time it runs,
+# walk the resolved AST once and turn every node into a Python closure that
+# already knows its children, its operator and its variable's scope distance.
+# Running the program is then nothing but calls between those closures.
+#
+# Every closure takes the current Environment as its only argument.
+# Expression closures return the value, statement closures return None or a
+# Completion (see completion.py) for 'break'/'return'.
+
+from typing import Any, Callable
+
+from .exceptions import *
+from .completion import BreakCompletion, ReturnCompletion, BREAK_MESSAGE, \
+    finish_call
+from .environment import Environment, Cell
+from .interpreter import Interpreter, Uninitialized, stringify, \
+    check_number_operand, check_number_operands
+from .plox_callable import PloxCallable, PloxFunction, PloxLambda
+from .token import Token, TokenType
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+def frame(function, values: list) -> Environment:
+    """Environment for a call to a compiled function, taking over values."""
+    environment = Environment(function.closure)
+    environment.values = values
+    for i in function.cells:
+        values[i] = Cell(values[i])
+    return environment
+
+class CompiledFunction(PloxFunction):
+    def __init__(self, declaration: Function, closure: Environment,
+                 names: list[str], body: Callable, cells: tuple[int, ...] = ()):
+        super().__init__(declaration, closure, cells)
+        self.names = names
+        self.body = body
+
+    def call(self, interpreter, arguments: list) -> Any:
+        return finish_call(self.body(frame(self, list(arguments))))
+
+class CompiledLambda(PloxLambda):
+    def __init__(self, declaration: Lambda, closure: Environment,
+                 names: list[str], body: Callable, cells: tuple[int, ...] = ()):
+        super().__init__(declaration, closure, cells)
+        self.names = names
+        self.body = body
+
+    def call(self, interpreter, arguments: list) -> Any:
+        return finish_call(self.body(frame(self, list(arguments))))
+
+COMPILED_CALLABLES = (CompiledFunction, CompiledLambda)
+
+def do_nothing(env: Environment):
+    return None
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class ClosureCompiler:
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        # Declarations outside any block or function define globals
+        self.scope_depth = 0
+
+    def compile(self, statements: list[Stmt]) -> list[Callable]:
+        return [self.visit(statement) for statement in statements]
+
+    def sequence(self, statements: list[Stmt]) -> Callable:
+        """Compile a statement list to a single closure that stops at the first completion."""
+        compiled = self.compile(statements)
+
+        if not compiled:
+            return do_nothing
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(env):
+            for statement in compiled:
+                completion = statement(env)
+                if completion is not None:
+                    return completion
+        return sequence
+
+    def scoped_sequence(self, statements: list[Stmt]) -> Callable:
+        """Like sequence(), for statements running in a new Environment."""
+        self.scope_depth += 1
+        body = self.sequence(statements)
+        self.scope_depth -= 1
+        return body
+
+    def define(self, declaration: Var | Function, value: Callable) -> Callable:
+        """Compile a declaration binding its name to whatever value(env) returns."""
+        name = declaration.name.lexeme
+
+        if self.scope_depth == 0:
+            values = self.interpreter.globals.values
+
+            def define_global(env):
+                values[name] = value(env)
+            return define_global
+
+        if declaration in self.interpreter.cells:
+            # Declared before evaluating value, which may capture it
+            def define_cell(env):
+                cell = Cell(Uninitialized)
+                env.values.append(cell)
+                cell.value = value(env)
+            return define_cell
+
+        # The resolver gave locals their slots in declaration order
+        def define_local(env):
+            env.values.append(value(env))
+        return define_local
+
+    def capture(self, function: Function | Lambda) -> Callable:
+        """Compile the creation of a function's flat closure."""
+        captures, _ = self.interpreter.closures[function]
+
+        if not captures:
+            # Closures are never written to, only the Cells in them
+            empty = Environment()
+            return lambda env: empty
+
+        def capture(env):
+            closure = Environment()
+            closure.values = [env.get_at(distance, slot)
+                              for distance, slot in captures]
+            return closure
+        return capture
+
+    # Statements
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        body = self.scoped_sequence(stmt.statements)
+
+        def block(env):
+            return body(Environment(env))
+        return block
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        expression = self.visit(stmt.expression)
+
+        def expression_statement(env):
+            expression(env)
+        return expression_statement
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        names = [param.lexeme for param in stmt.params]
+        body = self.scoped_sequence(stmt.body)
+        capture = self.capture(stmt)
+        _, cells = self.interpreter.closures[stmt]
+
+        def function(env):
+            return CompiledFunction(stmt, capture(env), names, body, cells)
+        return self.define(stmt, function)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        condition = self.visit(stmt.condition)
+        then_branch = self.visit(stmt.then_branch)
+
+        if not stmt.else_branch:
+            def if_then(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+            return if_then
+
+        else_branch = self.visit(stmt.else_branch)
+
+        def if_then_else(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                return then_branch(env)
+            return else_branch(env)
+        return if_then_else
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        expression = self.visit(stmt.expression)
+        interpreter = self.interpreter
+
+        def print_statement(env):
+            interpreter.output.print(stringify(expression(env)))
+        return print_statement
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        keyword = stmt.keyword
+
+        if not stmt.value:
+            completion = ReturnCompletion(keyword, None)
+            return lambda env: completion
+
+        value = self.visit(stmt.value)
+
+        def return_statement(env):
+            return ReturnCompletion(keyword, value(env))
+        return return_statement
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        # Use unique value instead of None to catch uninitialised variables
+        if stmt.initializer == None:
+            return self.define(stmt, lambda env: Uninitialized)
+
+        return self.define(stmt, self.visit(stmt.initializer))
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        condition = self.visit(stmt.condition)
+        body = self.visit(stmt.body)
+
+        def while_loop(env):
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+
+                try:
+                    completion = body(env)
+                except LoopBreakException:
+                    # A 'break' escaping from a function called in the body
+                    return None
+
+                if completion is not None:
+                    if completion.__class__ is BreakCompletion:
+                        return None
+                    return completion
+        return while_loop
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        completion = BreakCompletion(stmt.token)
+        return lambda env: completion
+
+    # Expressions
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        value = self.visit(expr.value)
+        name = expr.name.lexeme
+        address = self.interpreter.addresses.get(expr)
+
+        if address == None:
+            token = expr.name
+            globals = self.interpreter.globals
+            values = globals.values
+
+            def assign_global(env):
+                result = value(env)
+                if name in values:
+                    values[name] = result
+                else:
+                    globals.assign(token, result)
+                return result
+            return assign_global
+
+        distance, slot, cell = address
+
+        if cell:
+            def assign_cell(env):
+                result = value(env)
+                for _ in range(distance):
+                    env = env.enclosing
+                env.values[slot].value = result
+                return result
+            return assign_cell
+
+        if distance == 0:
+            def assign_local(env):
+                result = env.values[slot] = value(env)
+                return result
+            return assign_local
+
+        def assign_at(env):
+            result = value(env)
+            for _ in range(distance):
+                env = env.enclosing
+            env.values[slot] = result
+            return result
+        return assign_at
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        left = self.visit(expr.left)
+        right = self.visit(expr.right)
+
+        if expr.operator.type == TokenType.OR:
+            def logical_or(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+            return logical_or
+
+        def logical_and(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+        return logical_and
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        # Groupings only matter to the parser
+        return self.visit(expr.expression)
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        right = self.visit(expr.right)
+        operator = expr.operator
+
+        match operator.type:
+            case TokenType.MINUS:
+                def negate(env):
+                    value = right(env)
+                    if type(value) is not float:
+                        check_number_operand(operator, value)
+                    return -value
+                return negate
+            case TokenType.BANG:
+                def bang(env):
+                    value = right(env)
+                    return value is None or value is False
+                return bang
+
+        # Unreachable
+        return lambda env: None
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        name = expr.name.lexeme
+        address = self.interpreter.addresses.get(expr)
+
+        if address == None:
+            token = expr.name
+            globals = self.interpreter.globals
+            values = globals.values
+
+            def global_variable(env):
+                value = values.get(name, Uninitialized)
+                if value is Uninitialized:
+                    # Let the environment raise the appropriate error
+                    return globals.get(token)
+                return value
+            return global_variable
+
+        distance, slot, cell = address
+
+        if cell:
+            match distance:
+                case 0:
+                    return lambda env: env.values[slot].value
+                case 1:
+                    return lambda env: env.enclosing.values[slot].value
+
+            def cell_at(env):
+                for _ in range(distance):
+                    env = env.enclosing
+                return env.values[slot].value
+            return cell_at
+
+        match distance:
+            case 0:
+                return lambda env: env.values[slot]
+            case 1:
+                return lambda env: env.enclosing.values[slot]
+            case 2:
+                return lambda env: env.enclosing.enclosing.values[slot]
+
+        def variable_at(env):
+            for _ in range(distance):
+                env = env.enclosing
+            return env.values[slot]
+        return variable_at
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        left = self.visit(expr.left)
+        right = self.visit(expr.right)
+        operator = expr.operator
+
+        # Mirrors Interpreter.visit(Binary), but the operator is matched once,
+        # at compile time, and operands are only checked when they are not
+        # already plain numbers.
+        match operator.type:
+            case TokenType.GREATER:
+                def greater(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a > b
+                    check_number_operands(operator, a, b)
+                return greater
+            case TokenType.GREATER_EQUAL:
+                def greater_equal(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a >= b
+                    check_number_operands(operator, a, b)
+                return greater_equal
+            case TokenType.LESS:
+                def less(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a < b
+                    check_number_operands(operator, a, b)
+                return less
+            case TokenType.LESS_EQUAL:
+                def less_equal(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a <= b
+                    check_number_operands(operator, a, b)
+                return less_equal
+
+            case TokenType.MINUS:
+                def subtract(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a - b
+                    check_number_operands(operator, a, b)
+                return subtract
+            case TokenType.PLUS:
+                def add(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a + b
+                    if type(a) is str and type(b) is str:
+                        return a + b
+                    if isinstance(a, (str, float)) and isinstance(b, (str, float)):
+                        return stringify(a) + stringify(b)
+                    raise PloxRuntimeError(operator,
+                                           "Operands must be two numbers or two strings, or either of each.")
+                return add
+            case TokenType.SLASH:
+                def divide(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float and b != 0.0:
+                        return a / b
+                    check_number_operands(operator, a, b)
+                return divide
+            case TokenType.STAR:
+                def multiply(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a * b
+                    check_number_operands(operator, a, b)
+                return multiply
+
+            case TokenType.BANG_EQUAL:
+                def not_equal(env):
+                    left(env)
+                    right(env)
+                    return False
+                return not_equal
+            case TokenType.EQUAL_EQUAL:
+                def equal(env):
+                    left(env)
+                    right(env)
+                    return True
+                return equal
+
+        # Unreachable
+        def unknown(env):
+            left(env)
+            right(env)
+        return unknown
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        callee = self.visit(expr.callee)
+        arguments = [self.visit(argument) for argument in expr.arguments]
+        paren = expr.paren
+        interpreter = self.interpreter
+
+        def call_generic(function, values):
+            if not isinstance(function, PloxCallable):
+                raise PloxRuntimeError(paren,
+                                       "Can only call functions and classes.")
+
+            if len(values) != function.arity():
+                raise PloxRuntimeError(paren,
+                                       f"Expected {function.arity()} arguments but got {len(values)}.")
+
+            return function.call(interpreter, values)
+
+        def call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            # Fast path for functions compiled by us: no ABC instance check
+            if function.__class__ in COMPILED_CALLABLES \
+               and len(values) == len(function.names):
+                return finish_call(function.body(frame(function, values)))
+
+            return call_generic(function, values)
+        return call
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        names = [param.lexeme for param in expr.params]
+        body = self.scoped_sequence(expr.body)
+        capture = self.capture(expr)
+        _, cells = self.interpreter.closures[expr]
+
+        def make_lambda(env):
+            return CompiledLambda(expr, capture(env), names, body, cells)
+        return make_lambda
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter that compiles each program to closures before running it."""
+
+    def __init__(self):
+        super().__init__(memoize=False)
+        self.compiler = ClosureCompiler(self)
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            program = self.compiler.compile(statements)
+
+            for statement in program:
+                completion = statement(self.globals)
+                if completion is not None:
+                    # Only 'break' can get here, top-level 'return' is
+                    # rejected by the resolver
+                    raise LoopBreakException(completion.token, BREAK_MESSAGE)
+        except PloxRuntimeError as error:
+            self.runtime_error(error)
+        finally:
+            self.output.flush()
+
+    def evaluate(self, expr: Expr):
+        return self.compiler.visit(expr)(self.globals)
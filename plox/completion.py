@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+from typing import Any
+from .token import Token
+from .exceptions import LoopBreakException
+
+# Abrupt statement completions, handed back as plain return values instead of
+# being raised. A statement that completes normally returns None; 'break' and
+# 'return' hand one of these up the chain of blocks until a loop or a function
+# call consumes it.
+
+class Completion:
+    __slots__ = ("token",)
+
+    def __init__(self, token: Token):
+        self.token = token
+
+class BreakCompletion(Completion):
+    __slots__ = ()
+
+class ReturnCompletion(Completion):
+    __slots__ = ("value",)
+
+    def __init__(self, token: Token, value: Any):
+        super().__init__(token)
+        self.value = value
+
+class TailCallCompletion(Completion):
+    """'return f(...)', with f not called yet so that its caller can loop
+    into it instead of growing the stack (see plox_callable.call_function)."""
+    __slots__ = ("function", "arguments")
+
+    def __init__(self, token: Token, function, arguments: list):
+        super().__init__(token)
+        self.function = function
+        self.arguments = arguments
+
+BREAK_MESSAGE = "'break' statements are only allowed inside loops."
+
+def finish_call(completion: Completion | None) -> Any:
+    """Return value of a function whose body completed with completion.
+
+    A 'break' that isn't inside a loop of the function's own escapes as an
+    exception, which the loop of a caller may catch.
+    """
+    if completion is None:
+        return None
+    if completion.__class__ is ReturnCompletion:
+        return completion.value
+    raise LoopBreakException(completion.token, BREAK_MESSAGE)
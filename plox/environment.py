@@ -3,16 +3,37 @@
 from plox.token import Token
 from typing import Self, Any
 
+# Locals live in a list per scope, at the slot the resolver gave them. Slots
+# are handed out in declaration order, and declarations run in that same order,
+# so defining a local is just an append and the list ends up exactly as long
+# as the scope has variables.
+#
+# Functions don't hang on to the Environment they were declared in. Their
+# closure is a flat Environment holding Cells for just the variables they
+# capture (see Resolver.upvalue), and captured locals live in those same Cells.
+#
+# Globals can't be resolved statically (the REPL, forward references from
+# functions), so they keep living in a dict, see GlobalEnvironment below.
+
+class Cell:
+    """A captured local, shared between its scope and the closures using it."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
 class Environment:
+    __slots__ = ("values", "enclosing")
+
     def __init__(self, enclosing: Self | None = None):
-        self.values = dict()
+        self.values: list = []
         self.enclosing = enclosing
 
     def define(self, name: str, value):
-        self.values[name] = value
+        self.values.append(value)
 
-    def get_at(self, distance: int, name: str):
-        return self.ancestor(distance).values.get(name)
+    def get_at(self, distance: int, slot: int):
+        return self.ancestor(distance).values[slot]
 
     def ancestor(self, distance: int):
         environment: Environment = self
@@ -21,6 +42,17 @@ class Environment:
 
         return environment
 
+    def assign_at(self, distance: int, slot: int, value: Any):
+        self.ancestor(distance).values[slot] = value
+
+class GlobalEnvironment:
+    def __init__(self):
+        self.values = dict()
+        self.enclosing = None
+
+    def define(self, name: str, value):
+        self.values[name] = value
+
     def assign(self, name: Token, value):
         from .interpreter import PloxRuntimeError
 
@@ -28,17 +60,9 @@ class Environment:
             self.values[name.lexeme] = value
             return
 
-            # CAVEAT: Redundant?
-            # if self.enclosing:
-            #     self.enclosing.assign(name, value)
-            #     return
-
         raise PloxRuntimeError(name,
                                f"Undefined variable {name.lexeme}.")
 
-    def assign_at(self, distance: int, name: Token, value: Any):
-        self.ancestor(distance).values[name.lexeme] = value
-
     def get(self, name: Token):
         from .interpreter import PloxRuntimeError, Uninitialized
 
@@ -48,8 +72,5 @@ class Environment:
                                        f"Uninitialized variable '{name.lexeme}'")
             return self.values[name.lexeme]
 
-        if self.enclosing:
-            return self.enclosing.get(name)
-
         raise PloxRuntimeError(name,
                                f"Undefined variable '{name.lexeme}'.")
@@ -1,63 +1,120 @@
 #!/usr/bin/env python3
 
-from abc import ABC
 from .token import Token
-from dataclasses import dataclass
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
-class Expr(ABC):
-    pass
+class Expr:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+    def replace(self, **changes) -> 'Expr':
+        """A copy with some fields changed, like dataclasses.replace()."""
+        values = [changes[name] if name in changes else getattr(self, name)
+                  for name in self.__slots__]
+        return self.__class__(*values)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Assign(Expr):
-    name: Token
-    value: Expr
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name: Token, value: Expr):
+        self.name = name
+        self.value = value
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.value)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Binary(Expr):
-    left: Expr
-    operator: Token
-    right: Expr
+    __slots__ = ('left', 'operator', 'right')
+
+    def __init__(self, left: Expr, operator: Token, right: Expr):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def __reduce__(self):
+        return self.__class__, (self.left, self.operator, self.right)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Call(Expr):
-    callee: Expr
-    paren: Token
-    arguments: list[Expr]
+    __slots__ = ('callee', 'paren', 'arguments')
+
+    def __init__(self, callee: Expr, paren: Token, arguments: list[Expr]):
+        self.callee = callee
+        self.paren = paren
+        self.arguments = arguments
+
+    def __reduce__(self):
+        return self.__class__, (self.callee, self.paren, self.arguments)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Grouping(Expr):
-    expression: Expr
+    __slots__ = ('expression',)
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def __reduce__(self):
+        return self.__class__, (self.expression,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Literal(Expr):
-    value: object
+    __slots__ = ('value',)
+
+    def __init__(self, value: object):
+        self.value = value
+
+    def __reduce__(self):
+        return self.__class__, (self.value,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Logical(Expr):
-    left: Expr
-    operator: Token
-    right: Expr
+    __slots__ = ('left', 'operator', 'right')
+
+    def __init__(self, left: Expr, operator: Token, right: Expr):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def __reduce__(self):
+        return self.__class__, (self.left, self.operator, self.right)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Unary(Expr):
-    operator: Token
-    right: Expr
+    __slots__ = ('operator', 'right')
+
+    def __init__(self, operator: Token, right: Expr):
+        self.operator = operator
+        self.right = right
+
+    def __reduce__(self):
+        return self.__class__, (self.operator, self.right)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Ternary(Expr):
-    operator: Token
-    condition: Expr
-    left: Expr
-    right: Expr
+    __slots__ = ('operator', 'condition', 'left', 'right')
+
+    def __init__(self, operator: Token, condition: Expr, left: Expr, right: Expr):
+        self.operator = operator
+        self.condition = condition
+        self.left = left
+        self.right = right
+
+    def __reduce__(self):
+        return self.__class__, (self.operator, self.condition, self.left, self.right)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Variable(Expr):
-    name: Token
+    __slots__ = ('name',)
+
+    def __init__(self, name: Token):
+        self.name = name
+
+    def __reduce__(self):
+        return self.__class__, (self.name,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Lambda(Expr):
-    token: Token
-    params: list[Token]
-    body: 'list[Stmt]'
+    __slots__ = ('token', 'params', 'body')
+
+    def __init__(self, token: Token, params: list[Token], body: 'list[Stmt]'):
+        self.token = token
+        self.params = params
+        self.body = body
+
+    def __reduce__(self):
+        return self.__class__, (self.token, self.params, self.body)
 
@@ -9,27 +9,58 @@ def get_writer(f):
         print( (indent * 4 * " " ) + line, file=f)
     return writer
 
-# NOTE: I can just as well replace all this nonsense with dataclasses.make_dataclasses()
+# Nodes are plain classes with __slots__ rather than dataclasses: no
+# __dict__ per node, and an __init__ that only stores its arguments, where a
+# frozen dataclass goes through object.__setattr__() for every field.
+# Equality and hashing are object's, by identity: nodes are used as dictionary
+# keys (e.g. Interpreter.locals), and hashing them by value fails on nodes
+# holding lists and is slow on everything else.
+
+def define_base(writer: Callable, base_name: str):
+    write = writer
 
-DATACLASS_DECORATOR="@dataclass(eq=False, frozen=True, unsafe_hash=True)"
+    write(f"class {base_name}:")
+    write("__slots__ = ()", 1)
+    write()
+    write("def __repr__(self) -> str:", 1)
+    write('fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)', 2)
+    write('return f"{self.__class__.__name__}({fields})"', 2)
+    write()
+    write(f"def replace(self, **changes) -> '{base_name}':", 1)
+    write('"""A copy with some fields changed, like dataclasses.replace()."""', 2)
+    write("values = [changes[name] if name in changes else getattr(self, name)", 2)
+    write("  for name in self.__slots__]", 4)
+    write("return self.__class__(*values)", 2)
+    write()
 
 def define_type(writer: Callable, base_name: str, class_name: str, field_str: str):
     write = writer
 
     fields = [x.strip() for x in field_str.split(",")]
+    names: list[str] = []
+    parameters: list[str] = []
+
+    for field in fields:
+        if "=" in field:
+            field_type, field_name, _, default_value = field.split(" ")
+            parameters.append(f"{field_name}: {field_type} = {default_value}")
+        else:
+            field_type, field_name = field.split(" ")
+            parameters.append(f"{field_name}: {field_type}")
+        names.append(field_name)
 
-    write(DATACLASS_DECORATOR)
     write(f"class {class_name}({base_name}):")
-    if len(fields) >= 1:
-        for field in fields:
-            if "=" in field:
-                field_type, field_name, _, default_value = field.split(" ")
-                write(f"{field_name}: {field_type} = {default_value}", 1)
-            else:
-                field_type, field_name = field.split(" ")
-                write(f"{field_name}: {field_type}", 1)
-    else:
-        write(f"pass", 1)
+    write(f"__slots__ = {tuple(names)!r}", 1)
+    write()
+    write(f"def __init__(self, {', '.join(parameters)}):", 1)
+    for name in names:
+        write(f"self.{name} = {name}", 2)
+    write()
+    # Pickled as a call to the constructor (see program_cache.py), several
+    # times faster than the default for classes with __slots__
+    values = ", ".join(f"self.{name}" for name in names)
+    write("def __reduce__(self):", 1)
+    write(f"return self.__class__, ({values}{',' if len(names) == 1 else ''})", 2)
     write()
 
 def define_ast(output_dir: Path, base_name: str, types: list[str],
@@ -40,17 +71,12 @@ def define_ast(output_dir: Path, base_name: str, types: list[str],
         write = get_writer(f)
         write("#!/usr/bin/env python3")
         write()
-        write("from abc import ABC")
         write("from .token import Token")
-        write("from dataclasses import dataclass")
         if imports:
             for i in imports:
                 write(i)
         write()
-        write(DATACLASS_DECORATOR)
-        write(f"class {base_name}(ABC):")
-        write(f"pass", 1)
-        write()
+        define_base(write, base_name)
 
         for type in types:
             class_name, fields = [s.strip() for s in type.split(":")]
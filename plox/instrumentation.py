@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+# Execution counters for the tree-walker (--counters).
+#
+# InstrumentedInterpreter counts into its Counters how many times each node
+# runs, how many Environments it allocates, how far up the chain of them it
+# has to go for a variable, how many exceptions it raises to unwind the
+# stack, and how many calls it makes, natives apart. They can be read off
+# Counters as they are, or written out as JSON or in the Prometheus text
+# format.
+#
+# Like CallGraphInterpreter, only InstrumentedInterpreter pays for any of
+# this, the Interpreter itself is left as it is.
+
+import json
+from typing import Any, TextIO
+
+from .interpreter import Interpreter
+from .exceptions import LoopBreakException, PloxReturnException
+from .environment import Environment
+from .profiler import node_line
+from .token import Token
+from .expr import *
+from .stmt import *
+from .visitor import visitor
+
+COUNTERS_FORMATS = ("json", "prometheus")
+
+# Raised for control flow rather than errors
+CONTROL_FLOW_EXCEPTIONS = (LoopBreakException, PloxReturnException)
+
+def node_type(node: Expr | Stmt) -> str:
+    """Name of the type of node, as generated (and not quickened, say)."""
+    for cls in node.__class__.__mro__:
+        if cls.__module__ in (Expr.__module__, Stmt.__module__):
+            return cls.__name__
+    return node.__class__.__name__
+
+class Counters:
+    def __init__(self):
+        # Executions of each node
+        self.nodes: dict[Expr | Stmt, int] = {}
+        self.environments = 0
+        # Longest way up the chain of Environments to a variable, and the
+        # whole way up for all of them
+        self.max_depth = 0
+        self.hops = 0
+        self.control_flow_exceptions = 0
+        self.calls = 0
+        self.native_calls = 0
+
+    def node_types(self) -> dict[str, int]:
+        """Executions of each type of node."""
+        types: dict[str, int] = {}
+        for node, count in self.nodes.items():
+            name = node_type(node)
+            types[name] = types.get(name, 0) + count
+        return types
+
+    def hottest(self, limit: int | None = None) -> list[tuple[Expr | Stmt, int]]:
+        """Nodes by executions, most first."""
+        return sorted(self.nodes.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def totals(self) -> dict[str, int]:
+        return {
+            "environments": self.environments,
+            "max_environment_depth": self.max_depth,
+            "environment_hops": self.hops,
+            "control_flow_exceptions": self.control_flow_exceptions,
+            "calls": self.calls,
+            "native_calls": self.native_calls,
+        }
+
+    def write_json(self, file: TextIO, limit: int | None = None):
+        """Totals, executions by type and the limit hottest nodes (all of
+        them for None)."""
+        json.dump({
+            **self.totals(),
+            "node_types": self.node_types(),
+            "nodes": [{"type": node_type(node), "line": node_line(node), "count": count}
+                      for node, count in self.hottest(limit)],
+        }, file, indent=2)
+        file.write("\n")
+
+    def write_prometheus(self, file: TextIO):
+        def metric(name: str, kind: str, help: str, samples: list[tuple[str, int]]):
+            file.write(f"# HELP plox_{name} {help}\n# TYPE plox_{name} {kind}\n")
+            for labels, value in samples:
+                file.write(f"plox_{name}{labels} {value}\n")
+
+        metric("node_executions_total", "counter", "Executions of AST nodes, by type.",
+               [(f'{{type="{name}"}}', count)
+                for name, count in sorted(self.node_types().items())])
+        metric("environments_total", "counter", "Environments allocated.",
+               [("", self.environments)])
+        metric("environment_max_depth", "gauge",
+               "Longest way up the chain of environments to a variable.",
+               [("", self.max_depth)])
+        metric("environment_hops_total", "counter",
+               "Steps up the chain of environments to variables.",
+               [("", self.hops)])
+        metric("control_flow_exceptions_total", "counter",
+               "Exceptions raised for control flow.",
+               [("", self.control_flow_exceptions)])
+        metric("calls_total", "counter", "Calls, by kind of callee.",
+               [('{kind="lox"}', self.calls - self.native_calls),
+                ('{kind="native"}', self.native_calls)])
+
+    def write(self, file: TextIO, format: str = "json"):
+        if format not in COUNTERS_FORMATS:
+            raise ValueError(f"Unknown counters format {format!r}.")
+        if format == "json":
+            self.write_json(file)
+        else:
+            self.write_prometheus(file)
+
+class InstrumentedInterpreter(Interpreter):
+    """Interpreter counting what it does into counters."""
+
+    def __init__(self, counters: Counters | None = None, **options):
+        super().__init__(**options)
+        self.counters = counters if counters is not None else Counters()
+        # Last exception counted, as it makes its way up through calls
+        self.unwinding: Exception | None = None
+
+    def execute(self, stmt: Stmt):
+        nodes = self.counters.nodes
+        nodes[stmt] = nodes.get(stmt, 0) + 1
+        return self.visit(stmt)
+
+    def evaluate(self, expr: Expr):
+        nodes = self.counters.nodes
+        nodes[expr] = nodes.get(expr, 0) + 1
+        return self.visit(expr)
+
+    def execute_block(self, statements: list[Stmt], environment: Environment):
+        # Blocks and calls alike run in an Environment of their own
+        self.counters.environments += 1
+        return super().execute_block(statements, environment)
+
+    def capture(self, function: Function | Lambda) -> Environment:
+        self.counters.environments += 1
+        captures, _ = self.closures[function]
+        for distance, _ in captures:
+            self.walk(distance)
+        return super().capture(function)
+
+    def walk(self, distance: int):
+        counters = self.counters
+        counters.hops += distance
+        if distance > counters.max_depth:
+            counters.max_depth = distance
+
+    def look_up_variable(self, name: Token, expr: Expr) -> Any:
+        address = self.addresses.get(expr)
+        if address is not None:
+            self.walk(address[0])
+        return super().look_up_variable(name, expr)
+
+    def assign(self, expr: Assign, value: Any) -> Any:
+        address = self.addresses.get(expr)
+        if address is not None:
+            self.walk(address[0])
+        return super().assign(expr, value)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        function, arguments = self.evaluate_call(expr)
+        counters = self.counters
+        counters.calls += 1
+        if not hasattr(function, "declaration"):
+            counters.native_calls += 1
+
+        try:
+            return function.call(self, arguments)
+        except CONTROL_FLOW_EXCEPTIONS as exception:
+            if exception is not self.unwinding:
+                counters.control_flow_exceptions += 1
+                self.unwinding = exception
+            raise
@@ -1,13 +1,18 @@
 #!/usr/bin/env python
 
 from .exceptions import *
-from .plox_callable import PloxCallable, PloxFunction, PloxLambda
-from .environment import Environment
+from .completion import BreakCompletion, ReturnCompletion, \
+    TailCallCompletion, BREAK_MESSAGE
+from .plox_callable import PloxCallable, PloxFunction, PloxLambda, \
+    MemoizedFunction, MemoizedLambda, CallSite, Memo, MEMO_SIZE, TAIL_CALLABLES
+from .environment import Environment, GlobalEnvironment, Cell
 from .error import runtime_error
+from .output import Output
+from .quickening import *
 from .token import Token, TokenType
 from .expr import *
 from .stmt import *
-from .visitor import visitor
+from .visitor import visitor, visits
 
 from typing import Any
 
@@ -38,7 +43,7 @@ def check_number_operand(operator: Token, operand):
 # Binary checker
 def check_number_operands(operator: Token, left, right):
     if isinstance(left, float) and isinstance(right, float):
-        if math.isclose(right, 0.0) and operator.type == TokenType.SLASH:
+        if operator.type == TokenType.SLASH and math.isclose(right, 0.0):
             raise PloxRuntimeError(operator, "Attempting division by zero.")
         return
     raise PloxRuntimeError(operator, f"Token: {operator}\nLeft: {left}\nRight: {right}\nOperands must be numbers.")
@@ -58,12 +63,31 @@ def stringify(obj):
 
 Uninitialized = object()
 
+# Ternary is parsed but not supported yet
+@visits(Expr, Stmt, exclude=(Ternary,))
 class Interpreter:
-    def __init__(self):
-        self.globals = Environment()
+    def __init__(self, tail_calls: bool = False, memoize: bool = False,
+                 memo_size: int = MEMO_SIZE):
+        self.globals = GlobalEnvironment()
         self.environment = self.globals
+        # Run 'return f(...)' in constant stack space
+        self.tail_calls = tail_calls
+        # Results of pure functions (see purity.py), None to always call them
+        self.memo: Memo | None = Memo(memo_size) if memoize else None
 
+        # Scope depth of every local variable use, as seen in the source
         self.locals: dict[Expr, int] = dict()
+        # Where the same uses find their value at run time: (distance, slot,
+        # whether the slot holds a Cell)
+        self.addresses: dict[Expr, tuple[int, int, bool]] = dict()
+        # Declarations of locals captured by some function, kept in Cells
+        self.cells: set[Stmt] = set()
+        # What each function captures, and which of its parameters are captured
+        self.closures: dict[Function | Lambda, tuple[list, tuple]] = dict()
+        # Inline caches of the calls run so far
+        self.call_sites: dict[Call, CallSite] = dict()
+        # Where 'print' goes
+        self.output: Output = Output()
 
         # DONE: Finish this ungodly abomination
         # https://stackoverflow.com/q/1123000
@@ -86,23 +110,85 @@ class Interpreter:
     def interpret(self, statements: list[Stmt]):
         try:
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    # Only 'break' can get here, top-level 'return' is
+                    # rejected by the resolver
+                    raise LoopBreakException(completion.token, BREAK_MESSAGE)
         except PloxRuntimeError as error:
-            runtime_error(error)
+            self.runtime_error(error)
+        finally:
+            self.output.flush()
+
+    def runtime_error(self, error: PloxRuntimeError):
+        # After what the program printed up to the error
+        self.output.flush()
+        runtime_error(error)
 
+    # Statements return None, or a Completion for 'break' and 'return' (see
+    # completion.py) which blocks pass up until a loop or call consumes it
     def execute(self, stmt: Stmt):
-        self.visit(stmt)
+        return self.visit(stmt)
 
-    def resolve(self, expr: Expr, depth: int):
+    def resolve(self, expr: Expr, depth: int, address: tuple[int, int, bool]):
         self.locals[expr] = depth
+        self.addresses[expr] = address
+
+    def resolve_cell(self, declaration: Stmt):
+        self.cells.add(declaration)
+
+    def resolve_closure(self, function: Function | Lambda,
+                        captures: list[tuple[int, int]], cells: tuple[int, ...]):
+        self.closures[function] = (captures, cells)
+
+    def relocate(self, old: Expr | Stmt, new: Expr | Stmt):
+        """Carry over what the resolver recorded about a node to a rewritten copy."""
+        for table in (self.locals, self.addresses, self.closures):
+            if old in table:
+                table[new] = table.pop(old)
+
+        if old in self.cells:
+            self.cells.remove(old)
+            self.cells.add(new)
+
+    def forget(self, statements: list[Stmt]):
+        """Drop what the tables hold about top-level statements that have run
+        and won't run again, except for the functions they declare."""
+        nodes: list = list(statements)
+        while nodes:
+            node = nodes.pop()
+            self.locals.pop(node, None)
+            self.addresses.pop(node, None)
+            self.call_sites.pop(node, None)
+            self.cells.discard(node)
+
+            if isinstance(node, (Function, Lambda)):
+                continue
+
+            for name in node.__slots__:
+                value = getattr(node, name)
+                if isinstance(value, (Expr, Stmt)):
+                    nodes.append(value)
+                elif isinstance(value, list):
+                    nodes.extend(value)
+
+    def capture(self, function: Function | Lambda) -> Environment:
+        """Build the flat closure of a function declared in the current scope."""
+        captures, _ = self.closures[function]
+        closure = Environment()
+        closure.values = [self.environment.get_at(distance, slot)
+                          for distance, slot in captures]
+        return closure
 
     # Keep this for now
     def interpret_single_expr(self, expression: Expr):
         try:
             value = self.evaluate(expression)
-            print(stringify(value))
+            self.output.print(stringify(value))
         except PloxRuntimeError as error:
-            runtime_error(error)
+            self.runtime_error(error)
+        finally:
+            self.output.flush()
 
     def evaluate(self, expr: Expr):
         return self.visit(expr)
@@ -111,7 +197,7 @@ class Interpreter:
 
     @visitor(Block)
     def visit(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        return self.execute_block(stmt.statements, Environment(self.environment))
 
     def execute_block(self, statements: list[Stmt],
                       environment: Environment):
@@ -121,7 +207,9 @@ class Interpreter:
             self.environment = environment
 
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
 
         finally:
             self.environment = previous
@@ -133,23 +221,37 @@ class Interpreter:
 
     @visitor(Function)
     def visit(self, stmt: Function):
-        function: PloxFunction = PloxFunction(stmt, self.environment)
-        self.environment.define(stmt.name.lexeme, function)
+        cell = None
+        if stmt in self.cells:
+            # The function may capture itself, so the Cell goes first
+            cell = Cell(Uninitialized)
+            self.environment.define(stmt.name.lexeme, cell)
+
+        _, cells = self.closures[stmt]
+        if self.memo is not None and stmt in self.memo.functions:
+            function = MemoizedFunction(stmt, self.capture(stmt), cells, self.memo)
+        else:
+            function = PloxFunction(stmt, self.capture(stmt), cells)
+
+        if cell:
+            cell.value = function
+        else:
+            self.environment.define(stmt.name.lexeme, function)
         return None
 
     @visitor(If)
     def visit(self, stmt: If):
         if is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
         return None
 
     @visitor(Print)
     def visit(self, stmt: Print):
         value = self.evaluate(stmt.expression)
-        print(stringify(value))
+        self.output.print(stringify(value))
         return None
 
     @visitor(Return)
@@ -157,12 +259,26 @@ class Interpreter:
         value = None
 
         if stmt.value:
-            value = self.evaluate(stmt.value)
+            if self.tail_calls and stmt.value.__class__ is Call:
+                function, arguments = self.evaluate_call(stmt.value)
+                if function.__class__ in TAIL_CALLABLES:
+                    return TailCallCompletion(stmt.keyword, function, arguments)
+                value = function.call(self, arguments)
+            else:
+                value = self.evaluate(stmt.value)
 
-        raise PloxReturnException(value, stmt.keyword)
+        return ReturnCompletion(stmt.keyword, value)
 
     @visitor(Var)
     def visit(self, stmt: Var):
+        if stmt in self.cells:
+            # Functions in the initializer may capture the variable itself
+            cell = Cell(Uninitialized)
+            self.environment.define(stmt.name.lexeme, cell)
+            if stmt.initializer != None:
+                cell.value = self.evaluate(stmt.initializer)
+            return None
+
         # Use unique value instead of None to catch uninitialised variables
         value = Uninitialized
         if stmt.initializer != None:
@@ -176,25 +292,36 @@ class Interpreter:
     def visit(self, stmt: While):
         while is_truthy(self.evaluate(stmt.condition)):
             try:
-                self.execute(stmt.body)
+                completion = self.execute(stmt.body)
             except LoopBreakException:
+                # A 'break' escaping from a function called in the body
                 return None
 
+            if completion is not None:
+                if completion.__class__ is BreakCompletion:
+                    return None
+                return completion
+
         return None
 
     @visitor(Break)
     def visit(self, stmt: Break):
-        raise LoopBreakException(stmt.token, "'break' statements are only allowed inside loops.")
+        return BreakCompletion(stmt.token)
 
     # Expression methods (superclass Expr)
 
     @visitor(Assign)
     def visit(self, expr: Assign):
-        value = self.evaluate(expr.value)
-
-        distance: int | None = self.locals.get(expr)
-        if distance != None:
-            self.environment.assign_at(distance, expr.name, value)
+        return self.assign(expr, self.evaluate(expr.value))
+
+    def assign(self, expr: Assign, value: Any) -> Any:
+        address = self.addresses.get(expr)
+        if address != None:
+            distance, slot, cell = address
+            if cell:
+                self.environment.get_at(distance, slot).value = value
+            else:
+                self.environment.assign_at(distance, slot, value)
         else:
             self.globals.assign(expr.name, value)
 
@@ -222,8 +349,9 @@ class Interpreter:
 
     @visitor(Unary)
     def visit(self, expr: Unary):
-        right = self.evaluate(expr.right)
+        return self.unary(expr, self.evaluate(expr.right))
 
+    def unary(self, expr: Unary, right: Any) -> Any:
         match expr.operator.type:
             case TokenType.MINUS:
                 check_number_operand(expr.operator, right)
@@ -239,9 +367,12 @@ class Interpreter:
         return self.look_up_variable(expr.name, expr)
 
     def look_up_variable(self, name: Token, expr: Expr) -> Any:
-        distance: int | None = self.locals.get(expr)
-        if distance != None:
-            returned_var = self.environment.get_at(distance, name.lexeme)
+        address = self.addresses.get(expr)
+        if address != None:
+            distance, slot, cell = address
+            returned_var = self.environment.get_at(distance, slot)
+            if cell:
+                return returned_var.value
             return returned_var
         else:
             return self.globals.get(name)
@@ -250,29 +381,114 @@ class Interpreter:
     def visit(self, expr: Binary):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
+        value = self.binary(expr, left, right)
+
+        if expr.__class__ is Binary:
+            # First time through, see quickening.py
+            expr.__class__ = QUICKENED.get(
+                (expr.operator.type, left.__class__, right.__class__), GenericBinary)
+        return value
+
+    def deoptimize(self, expr: QuickenedBinary, left: Any, right: Any) -> Any:
+        expr.__class__ = GenericBinary
+        return self.binary(expr, left, right)
+
+    @visitor(AddNumbers)
+    def visit(self, expr: AddNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left + right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(ConcatenateStrings)
+    def visit(self, expr: ConcatenateStrings):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is str and right.__class__ is str:
+            return left + right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(SubtractNumbers)
+    def visit(self, expr: SubtractNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left - right
+        return self.deoptimize(expr, left, right)
 
+    @visitor(MultiplyNumbers)
+    def visit(self, expr: MultiplyNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left * right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(DivideNumbers)
+    def visit(self, expr: DivideNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        # Division by zero is left to the generic code to report
+        if left.__class__ is float and right.__class__ is float and right != 0.0:
+            return left / right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(GreaterNumbers)
+    def visit(self, expr: GreaterNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left > right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(GreaterEqualNumbers)
+    def visit(self, expr: GreaterEqualNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left >= right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(LessNumbers)
+    def visit(self, expr: LessNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left < right
+        return self.deoptimize(expr, left, right)
+
+    @visitor(LessEqualNumbers)
+    def visit(self, expr: LessEqualNumbers):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left <= right
+        return self.deoptimize(expr, left, right)
+
+    def binary(self, expr: Binary, left: Any, right: Any) -> Any:
         match expr.operator.type:
             case TokenType.GREATER:
                 check_number_operands(expr.operator, left, right)
-                return float(left) > float(right)
+                return left > right
             case TokenType.GREATER_EQUAL:
                 check_number_operands(expr.operator, left, right)
-                return float(left) >= float(right)
+                return left >= right
             case TokenType.LESS:
                 check_number_operands(expr.operator, left, right)
-                return float(left) < float(right)
+                return left < right
             case TokenType.LESS_EQUAL:
                 check_number_operands(expr.operator, left, right)
-                return float(left) <= float(right)
+                return left <= right
 
             case TokenType.MINUS:
                 check_number_operands(expr.operator, left, right)
-                return float(left) - float(right)
+                return left - right
             case TokenType.PLUS:
                 if isinstance(left, float) and isinstance(right, float):
-                    return float(left) + float(right)
+                    return left + right
                 if isinstance(left, str) and isinstance(right, str):
-                    return str(left) + str(right)
+                    return left + right
                 # If left and right are either but not the same
                 if isinstance(left, (str, float)) and isinstance(right, (str, float)):
                     return stringify(left) + stringify(right)
@@ -280,10 +496,10 @@ class Interpreter:
                                        "Operands must be two numbers or two strings, or either of each.")
             case TokenType.SLASH:
                 check_number_operands(expr.operator, left, right)
-                return float(left) / float(right)
+                return left / right
             case TokenType.STAR:
                 check_number_operands(expr.operator, left, right)
-                return float(left) * float(right)
+                return left * right
 
             case TokenType.BANG_EQUAL: return False
             case TokenType.EQUAL_EQUAL: return True
@@ -293,13 +509,26 @@ class Interpreter:
 
     @visitor(Call)
     def visit(self, expr: Call):
+        function, arguments = self.evaluate_call(expr)
+        return function.call(self, arguments)
+
+    def evaluate_call(self, expr: Call) -> tuple[PloxCallable, list]:
+        """Evaluate the callee and arguments of a call, checking they fit."""
         callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
 
-        arguments = []
+        return self.check_call(expr, callee, arguments)
 
-        argument: Expr
-        for argument in expr.arguments:
-            arguments.append(self.evaluate(argument))
+    def check_call(self, expr: Call, callee: Any,
+                   arguments: list) -> tuple[PloxCallable, list]:
+        site = self.call_sites.get(expr)
+        if site is None:
+            site = self.call_sites[expr] = CallSite()
+        elif callee in site.callees:
+            site.hits += 1
+            return callee, arguments
+
+        site.misses += 1
 
         if not isinstance(callee, PloxCallable):
             raise PloxRuntimeError(expr.paren,
@@ -313,16 +542,38 @@ class Interpreter:
         # - I have no idea what the class hierarchy might look like, anyway
         function: PloxCallable = callee
 
-        if len(arguments) != function.arity():
+        arity = function.arity()
+        if len(arguments) != arity:
             raise PloxRuntimeError(expr.paren,
-                                   f"Expected {function.arity()} arguments but got {len(arguments)}.")
+                                   f"Expected {arity} arguments but got {len(arguments)}.")
 
-        return function.call(self, arguments)
+        site.add(function)
+        return function, arguments
+
+    def memo_stats(self) -> dict[str, int | float] | None:
+        """Memo counters, or None when memoization is off."""
+        return self.memo.stats() if self.memo is not None else None
+
+    def call_stats(self) -> dict[str, int | float]:
+        """Inline cache counters, summed over every call site."""
+        hits = sum(site.hits for site in self.call_sites.values())
+        misses = sum(site.misses for site in self.call_sites.values())
+        calls = hits + misses
+
+        return {
+            "sites": len(self.call_sites),
+            "megamorphic": sum(site.megamorphic for site in self.call_sites.values()),
+            "calls": calls,
+            "hits": hits,
+            "hit_rate": hits / calls if calls else 0.0,
+        }
 
     @visitor(Lambda)
     def visit(self, expr: Lambda):
-        function: PloxLambda = PloxLambda(expr, self.environment)
-        return function
+        _, cells = self.closures[expr]
+        if self.memo is not None and expr in self.memo.functions:
+            return MemoizedLambda(expr, self.capture(expr), cells, self.memo)
+        return PloxLambda(expr, self.capture(expr), cells)
 
     # TODO: Interpret Ternary operator
     # TODO: Interpret ',' sequence operator
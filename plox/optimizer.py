@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+# AST optimizer, run between the Resolver and the interpreter (plox -O):
+#   - folds Unary, Binary and Logical expressions over literals
+#   - drops If branches and While loops whose condition is a literal
+#   - removes Grouping nodes, which only matter to the parser
+#
+# Anything that would raise a runtime error (e.g. -"a", 1 / 0) is left alone,
+# so that it still fails at run time, on the same line.
+#
+# There's no algebraic simplification like 'x * 1' -> 'x': without knowing
+# the type of x, that could turn a runtime error into a value, and 'x + 0'
+# concatenates when x is a string.
+#
+# Nodes are never changed in place, so changed nodes are copied, and whatever
+# the resolver recorded about the originals is moved over (see
+# Interpreter.relocate).
+
+import math
+
+from .interpreter import Interpreter, is_truthy, stringify
+from .token import Token, TokenType
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+# Returned by fold_binary() for operations that can't be done ahead of time
+NOT_CONSTANT = object()
+
+def fold_binary(operator: Token, left, right):
+    """Value of a Binary over two literal values, as Interpreter.visit(Binary) computes it."""
+    numbers = type(left) is float and type(right) is float
+
+    match operator.type:
+        case TokenType.GREATER if numbers:
+            return left > right
+        case TokenType.GREATER_EQUAL if numbers:
+            return left >= right
+        case TokenType.LESS if numbers:
+            return left < right
+        case TokenType.LESS_EQUAL if numbers:
+            return left <= right
+        case TokenType.MINUS if numbers:
+            return left - right
+        case TokenType.STAR if numbers:
+            return left * right
+        case TokenType.SLASH if numbers and not math.isclose(right, 0.0):
+            return left / right
+        case TokenType.PLUS:
+            if numbers or (type(left) is str and type(right) is str):
+                return left + right
+            if isinstance(left, (str, float)) and isinstance(right, (str, float)):
+                return stringify(left) + stringify(right)
+        case TokenType.BANG_EQUAL:
+            return False
+        case TokenType.EQUAL_EQUAL:
+            return True
+
+    return NOT_CONSTANT
+
+def count_nodes(node) -> int:
+    if isinstance(node, list):
+        return sum(count_nodes(child) for child in node)
+    if not isinstance(node, (Expr, Stmt)):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, name)) for name in node.__slots__)
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class Optimizer:
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        # Total over every program optimized so far
+        self.removed = 0
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized = self.statements(statements)
+        self.removed += count_nodes(statements) - count_nodes(optimized)
+        return optimized
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized = (self.visit(statement) for statement in statements)
+        return [statement for statement in optimized if statement is not None]
+
+    def statement(self, stmt: Stmt) -> Stmt:
+        """Optimize a statement that can't just disappear, like a loop body."""
+        optimized = self.visit(stmt)
+        return Block([]) if optimized is None else optimized
+
+    def replace(self, node, **changes):
+        """Copy of node with changes, or node itself if nothing changed."""
+        if all(getattr(node, name) is value for name, value in changes.items()):
+            return node
+
+        optimized = node.replace(**changes)
+        self.interpreter.relocate(node, optimized)
+        return optimized
+
+    # Statements return None when they can be removed altogether
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        statements = self.statements(stmt.statements)
+        if statements == stmt.statements:
+            return stmt
+        return Block(statements)
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        return self.replace(stmt, expression=self.visit(stmt.expression))
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        body = self.statements(stmt.body)
+        if body == stmt.body:
+            return stmt
+        return self.replace(stmt, body=body)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        condition = self.visit(stmt.condition)
+
+        if isinstance(condition, Literal):
+            if is_truthy(condition.value):
+                return self.visit(stmt.then_branch)
+            if stmt.else_branch:
+                return self.visit(stmt.else_branch)
+            return None
+
+        return self.replace(stmt, condition=condition,
+                            then_branch=self.statement(stmt.then_branch),
+                            else_branch=stmt.else_branch and self.statement(stmt.else_branch))
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        return self.replace(stmt, expression=self.visit(stmt.expression))
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        if not stmt.value:
+            return stmt
+        return self.replace(stmt, value=self.visit(stmt.value))
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        if stmt.initializer == None:
+            return stmt
+        return self.replace(stmt, initializer=self.visit(stmt.initializer))
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        condition = self.visit(stmt.condition)
+
+        if isinstance(condition, Literal) and not is_truthy(condition.value):
+            return None
+
+        return self.replace(stmt, condition=condition,
+                            body=self.statement(stmt.body))
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        return stmt
+
+    # Expressions
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        return self.replace(expr, value=self.visit(expr.value))
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        return expr
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        left = self.visit(expr.left)
+        right = self.visit(expr.right)
+
+        if isinstance(left, Literal):
+            # Logical operators return an operand, not a boolean
+            if expr.operator.type == TokenType.OR:
+                return left if is_truthy(left.value) else right
+            return right if is_truthy(left.value) else left
+
+        return self.replace(expr, left=left, right=right)
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        return self.visit(expr.expression)
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        right = self.visit(expr.right)
+
+        if isinstance(right, Literal):
+            match expr.operator.type:
+                case TokenType.MINUS if type(right.value) is float:
+                    return Literal(-right.value)
+                case TokenType.BANG:
+                    return Literal(not is_truthy(right.value))
+
+        return self.replace(expr, right=right)
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        return expr
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        left = self.visit(expr.left)
+        right = self.visit(expr.right)
+
+        if isinstance(left, Literal) and isinstance(right, Literal):
+            value = fold_binary(expr.operator, left.value, right.value)
+            if value is not NOT_CONSTANT:
+                return Literal(value)
+
+        return self.replace(expr, left=left, right=right)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        callee = self.visit(expr.callee)
+        arguments = [self.visit(argument) for argument in expr.arguments]
+
+        if arguments == expr.arguments:
+            arguments = expr.arguments
+        return self.replace(expr, callee=callee, arguments=arguments)
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        body = self.statements(expr.body)
+        if body == expr.body:
+            return expr
+        return self.replace(expr, body=body)
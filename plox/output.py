@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Where 'print' statements go (Interpreter.output): every engine hands the
+# lines its program prints to an Output, which buffers them and writes them
+# out in big chunks rather than one print() call each.
+#
+# When the buffer is written out depends on the flush policy:
+#   "line"  after every line, which is what a terminal should see
+#   "size"  once buffer_size bytes or so are waiting
+#   "exit"  only when the program is done
+# Whatever the policy, Interpreter.interpret() flushes when it's done with a
+# program, and before it reports a runtime error, so that what a program
+# printed comes out in one piece and in order with everything else.
+#
+# Unless told otherwise, an Output writes to whatever sys.stdout is when it
+# flushes, so that contextlib.redirect_stdout() still works. A real file goes
+# straight to its file descriptor, bypassing the TextIOWrapper in between.
+
+import io
+import os
+import sys
+
+FLUSH_POLICIES = ("line", "size", "exit")
+
+# Default buffer size, in characters
+BUFFER_SIZE = 256 * 1024
+
+class Output:
+    def __init__(self, file: int | io.IOBase | None = None,
+                 flush: str | None = None, buffer_size: int = BUFFER_SIZE):
+        """file is a file descriptor, a text or binary file, or None for
+        sys.stdout. flush is one of FLUSH_POLICIES, or None for "line" on a
+        terminal and "size" otherwise."""
+        if flush is not None and flush not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy {flush!r}.")
+
+        self.file = file
+        self.policy = flush
+        self.buffer_size = buffer_size
+        self.lines: list[str] = []
+        self.size = 0
+        # How much can wait in lines, as the policy has it
+        self.limit = self.buffer_limit()
+
+    def print(self, text: str):
+        self.lines.append(text)
+        self.size += len(text) + 1
+        if self.size > self.limit:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append("")
+            text = "\n".join(self.lines)
+            self.lines.clear()
+            self.size = 0
+            self.write(text)
+        if self.policy is None:
+            # sys.stdout may have been redirected since
+            self.limit = self.buffer_limit()
+
+    def write(self, text: str):
+        file = self.file if self.file is not None else sys.stdout
+
+        if isinstance(file, int):
+            return write_fd(file, text.encode("utf-8", "surrogateescape"))
+
+        if isinstance(file, io.TextIOBase):
+            try:
+                fd = file.fileno()
+            except (OSError, ValueError):
+                # Like a StringIO
+                file.write(text)
+                return
+            # Anything print()ed before goes first
+            file.flush()
+            return write_fd(fd, text.encode(file.encoding or "utf-8",
+                                            file.errors or "strict"))
+
+        file.write(text.encode("utf-8", "surrogateescape"))
+        file.flush()
+
+    def buffer_limit(self) -> int:
+        policy = self.policy or ("line" if self.isatty() else "size")
+        if policy == "line":
+            return 0
+        if policy == "size":
+            return self.buffer_size
+        return sys.maxsize
+
+    def isatty(self) -> bool:
+        file = self.file if self.file is not None else sys.stdout
+        try:
+            return os.isatty(file) if isinstance(file, int) else file.isatty()
+        except (AttributeError, OSError, ValueError):
+            return False
+
+def write_fd(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        # Pipes take so much at a time
+        written = os.write(fd, view)
+        view = view[written:]
@@ -1,28 +1,86 @@
 #!/usr/bin/env python3
 
 from .error import error
-from .token import Token, TokenType
+from .token import Token, TokenType, TokenArray
 from .expr import *
 from .stmt import *
-from typing import Callable
+from typing import Callable, Iterator
+from itertools import islice
 
 globals().update(TokenType.__members__)
 
 class ParseError(RuntimeError):
     pass
 
+class TokenBuffer:
+    """Tokens pulled from an iterator as the Parser gets to them.
+
+    Indexes like the list of tokens would, but only keeps the current chunk
+    and the last few tokens before it: the Parser looks no further back than
+    previous().
+    """
+
+    KEEP = 2
+    CHUNK = 1024
+
+    def __init__(self, tokens: Iterator[Token]):
+        self.tokens = tokens
+        self.window: list[Token] = []
+        # Index of window[0]
+        self.start = 0
+
+    def __getitem__(self, index: int) -> Token:
+        try:
+            return self.window[index - self.start]
+        except IndexError:
+            pass
+
+        while index >= self.start + len(self.window):
+            kept = self.window[-self.KEEP:]
+            chunk = list(islice(self.tokens, self.CHUNK))
+            if not chunk:
+                raise IndexError(index)
+
+            self.start += len(self.window) - len(kept)
+            self.window = kept + chunk
+
+        return self.window[index - self.start]
+
+# The Parser doesn't recurse in Python, so that machine-generated code nested
+# thousands of levels deep parses as well as any other: like the
+# StackInterpreter, it keeps its own stacks.
+#
+# Work is a stack of (method, argument) pairs. A method parses what it can
+# right away and pushes the rest: the parse of a sub-expression or statement,
+# under the method that picks up where it left off once that's done. Parsed
+# nodes go on a separate stack of values, where the method that carries on
+# finds them. Expressions are mostly left to parse_expression(), which keeps
+# a stack of the operators it's still to apply.
+#
+# declaration() leaves end_declaration() on the work as a marker, which a
+# ParseError unwinds to before synchronizing: the declaration comes out as
+# None, and the block or program around it carries on.
+
 class Parser:
-    def __init__(self, tokens: list[Token]):
-        self.tokens : list[Token] = tokens
+    def __init__(self, tokens: list[Token] | TokenBuffer | TokenArray):
+        self.tokens : list[Token] | TokenBuffer | TokenArray = tokens
         self.current : int = 0
+        # A TokenArray tells the type of a token without making the Token
+        self.type_at: Callable[[int], TokenType] = \
+            getattr(tokens, "type_at", None) or (lambda index: tokens[index].type)
+        self.work: list[tuple[Callable, object]] = []
+        self.values: list = []
 
     def parse(self) -> list[Stmt]:
-        statements: list[Stmt] = []
+        return list(self.declarations())
 
-        while not self.is_at_end():
-            statements.append(self.declaration())
+    def declarations(self) -> Iterator[Stmt]:
+        """Parse one declaration at a time, as they're asked for.
 
-        return statements
+        Declarations with syntax errors come out as None.
+        """
+        while not self.is_at_end():
+            yield self.run(self.declaration)
 
     # TODO: Delete this at some point
     def parse_single_expr(self) -> Expr | None:
@@ -31,8 +89,46 @@ class Parser:
         except ParseError:
             return None
 
+    def expression(self) -> Expr:
+        return self.run(self.parse_expression, None)
+
+    def run(self, method: Callable, argument=None):
+        """Do method(argument) and all the work it pushes, and return the
+        node it parsed."""
+        work = self.work
+        base = len(work)
+        values_base = len(self.values)
+        work.append((method, argument))
+
+        while True:
+            try:
+                while len(work) > base:
+                    method, argument = work.pop()
+                    method(argument)
+                return self.values.pop()
+            except ParseError:
+                if not self.recover(base):
+                    # Not in a declaration of ours
+                    del work[base:]
+                    del self.values[values_base:]
+                    raise
+
+    def recover(self, base: int) -> bool:
+        """Give up on the innermost declaration in progress, if it's above
+        base on the work, and make it None."""
+        work = self.work
+        for height in range(len(work) - 1, base - 1, -1):
+            method, values_height = work[height]
+            if method == self.end_declaration:
+                del work[height:]
+                del self.values[values_height:]
+                self.synchronize()
+                self.values.append(None)
+                return True
+        return False
+
     def is_at_end(self):
-        return self.peek().type == EOF
+        return self.type_at(self.current) == EOF
 
     def advance(self) -> Token:
         if not self.is_at_end():
@@ -48,38 +144,50 @@ class Parser:
 
     ## Statement parsing
 
-    def declaration(self) -> Stmt:
-        try:
-            if self.match(VAR):
-                return self.var_declaration()
-            if self.match(FUN):
-                return self.function("function")
+    def declaration(self, _=None):
+        # Where recover() goes back to
+        self.work.append((self.end_declaration, len(self.values)))
 
-            return self.statement()
+        if self.match(VAR):
+            self.var_declaration()
+        elif self.match(FUN):
+            self.function("function")
+        else:
+            self.statement()
 
-        except ParseError as error:
-            self.synchronize()
-            return None
+    def end_declaration(self, values_height: int):
+        pass
 
-    def var_declaration(self) -> Stmt:
+    def var_declaration(self):
         name : Token = self.consume(IDENTIFIER, "Expected variable name.")
 
-        initializer : Expr = None
         if self.match(EQUAL):
-            initializer = self.expression()
+            self.work.append((self.finish_var_declaration, name))
+            self.parse_expression()
+        else:
+            self.values.append(None)
+            self.finish_var_declaration(name)
+
+    def finish_var_declaration(self, name: Token):
+        self.expect(SEMICOLON, "Expected ';' after variable declaration.")
+        self.values.append(Var(name, self.values.pop()))
 
-        self.consume(SEMICOLON, "Expected ';' after variable declaration.")
-        return Var(name, initializer)
+    def while_statement(self):
+        self.expect(LEFT_PAREN, "Expected '(' after 'while'.")
+        self.work.append((self.while_body, None))
+        self.parse_expression()
 
-    def while_statement(self) -> Stmt:
-        self.consume(LEFT_PAREN, "Expected '(' after 'while'.")
-        condition: expr = self.expression()
-        self.consume(RIGHT_PAREN, "Expected ')' after condition.")
-        body: Stmt = self.statement()
+    def while_body(self, _):
+        self.expect(RIGHT_PAREN, "Expected ')' after condition.")
+        self.work.append((self.finish_while, None))
+        self.statement()
 
-        return While(condition, body)
+    def finish_while(self, _):
+        body: Stmt = self.values.pop()
+        condition: Expr = self.values.pop()
+        self.values.append(While(condition, body))
 
-    def statement(self) -> Stmt:
+    def statement(self, _=None):
         if self.match(BREAK):
             return self.break_statement()
         if self.match(FOR):
@@ -93,36 +201,57 @@ class Parser:
         if self.match(WHILE):
             return self.while_statement()
         if self.match(LEFT_BRACE):
-            return Block(self.block())
+            self.work.append((self.finish_block, None))
+            return self.block()
         return self.expression_statement()
 
-    def break_statement(self) -> Stmt:
+    def finish_block(self, _):
+        self.values.append(Block(self.values.pop()))
+
+    def break_statement(self):
         token: Token = self.previous()
-        self.consume(SEMICOLON, "Expected ';' after 'break'.")
-        return Break(token)
+        self.expect(SEMICOLON, "Expected ';' after 'break'.")
+        self.values.append(Break(token))
 
-    def for_statement(self) -> Stmt:
-        self.consume(LEFT_PAREN, "Expected '(' after 'for'.")
+    def for_statement(self):
+        self.expect(LEFT_PAREN, "Expected '(' after 'for'.")
+        self.work.append((self.for_condition, None))
 
-        initializer: Stmt | None = None
         if self.match(SEMICOLON):
-            initializer = None # redundant, but at least explicit
+            self.values.append(None)
         elif self.match(VAR):
-            initializer = self.var_declaration()
+            self.var_declaration()
         else:
-            initializer = self.expression_statement()
+            self.expression_statement()
 
-        condition: Expr | None = None
+    def for_condition(self, _):
         if not self.check(SEMICOLON):
-            condition = self.expression()
-        self.consume(SEMICOLON, "Expected ';' after loop condition.")
+            self.work.append((self.for_increment, None))
+            self.parse_expression()
+        else:
+            self.values.append(None)
+            self.for_increment(None)
+
+    def for_increment(self, _):
+        self.expect(SEMICOLON, "Expected ';' after loop condition.")
 
-        increment: Expr | None = None
         if not self.check(RIGHT_PAREN):
-            increment = self.expression()
-        self.consume(RIGHT_PAREN, "Expected ')' after for clauses.")
+            self.work.append((self.for_body, None))
+            self.parse_expression()
+        else:
+            self.values.append(None)
+            self.for_body(None)
+
+    def for_body(self, _):
+        self.expect(RIGHT_PAREN, "Expected ')' after for clauses.")
+        self.work.append((self.finish_for, None))
+        self.statement()
 
-        body: Stmt = self.statement();
+    def finish_for(self, _):
+        body: Stmt = self.values.pop()
+        increment: Expr | None = self.values.pop()
+        condition: Expr | None = self.values.pop()
+        initializer: Stmt | None = self.values.pop()
 
         if increment:
             body = Block([
@@ -138,53 +267,92 @@ class Parser:
         if initializer:
             body = Block([initializer, body])
 
-        return body
-
-    def if_statement(self) -> Stmt:
-        self.consume(LEFT_PAREN, "Expected '(' after 'if'.")
-        condition: Expr = self.expression()
-        self.consume(RIGHT_PAREN, "Expected ')' after if condition.")
-
-        thenBranch: Stmt = self.statement()
-        elseBranch: Stmt | None = None
-        if self.match(ELSE):
-            elseBranch = self.statement()
-
-        return If(condition, thenBranch, elseBranch)
-
-    def block(self) -> list[Stmt]:
-        statements: list[Stmt] = []
+        self.values.append(body)
 
-        while not self.check(RIGHT_BRACE) and not self.is_at_end():
-            statements.append(self.declaration())
+    def if_statement(self):
+        self.expect(LEFT_PAREN, "Expected '(' after 'if'.")
+        self.work.append((self.then_branch, None))
+        self.parse_expression()
 
-        self.consume(RIGHT_BRACE, "Expected '}' after block.")
-        return statements
+    def then_branch(self, _):
+        self.expect(RIGHT_PAREN, "Expected ')' after if condition.")
+        self.work.append((self.else_branch, None))
+        self.statement()
 
-    def print_statement(self) -> Stmt:
-        value: Expr = self.expression()
-        self.consume(SEMICOLON, "Expected ';' after value.")
-        return Print(value)
-
-    def return_statement(self) -> Stmt:
+    def else_branch(self, _):
+        if self.match(ELSE):
+            self.work.append((self.finish_if, None))
+            self.statement()
+        else:
+            self.values.append(None)
+            self.finish_if(None)
+
+    def finish_if(self, _):
+        elseBranch: Stmt | None = self.values.pop()
+        thenBranch: Stmt = self.values.pop()
+        condition: Expr = self.values.pop()
+        self.values.append(If(condition, thenBranch, elseBranch))
+
+    def block(self):
+        """Parse the declarations up to the closing '}' into a list."""
+        self.block_declarations(len(self.values))
+
+    def block_declarations(self, start: int):
+        # The declarations so far are the values from start on
+        if not self.check(RIGHT_BRACE) and not self.is_at_end():
+            self.work.append((self.block_declarations, start))
+            self.work.append((self.declaration, None))
+            return
+
+        self.expect(RIGHT_BRACE, "Expected '}' after block.")
+        statements: list[Stmt] = self.values[start:]
+        del self.values[start:]
+        self.values.append(statements)
+
+    def print_statement(self):
+        self.work.append((self.finish_print, None))
+        self.parse_expression()
+
+    def finish_print(self, _):
+        self.expect(SEMICOLON, "Expected ';' after value.")
+        self.values.append(Print(self.values.pop()))
+
+    def return_statement(self):
         keyword: Token = self.previous()
-        value: Expr | None = None
 
         if not self.check(SEMICOLON):
-            value = self.expression()
+            self.work.append((self.finish_return, keyword))
+            self.parse_expression()
+        else:
+            self.values.append(None)
+            self.finish_return(keyword)
+
+    def finish_return(self, keyword: Token):
+        self.expect(SEMICOLON, "Expected ';' after return value.")
+        self.values.append(Return(keyword, self.values.pop()))
 
-        self.consume(SEMICOLON, "Expected ';' after return value.")
-        return Return(keyword, value)
+    def expression_statement(self):
+        self.work.append((self.finish_expression_statement, None))
+        self.parse_expression()
 
-    def expression_statement(self) -> Stmt:
-        expr: Expr = self.expression()
-        self.consume(SEMICOLON, "Expected ';' after expression.")
-        return Expression(expr)
+    def finish_expression_statement(self, _):
+        self.expect(SEMICOLON, "Expected ';' after expression.")
+        self.values.append(Expression(self.values.pop()))
 
-    def function(self, kind: str) -> Stmt:
+    def function(self, kind: str):
         name: Token = self.consume(IDENTIFIER, f"Expected {kind} name.")
-        self.consume(LEFT_PAREN, f"Expected '(' after {kind} name.")
+        self.expect(LEFT_PAREN, f"Expected '(' after {kind} name.")
+        parameters: list[Token] = self.parameters()
 
+        self.expect(LEFT_BRACE, f"Expected '{{' before {kind} body.")
+        self.work.append((self.finish_function, (name, parameters)))
+        self.block()
+
+    def finish_function(self, header: tuple[Token, list[Token]]):
+        name, parameters = header
+        self.values.append(Function(name, parameters, self.values.pop()))
+
+    def parameters(self) -> list[Token]:
         parameters: list[Token] = []
 
         if not self.check(RIGHT_PAREN):
@@ -194,225 +362,138 @@ class Parser:
                     error(self.peek(), "Can't have more than 255 parameters.")
                 parameters.append(self.consume(IDENTIFIER, "Expected parameter name."))
 
-        self.consume(RIGHT_PAREN, "Expected ')' after parameters.")
-
-        self.consume(LEFT_BRACE, f"Expected '{{' before {kind} body.")
-        body: list[Stmt] = self.block()
-
-        return Function(name, parameters, body)
+        self.expect(RIGHT_PAREN, "Expected ')' after parameters.")
+        return parameters
 
     ## Expression parsing
 
-    def expression(self) -> Expr:
-        # DONE: Restore this to sidestep potentially problematic sequence operator
-        # (this broke the tests, but oh well)
-        # return self.equality()
-        return self.assignment()
-        # XXX: Restore call to self.sequence() when I'm sure that
-        # the textbook implementation is actually working
-        # return self.sequence()
-
-
-    # TODO: Check if a functional generator would even make sense
-    # def __binary(self, rule, preceding, tokens) -> Callable:
-    #     def fun():
-    #         expr = Expr()
-    #         right = Expr()
-    #     return fun
-
-    # TODO: Re-activate and implement this in Interpreter
-    def sequence(self) -> Expr:
-        # XXX: Restore direct calls to self.equality() 
-        expr : Expr = self.ternary()
-
-        while self.match(COMMA):
-            operator : Token = self.previous()
-            right : Expr = self.ternary()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def assignment(self) -> Expr:
-        expr: Expr = self.or_expression()
-
-        if self.match(EQUAL):
-            equals: Token = self.previous()
-            value: Expr = self.assignment()
-
-            if isinstance(expr, Variable):
-                name = expr.name
-                return Assign(name, value)
-
-            error(equals, "Invalid assignment target.")
-
-        return expr
-
-    def or_expression(self) -> Expr:
-        expr: Expr = self.and_expression()
-
-        while self.match(OR):
-            operator: Token = self.previous()
-            right: Expr = self.and_expression()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
-    def and_expression(self) -> Expr:
-        expr: Expr = self.equality()
-
-        while self.match(AND):
-            operator: Token = self.previous()
-            right: Expr = self.equality()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
-    # TODO: Re-activate and implement this in Interpreter
-    def ternary(self) -> Expr:
-        expr : Expr = self.equality()
-
-        # If the next operator is a question mark
-        while self.match(QUESTION_MARK):
-            operator: Token = self.previous()
-            condition : Expr = self.expression()
-            if self.match(COLON):
-                right : Expr = self.ternary()
-                expr = Ternary(operator, expr, condition, right)
-            else:
-                raise self.error(self.peek(), "Expected colon in ternary expression.")
-        return expr
-
-    def equality(self) -> Expr:
-        expr : Expr = self.comparison()
-
-        while self.match(BANG_EQUAL, EQUAL_EQUAL):
-            operator : Token = self.previous()
-            right: Expr = self.comparison()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def comparison(self) -> Expr:
-        expr : Expr = self.term()
-
-        while self.match(GREATER, GREATER_EQUAL, LESS, LESS_EQUAL):
-            operator : Token = self.previous()
-            right : Expr = self.term()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def term(self) -> Expr:
-        expr : Expr = self.factor()
-
-        while self.match(MINUS, PLUS):
-            operator : token = self.previous()
-            right : Expr = self.factor()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def factor(self) -> Expr:
-        expr = self.unary()
-
-        while self.match(SLASH, STAR):
-            operator: Token = self.previous()
-            right : expr = self.unary()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def unary(self) -> Expr:
-        if self.match(BANG, MINUS):
-            operator : Token = self.previous()
-            right : Expr = self.unary()
-            return Unary(operator, right)
-
-        return self.call()
-
-    def call(self) -> Expr:
-        expr: Expr = self.primary()
+    def parse_expression(self, pending: list[tuple] | None = None):
+        """Parse an expression with an operator-precedence automaton.
+
+        Operands go on the values and operators on pending, until an
+        operator that binds less tightly, a ')' or the end of the expression
+        comes along and reduces them into nodes. A lambda suspends it: the
+        lambda is parsed with the rest of the work, then
+        parse_expression(pending) carries on after it.
+        """
+        type_at = self.type_at
+        values = self.values
+        expecting_operand: bool = pending is None
+        if pending is None:
+            # (precedence, node type, operator token or where arguments start)
+            pending = []
 
         while True:
-            if self.match(LEFT_PAREN):
-                expr = self.finish_call(expr)
+            # Prefix operators, then an operand
+            while expecting_operand:
+                type = type_at(self.current)
+                operand = OPERANDS.get(type)
+                if operand is not None:
+                    self.current += 1
+                    values.append(operand(self))
+                    break
+
+                prefix = PREFIX_RULES.get(type)
+                if prefix is not None:
+                    self.current += 1
+                    precedence, node_type = prefix
+                    pending.append((precedence, node_type,
+                                    None if node_type is Grouping else self.previous()))
+                elif type == FUN:
+                    self.current += 1
+                    self.work.append((self.parse_expression, pending))
+                    return self.lambda_expression()
+                else:
+                    raise self.error(self.peek(), "Expected expression.")
+
+            expecting_operand = True
+            rule = INFIX_RULES.get(type_at(self.current))
+            if rule is not None:
+                precedence, node_type = rule
+                self.current += 1
+
+                if node_type is Call:
+                    # Binds tighter than anything pending
+                    pending.append((OPEN, Call, len(values)))
+                    if self.check(RIGHT_PAREN):
+                        expecting_operand = False
+                    else:
+                        continue
+                else:
+                    # Assignment is right-associative, the rest left
+                    threshold = precedence + 1 if node_type is Assign else precedence
+                    while pending and pending[-1][0] >= threshold:
+                        self.reduce(*pending.pop())
+                    pending.append((precedence, node_type, self.previous()))
+                    continue
+
+            # The end of the innermost group, argument or expression
+            while pending and pending[-1][0] > OPEN:
+                self.reduce(*pending.pop())
+            if not pending:
+                return
+
+            _, node_type, start = pending.pop()
+            if node_type is Grouping:
+                self.expect(RIGHT_PAREN, "Expected ')' after expression.")
+                values[-1] = Grouping(values[-1])
+                expecting_operand = False
+            elif node_type is Call:
+                if self.match(COMMA):
+                    if len(values) - start >= 255:
+                        error(self.peek(), "Can't have more than 255 arguments.")
+                    pending.append((OPEN, Call, start))
+                    continue
+
+                paren: Token = self.consume(RIGHT_PAREN,
+                                            "Expected ')' after arguments.")
+                arguments: list[Expr] = values[start:]
+                del values[start:]
+                values[-1] = Call(values[-1], paren, arguments)
+                expecting_operand = False
             else:
-                break
-
-        return expr
-
-    def finish_call(self, callee: Expr) -> Expr:
-        arguments: list[Expr] = []
-
-        if not self.check(RIGHT_PAREN):
-            # HACK: This is supposed to mimic the do while loop in the original Java
-            arguments.append(self.expression())
-            while self.match(COMMA):
-                if len(arguments) >= 255:
-                    error(self.peek(), "Can't have more than 255 arguments.")
-                arguments.append(self.expression())
-
-        paren: Token = self.consume(RIGHT_PAREN,
-                                    "Expected ')' after arguments.")
-
-        return Call(callee, paren, arguments)
-
-    def lambda_expression(self) -> Expr:
-        token: Token = self.advance() # we already know this is "fun"
-        self.consume(LEFT_PAREN, f"Expected '(' after 'fun' for lambda function.")
-
-        parameters: list[Token] = []
-
-        if not self.check(RIGHT_PAREN):
-            parameters.append(self.consume(IDENTIFIER, "Expected parameter name."))
-            while self.match(COMMA):
-                if len(parameters) >= 255:
-                    error(self.peek(), "Can't have more than 255 parameters.")
-                parameters.append(self.consume(IDENTIFIER, "Expected parameter name."))
-
-        self.consume(RIGHT_PAREN, "Expected ')' after parameters.")
-
-        self.consume(LEFT_BRACE, f"Expected '{{' before lambda body.")
-        body: list[Stmt] = self.block()
-
-        return Lambda(token, parameters, body)
-
-    def primary(self) -> Expr:
-        if self.match(FALSE):
-            return Literal(False)
-        if self.match(TRUE):
-            return Literal(True)
-        if self.match(NIL):
-            return Literal(None)
-        if self.match(NUMBER, STRING):
-            return Literal(self.previous().literal)
-        if self.match(IDENTIFIER):
-            return Variable(self.previous())
+                # A binary operator with nothing on its left, reported once
+                # its right-hand side is parsed (and discarded)
+                operator_token: Token = start
+                raise self.error(
+                    operator_token,
+                    f"Expected left-hand side of binary operator {operator_token.lexeme}."
+                )
 
-        if self.check(FUN):
-            return self.lambda_expression()
+    def reduce(self, precedence: int, node_type: type, operator: Token):
+        """Make the node for a pending operator out of the values."""
+        values = self.values
+        if node_type is Unary:
+            values[-1] = Unary(operator, values[-1])
+        elif node_type is Assign:
+            value: Expr = values.pop()
+            target: Expr = values[-1]
+            if isinstance(target, Variable):
+                values[-1] = Assign(target.name, value)
+            else:
+                error(operator, "Invalid assignment target.")
+        else:
+            right: Expr = values.pop()
+            values[-1] = node_type(values[-1], operator, right)
 
-        if self.match(LEFT_PAREN):
-            expr : Expr = self.expression()
-            self.consume(RIGHT_PAREN, "Expected ')' after expression.")
-            return Grouping(expr)
+    def literal(self) -> Expr:
+        return Literal(self.previous().literal)
 
+    def variable(self) -> Expr:
+        return Variable(self.previous())
 
-        binary_operators = set([COMMA, BANG_EQUAL, EQUAL_EQUAL,
-                                GREATER, GREATER_EQUAL, LESS, LESS_EQUAL,
-                                MINUS, PLUS,
-                                SLASH, STAR])
+    def lambda_expression(self):
+        token: Token = self.previous()
+        self.expect(LEFT_PAREN, f"Expected '(' after 'fun' for lambda function.")
+        parameters: list[Token] = self.parameters()
 
-        for op in binary_operators:
-            if self.match(op):
-                operator_token = self.previous()
-                expr = self.expression() # will be discarded?
-                raise self.error(
-                    operator_token,
-                    f"Expected left-hand side of binary operator {operator_token.lexeme}."
-                )
+        self.expect(LEFT_BRACE, f"Expected '{{' before lambda body.")
+        self.work.append((self.finish_lambda, (token, parameters)))
+        self.block()
 
-        raise self.error(self.peek(), "Expected expression.")
+    def finish_lambda(self, header: tuple[Token, list[Token]]):
+        token, parameters = header
+        self.values.append(Lambda(token, parameters, self.values.pop()))
 
     def consume(self, type: TokenType, message: str):
         if self.check(type):
@@ -420,21 +501,27 @@ class Parser:
 
         raise self.error(self.peek(), message)
 
+    def expect(self, type: TokenType, message: str):
+        """consume() a token the AST doesn't keep, without making it."""
+        if not self.check(type):
+            raise self.error(self.peek(), message)
+        self.current += 1
+
     def error(self, token: Token, message: str) -> Exception:
         error(token, message)
         return ParseError()
 
     def match(self, *types : TokenType) -> bool:
-        for type in types:
-            if self.check(type):
-                self.advance()
-                return True
+        current = self.type_at(self.current)
+        if current in types and current != EOF:
+            # Skips making the Token, previous() does if it's needed
+            self.current += 1
+            return True
         return False
 
     def check(self, type: TokenType) -> bool:
-        if self.is_at_end():
-            return False
-        return self.peek().type == type
+        current = self.type_at(self.current)
+        return current == type and current != EOF
 
     def synchronize(self):
         self.advance()
@@ -456,3 +543,48 @@ class Parser:
                     pass
 
             self.advance()
+
+# Precedence of the operators, from loosest to tightest. OPEN is for what
+# only a ')' or the end of the expression closes. The sequence (',') and
+# ternary ('?:') operators aren't part of the grammar yet.
+OPEN, ASSIGNMENT, OR_PRECEDENCE, AND_PRECEDENCE, EQUALITY, COMPARISON, TERM, \
+    FACTOR, UNARY, CALL = range(10)
+
+# What is an operand all by itself
+OPERANDS: dict[TokenType, Callable[[Parser], Expr]] = {
+    FALSE: lambda parser: Literal(False),
+    TRUE: lambda parser: Literal(True),
+    NIL: lambda parser: Literal(None),
+    NUMBER: Parser.literal,
+    STRING: Parser.literal,
+    IDENTIFIER: Parser.variable,
+}
+
+# What can come before an operand, and how tightly it binds. A binary
+# operator there is an error, once its right-hand side is parsed.
+PREFIX_RULES: dict[TokenType, tuple[int, type | None]] = {
+    BANG: (UNARY, Unary),
+    MINUS: (UNARY, Unary),
+    LEFT_PAREN: (OPEN, Grouping),
+    **{type: (OPEN, None)
+       for type in (COMMA, BANG_EQUAL, EQUAL_EQUAL, GREATER, GREATER_EQUAL,
+                    LESS, LESS_EQUAL, PLUS, SLASH, STAR)},
+}
+
+# What can follow an operand, and how tightly it binds
+INFIX_RULES: dict[TokenType, tuple[int, type]] = {
+    EQUAL: (ASSIGNMENT, Assign),
+    OR: (OR_PRECEDENCE, Logical),
+    AND: (AND_PRECEDENCE, Logical),
+    BANG_EQUAL: (EQUALITY, Binary),
+    EQUAL_EQUAL: (EQUALITY, Binary),
+    GREATER: (COMPARISON, Binary),
+    GREATER_EQUAL: (COMPARISON, Binary),
+    LESS: (COMPARISON, Binary),
+    LESS_EQUAL: (COMPARISON, Binary),
+    MINUS: (TERM, Binary),
+    PLUS: (TERM, Binary),
+    SLASH: (FACTOR, Binary),
+    STAR: (FACTOR, Binary),
+    LEFT_PAREN: (CALL, Call),
+}
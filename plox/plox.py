@@ -1,70 +1,224 @@
 #!/usr/bin/env python
 
 import sys
+import mmap
 import readline
 
 from .stmt import Stmt
 from .interpreter import Interpreter
-from .parser import Parser
+from .closure_compiler import ClosureInterpreter
+from .vm import VMInterpreter
+from .transpiler import TranspilingInterpreter
+from .stack_interpreter import StackInterpreter
+from .parser import Parser, TokenBuffer
 from .ast_printer import AstPrinter
-from .token import Token
-from .scanner import Scanner
+from .token import Token, TokenType, TokenArray
+from .scanner import RegexScanner, stream_tokens
 from .resolver import Resolver
+from .optimizer import Optimizer
+from .purity import PurityAnalyzer
+from .program_cache import Program, ProgramCache
+from .output import Output
 from .expr import Expr
 from .error import *
+from .exceptions import PloxRuntimeError
+from .profiler import node_line
+
+# Execution engines, selectable with Plox(engine=...)
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VMInterpreter,
+    "python": TranspilingInterpreter,
+    "stack": StackInterpreter,
+}
+
+# Reported when Python runs out of stack: for programs nested too deeply for
+# the passes that still recurse (the optimizer, the purity analysis, and some
+# engines), or for deep Lox recursion on the engines that recurse with it
+TOO_DEEP = "Too deeply nested."
+STACK_OVERFLOW = "Stack overflow."
+
+def innermost_line(error: RecursionError) -> int:
+    """Line of the innermost node the frames of error were working on, or 0."""
+    node = None
+    traceback = error.__traceback__
+    while traceback:
+        for value in traceback.tb_frame.f_locals.values():
+            if isinstance(value, (Expr, Stmt)):
+                node = value
+        traceback = traceback.tb_next
+    line = node_line(node) if node is not None else None
+    return line or 0
 
 class Plox:
     had_error = False
     had_runtime_error = False
     interpreter = None
+    optimizer = None
+    purity = None
+
+    def __init__(self, engine: str = "tree", optimize: bool = False,
+                 cache: ProgramCache | None = None, output: Output | None = None,
+                 **options):
+        self.engine = ENGINES[engine]
+        self.optimize = optimize
+        # Where run_file() keeps resolved programs, None to resolve them every time
+        self.cache = cache
+        # Where 'print' goes, None for the engine's default
+        self.output = output
+        # Passed on to the engine's constructor
+        self.options = options
 
     def run(self, source: str, in_repl = False):
-        scanner = Scanner(source)
-        tokens: list[Token] = scanner.scan_tokens()
+        # XXX: This assumes single lines
+        # FIXME: This bugs, obviously. As expected from bad design, see note above.
+        if in_repl and not source.strip().endswith(";"):
+            parser = Parser(RegexScanner(source).scan_array())
+            expr: Expr | None = parser.parse_single_expr()
+            self.start()
+
+            if expr and not Plox.had_error:
+                # NOTE: Ignore this for now
+                print(self.interpreter.evaluate(expr))
+            return
+
+        program = self.compile(source)
+        if program:
+            self.interpret(program.statements)
+
+    def compile(self, source: str) -> Program | None:
+        """Scan, parse, resolve and optimize a program, ready to interpret.
+        None if there's nothing to run, or a syntax error."""
+        scanner = RegexScanner(source)
+        tokens: TokenArray = scanner.scan_array()
         parser = Parser(tokens)
+        statements: list[Stmt] = parser.parse()
 
-        statements: list[Stmt] = []
-        expr: Expr | None = None
+        self.start()
 
-        # XXX: This assumes single lines
-        # FIXME: This bugs, obviously. As expected from bad design, see note above.
-        if in_repl:
-            if source.strip().endswith(";"):
-                statements: list[Stmt] = parser.parse()
-            else:
-                expr: Expr | None = parser.parse_single_expr()
-        else:
-            statements: list[Stmt] = parser.parse()
+        if Plox.had_error or not statements:
+            return None
 
-        if not Plox.interpreter:
-            Plox.interpreter = Interpreter()
+        resolver = Resolver(self.interpreter)
+        resolver.resolve(statements)
 
         if Plox.had_error:
-            return
+            return None
+
+        removed = self.optimizer.removed if self.optimizer else 0
+        statements = self.analyze(statements)
+        if statements is None:
+            return None
+        removed = self.optimizer.removed - removed if self.optimizer else 0
+
+        return Program(statements, self.interpreter, resolver.warnings, removed)
+
+    def analyze(self, statements: list[Stmt]) -> list[Stmt] | None:
+        """Optimize resolved statements and find the pure functions in them,
+        if asked to. None if they're nested too deeply to."""
+        try:
+            if self.optimizer:
+                statements = self.optimizer.optimize(statements)
+            if self.purity:
+                self.purity.analyze(statements)
+        except RecursionError as recursion:
+            error(innermost_line(recursion), TOO_DEEP)
+            return None
+        return statements
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            self.interpreter.interpret(statements)
+        except RecursionError as recursion:
+            line = innermost_line(recursion)
+            runtime_error(PloxRuntimeError(Token(TokenType.EOF, "", None, line),
+                                           STACK_OVERFLOW))
+
+    def run_cached(self, source: str):
+        """run() a whole file, through the ProgramCache."""
+        self.start()
+        key = self.cache.key(source, self.optimizer is not None, self.purity is not None)
+
+        program = self.cache.load(key)
+        if program:
+            for warning in program.warnings:
+                print(warning)
+            program.install(self.interpreter)
+            if self.optimizer:
+                self.optimizer.removed += program.removed
+        else:
+            program = self.compile(source)
+            if not program:
+                return
+            self.cache.store(key, program)
+
+        self.interpret(program.statements)
+
+    def start(self):
+        if not self.interpreter:
+            self.interpreter = self.engine(**self.options)
+            if self.output:
+                self.interpreter.output = self.output
+            if self.optimize:
+                self.optimizer = Optimizer(self.interpreter)
+            if self.interpreter.memo is not None:
+                self.purity = PurityAnalyzer(self.interpreter)
+
+    def run_stream(self, path: str):
+        """Run a file one top-level statement at a time, each as soon as
+        it's parsed, without ever holding all of the file or its tokens.
+
+        Unlike run(), statements before a syntax error still run, and
+        unused globals are only reported at the end.
+        """
+        self.start()
+        resolver = Resolver(self.interpreter)
+
+        with open(path, "rb") as f:
+            # mmap can't map an empty file
+            if f.seek(0, 2) == 0:
+                buffer = b""
+            else:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-        resolver = Resolver(Plox.interpreter)
+            parser = Parser(TokenBuffer(stream_tokens(buffer)))
 
+            for statement in parser.declarations():
+                # Keep parsing to report every syntax error
+                if Plox.had_error:
+                    continue
 
-        # Make pyright shut the hell up
-        if statements:
-            resolver.resolve(statements)
+                resolver.resolve_declaration(statement)
+                if Plox.had_error:
+                    continue
 
-            if Plox.had_error:
-                return
+                statements = self.analyze([statement])
+                if statements is None:
+                    continue
+
+                self.interpret(statements)
+                self.interpreter.forget(statements)
+                if Plox.had_runtime_error:
+                    break
 
-            Plox.interpreter.interpret(statements)
+        resolver.end()
 
-        elif expr:
-            # NOTE: Ignore this for now
-            print(Plox.interpreter.evaluate(expr))
+    def run_file(self, path: str, stream: bool = False):
+        if stream:
+            self.run_stream(path)
+        else:
+            with open(path, "r") as f:
+                source = f.read()
 
-    def run_file(self, path: str):
-        with open(path, "r") as f:
-            source = f.read()
-            self.run(source)
+            # The cached tables would be mixed up with those of earlier runs
+            if self.cache and not self.interpreter:
+                self.run_cached(source)
+            else:
+                self.run(source)
 
-            if Plox.had_error: sys.exit(65)
-            if Plox.had_runtime_error: sys.exit(70)
+        if Plox.had_error: sys.exit(65)
+        if Plox.had_runtime_error: sys.exit(70)
 
     def run_prompt(self):
         while True:
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 from typing import Any
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from math import copysign
 from time import time
 
-from .exceptions import PloxReturnException
+from .completion import TailCallCompletion, finish_call
 
-from .environment import Environment
+from .environment import Environment, Cell
 from .stmt import *
 from .expr import *
 
@@ -31,14 +33,17 @@ class PloxCallable(metaclass=ABCMeta):
     def __subclasshook__(cls, subclass: type) -> bool:
         return all((
             hasattr(subclass, m) \
-            and callable(subclass.__dict__[m])) \
+            and callable(getattr(subclass, m))) \
             for m in PloxCallable.methods
                    )
 
 class PloxFunction(PloxCallable):
-    def __init__(self, declaration: Function, closure: Environment):
+    def __init__(self, declaration: Function, closure: Environment,
+                 cells: tuple[int, ...] = ()):
         self.declaration = declaration
         self.closure = closure
+        # Parameters captured by inner functions, passed in Cells
+        self.cells = cells
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -47,23 +52,15 @@ class PloxFunction(PloxCallable):
         return f"<fn {self.declaration.name.lexeme}>"
 
     def call(self, interpreter, arguments: list) -> Any:
-        environment = Environment(self.closure)
-
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
-
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except PloxReturnException as return_exception:
-            return return_exception.value
-
-        return None
+        return call_function(self, interpreter, arguments)
 
 
 class PloxLambda(PloxCallable):
-    def __init__(self, declaration: Lambda, closure: Environment):
+    def __init__(self, declaration: Lambda, closure: Environment,
+                 cells: tuple[int, ...] = ()):
         self.declaration = declaration
         self.closure = closure
+        self.cells = cells
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -72,17 +69,159 @@ class PloxLambda(PloxCallable):
         return f"<fn lambda>"
 
     def call(self, interpreter, arguments: list) -> Any:
-        environment = Environment(self.closure)
+        return call_function(self, interpreter, arguments)
+
+def bind_arguments(function: PloxFunction | PloxLambda,
+                   arguments: list) -> Environment:
+    """Environment for the body of a call to function."""
+    environment = Environment(function.closure)
+
+    for i, param in enumerate(function.declaration.params):
+        environment.define(param.lexeme, arguments[i])
+    for i in function.cells:
+        environment.values[i] = Cell(environment.values[i])
+
+    return environment
+
+# Distinct callees an inline cache remembers before giving up on a call site
+POLYMORPHIC_LIMIT = 4
+
+class CallSite:
+    """Inline cache of one Call node.
+
+    The number of arguments at a call site never changes, and neither does the
+    arity of a callable, so once a callee has passed the checks there it always
+    will: the site just remembers which callees those were (one when the site
+    is monomorphic, up to POLYMORPHIC_LIMIT when it's polymorphic).
+    """
+    __slots__ = ("callees", "hits", "misses")
+
+    def __init__(self):
+        self.callees: tuple = ()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, callee: PloxCallable):
+        if len(self.callees) < POLYMORPHIC_LIMIT:
+            self.callees += (callee,)
+
+    @property
+    def megamorphic(self) -> bool:
+        return len(self.callees) == POLYMORPHIC_LIMIT
+
+# Default number of results kept by a Memo
+MEMO_SIZE = 4096
+
+# Returned by Memo.get() for calls it has no result for
+MISSING = object()
+
+class Memo:
+    """Results of calls to pure functions, least recently used first.
+
+    Which functions are pure is worked out by purity.PurityAnalyzer, which
+    adds their declarations to functions. Results are shared by every
+    closure of a declaration, since a pure function can't read anything
+    but its arguments and globals that never change.
+    """
+
+    def __init__(self, size: int = MEMO_SIZE):
+        self.size = size
+        self.results: OrderedDict = OrderedDict()
+        self.functions: set[Function | Lambda] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, function: PloxFunction | PloxLambda, arguments: list) -> tuple:
+        # With its class, as true == 1 and false == 0 in Python, and the sign
+        # of numbers, as 0 == -0 but they don't print the same
+        return (function.declaration,
+                *[(argument.__class__, argument, copysign(1.0, argument))
+                  if argument.__class__ is float else (argument.__class__, argument)
+                  for argument in arguments])
+
+    def get(self, key: tuple) -> Any:
+        value = self.results.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: Any):
+        self.results[key] = value
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, functions: set[Function | Lambda]):
+        """Stop memoizing functions, which turned out not to be pure after all."""
+        self.functions -= functions
+        self.results.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        calls = self.hits + self.misses
+        return {
+            "functions": len(self.functions),
+            "size": self.size,
+            "entries": len(self.results),
+            "calls": calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / calls if calls else 0.0,
+        }
+
+class MemoizedFunction(PloxFunction):
+    def __init__(self, declaration: Function, closure: Environment,
+                 cells: tuple[int, ...], memo: Memo):
+        super().__init__(declaration, closure, cells)
+        self.memo = memo
 
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
+    def call(self, interpreter, arguments: list) -> Any:
+        return memoized_call(self, interpreter, arguments)
 
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except PloxReturnException as return_exception:
-            return return_exception.value
+class MemoizedLambda(PloxLambda):
+    def __init__(self, declaration: Lambda, closure: Environment,
+                 cells: tuple[int, ...], memo: Memo):
+        super().__init__(declaration, closure, cells)
+        self.memo = memo
 
-        return None
+    def call(self, interpreter, arguments: list) -> Any:
+        return memoized_call(self, interpreter, arguments)
+
+def memoized_call(function: MemoizedFunction | MemoizedLambda, interpreter,
+                  arguments: list) -> Any:
+    memo = function.memo
+    if function.declaration not in memo.functions:
+        return call_function(function, interpreter, arguments)
+
+    key = memo.key(function, arguments)
+    value = memo.get(key)
+    if value is MISSING:
+        value = call_function(function, interpreter, arguments)
+        memo.put(key, value)
+    return value
+
+MEMOIZED_CALLABLES = (MemoizedFunction, MemoizedLambda)
+
+# Callables whose tail calls don't need a Python frame of their own. A tail
+# call to a memoized function skips its Memo, only the outermost call's result
+# is kept.
+TAIL_CALLABLES = (PloxFunction, PloxLambda, *MEMOIZED_CALLABLES)
+
+def call_function(function: PloxFunction | PloxLambda, interpreter,
+                  arguments: list) -> Any:
+    """Run a function's body, and then every function it tail calls in turn."""
+    while True:
+        completion = interpreter.execute_block(function.declaration.body,
+                                               bind_arguments(function, arguments))
+        if completion.__class__ is not TailCallCompletion:
+            return finish_call(completion)
+
+        function = completion.function
+        arguments = completion.arguments
 
 # TODO: Figure out if I should do native funcs like this or not
 
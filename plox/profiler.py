@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+# Sampling profiler for Lox programs on the tree-walker (--profile).
+#
+# Every interval seconds of CPU time, SIGPROF interrupts the program and the
+# profiler looks at the Python stack it stopped in: the frames of
+# call_function() hold the PloxFunction/PloxLambda of each Lox call on the
+# stack, and the innermost frame of a visitor holds the node being run, whose
+# line is that of its first token. Nothing is done between samples, and only
+# those frames have their locals looked at, so the program runs at very
+# nearly full speed.
+
+import sys
+import signal
+import time
+import linecache
+from collections import Counter
+from typing import TextIO
+
+from .token import Token
+from .expr import Expr
+from .stmt import Stmt, Function
+from .interpreter import Interpreter
+from .plox_callable import call_function
+
+# Default time between samples, in seconds of CPU time
+INTERVAL = 0.001
+
+# Name of the frame outside of any function
+SCRIPT = "<script>"
+
+def function_name(function) -> str:
+    if isinstance(function.declaration, Function):
+        return function.declaration.name.lexeme
+    return f"<lambda line {function.declaration.token.line}>"
+
+def node_line(node: Expr | Stmt) -> int | None:
+    """Line of the first token in node, or in its children."""
+    pending = [node]
+    while pending:
+        child = pending.pop()
+        if isinstance(child, Token):
+            return child.line
+        elif isinstance(child, list):
+            pending.extend(reversed(child))
+        elif isinstance(child, (Expr, Stmt)):
+            pending.extend(getattr(child, name) for name in reversed(child.__slots__))
+    return None
+
+class SamplingProfiler:
+    def __init__(self, interval: float = INTERVAL, interpreter: type = Interpreter):
+        self.interval = interval
+        # Code of call_function(), and of every visitor of the interpreter
+        # (whose node is its second argument)
+        self.call_code = call_function.__code__
+        self.visitor_codes = {method.__code__
+                              for method in interpreter.visit.table.values()}
+
+        self.samples = 0
+        # Lox call stacks, outermost first, and the lines they were on
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.lines: Counter[int] = Counter()
+
+        # Line of each node seen so far, None for those without any
+        self.node_lines: dict[Expr | Stmt, int | None] = {}
+        self.previous_handler = None
+        # CPU time profiled, in seconds
+        self.duration = 0.0
+
+    def start(self):
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.duration -= time.process_time()
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+        self.duration += time.process_time()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sample(self, signum, frame):
+        stack = []
+        line = None
+        call_code = self.call_code
+        visitor_codes = self.visitor_codes
+
+        while frame is not None:
+            code = frame.f_code
+            if code is call_code:
+                stack.append(function_name(frame.f_locals["function"]))
+            elif line is None and code in visitor_codes:
+                line = self.line_of(frame.f_locals[code.co_varnames[1]])
+            frame = frame.f_back
+
+        stack.append(SCRIPT)
+        stack.reverse()
+        self.samples += 1
+        self.stacks[tuple(stack)] += 1
+        if line is not None:
+            self.lines[line] += 1
+
+    def line_of(self, node: Expr | Stmt) -> int | None:
+        try:
+            return self.node_lines[node]
+        except KeyError:
+            line = self.node_lines[node] = node_line(node)
+            return line
+
+    def functions(self) -> dict[str, tuple[int, int]]:
+        """Function -> (self, total) samples: those it was the innermost
+        function in, and those it was anywhere on the stack in."""
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+        return {name: (own[name], total[name]) for name in total}
+
+    def report(self, file: TextIO = sys.stderr, path: str | None = None, limit: int = 10):
+        """Print the hottest lines (with their source, if path is given) and
+        functions to file."""
+        if not self.samples:
+            print("Profile: no samples.", file=file)
+            return
+
+        percent = lambda count: f"{100 * count / self.samples:5.1f}%"
+
+        # The kernel may well sample less often than asked
+        print(f"Profile: {self.samples} samples over {self.duration:.2f}s of CPU time.",
+              file=file)
+        print("\nHottest lines:", file=file)
+        print(f"  {'samples':>8} {'':>6}  line", file=file)
+        for line, count in self.lines.most_common(limit):
+            source = linecache.getline(path, line).strip() if path else ""
+            print(f"  {count:8} {percent(count)}  {line:<5} {source}".rstrip(), file=file)
+
+        print("\nHottest functions:", file=file)
+        print(f"  {'self':>6} {'total':>6}  function", file=file)
+        functions = sorted(self.functions().items(), key=lambda item: item[1], reverse=True)
+        for name, (own, total) in functions[:limit]:
+            print(f"  {percent(own)} {percent(total)}  {name}", file=file)
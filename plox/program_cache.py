@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+# On-disk cache of resolved programs, like __pycache__ for .lox files: running
+# the same script again loads its AST and what the Resolver, Optimizer and
+# PurityAnalyzer recorded about it, instead of doing all that again (see
+# Plox.run_file).
+#
+# Entries are named after a hash of the source, the plox version and the
+# options that change the resolved program, so an edited script or a new plox
+# gets a new entry and the old one is left to age out. Each entry is a header
+# followed by a pickle of a Program:
+#   MAGIC, length and CRC-32 of the pickle, the key again
+# An entry with the wrong header, length or checksum, or which doesn't
+# unpickle, is deleted and the program resolved again.
+#
+# Past max_size bytes, the entries used least recently are deleted. Loading
+# an entry touches its mtime, which is what "recently" goes by.
+#
+# The checksum only catches corruption, and unpickling runs whatever the
+# pickle says, so entries are only loaded if they're our own: the directory
+# is made private to the user, and entries anybody else owns or could have
+# written to are left alone.
+
+import os
+import struct
+import pickle
+import hashlib
+import tempfile
+import zlib
+from pathlib import Path
+
+from . import __version__
+from .interpreter import Interpreter
+from .stmt import Stmt
+
+MAGIC = b"PLOXC\x00"
+# Bump when the pickled classes change in a way __version__ doesn't show
+FORMAT = 1
+HEADER = struct.Struct(f"<{len(MAGIC)}sII32s")
+SUFFIX = ".ploxc"
+
+# Default size cap, in bytes
+MAX_SIZE = 64 * 2**20
+
+def default_directory() -> Path:
+    if "PLOX_CACHE_DIR" in os.environ:
+        return Path(os.environ["PLOX_CACHE_DIR"])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "plox"
+
+class Program:
+    """A resolved program, and the Interpreter tables about it."""
+
+    def __init__(self, statements: list[Stmt], interpreter: Interpreter,
+                 warnings: list[str], removed: int = 0):
+        self.statements = statements
+        self.locals = interpreter.locals
+        self.addresses = interpreter.addresses
+        self.cells = interpreter.cells
+        self.closures = interpreter.closures
+        self.pure = interpreter.memo.functions if interpreter.memo is not None else set()
+        # What the Resolver printed, and how many nodes the Optimizer removed
+        self.warnings = warnings
+        self.removed = removed
+
+    def install(self, interpreter: Interpreter):
+        interpreter.locals.update(self.locals)
+        interpreter.addresses.update(self.addresses)
+        interpreter.cells.update(self.cells)
+        interpreter.closures.update(self.closures)
+        if interpreter.memo is not None:
+            interpreter.memo.functions.update(self.pure)
+
+class ProgramCache:
+    def __init__(self, directory: Path | str | None = None, max_size: int = MAX_SIZE):
+        self.directory = Path(directory) if directory is not None else default_directory()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: str, *options) -> bytes:
+        digest = hashlib.sha256(f"{__version__}/{FORMAT}/{options!r}\n".encode())
+        digest.update(source.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def path(self, key: bytes) -> Path:
+        return self.directory / (key.hex() + SUFFIX)
+
+    def load(self, key: bytes) -> Program | None:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                if not self.trusted(os.fstat(f.fileno())):
+                    self.misses += 1
+                    return None
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        program = self.decode(key, data)
+        if program is None:
+            self.misses += 1
+            self.remove(path)
+            return None
+
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    def trusted(self, stat: os.stat_result) -> bool:
+        """Whether an entry is ours, and nobody else could have written it."""
+        return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+    def decode(self, key: bytes, data: bytes) -> Program | None:
+        if len(data) < HEADER.size:
+            return None
+
+        magic, length, checksum, entry_key = HEADER.unpack_from(data)
+        payload = memoryview(data)[HEADER.size:]
+        if magic != MAGIC or entry_key != key or length != len(payload) \
+           or checksum != zlib.crc32(payload):
+            return None
+
+        try:
+            program = pickle.loads(payload)
+        except Exception:
+            return None
+        return program if isinstance(program, Program) else None
+
+    def store(self, key: bytes, program: Program):
+        try:
+            payload = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # Too deeply nested to pickle, it'll be resolved every time
+            return
+
+        header = HEADER.pack(MAGIC, len(payload), zlib.crc32(payload), key)
+        try:
+            self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Written aside and renamed, so that nobody reads half an entry
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            # Like a read-only __pycache__, not worth failing the run for
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(temporary, self.path(key))
+        except OSError:
+            self.remove(Path(temporary))
+            return
+
+        self.evict()
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        """(mtime, size, path) of every entry, least recently used first."""
+        entries = []
+        for path in self.directory.glob("*" + SUFFIX):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    def remove(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            # Some other plox got to it first
+            pass
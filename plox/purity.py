@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# Finds the functions whose results can be memoized (see plox_callable.Memo),
+# run after the Resolver and the Optimizer. A function is pure when its body:
+#   - doesn't print
+#   - assigns only to its own locals
+#   - reads nothing from enclosing functions, and only globals that are
+#     declared once and never assigned
+#   - declares no functions or lambdas of its own, which could leak state
+#   - only calls globals bound to pure functions, so no natives like clock()
+#
+# A function whose body starts with the string "memoize"; is memoized anyway.
+#
+# In the REPL, a global can be declared again or assigned by a later line,
+# after the functions reading it were found pure: those are then dropped from
+# the Memo, and the Memo emptied.
+
+from collections import Counter
+
+from .interpreter import Interpreter
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+# The directive forcing memoization
+MEMOIZE = "memoize"
+
+class FunctionFacts:
+    """What the body of one function does, as far as purity goes."""
+
+    def __init__(self, declaration: Function | Lambda):
+        self.declaration = declaration
+        self.impure = False
+        self.forced = is_forced(declaration)
+        # Globals read and globals called
+        self.reads: set[str] = set()
+        self.calls: set[str] = set()
+
+def is_forced(declaration: Function | Lambda) -> bool:
+    if not declaration.body:
+        return False
+
+    first = declaration.body[0]
+    return isinstance(first, Expression) \
+        and isinstance(first.expression, Literal) \
+        and first.expression.value == MEMOIZE
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class PurityAnalyzer:
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self.memo = interpreter.memo
+
+        # How often each global was declared or assigned, over every
+        # program analyzed so far
+        self.writes: Counter[str] = Counter()
+        # Globals declared as 'fun name' or 'var name = fun ...'
+        self.bindings: dict[str, Function | Lambda] = {}
+        # Globals each pure function depends on
+        self.dependencies: dict[Function | Lambda, set[str]] = {}
+
+        self.facts: list[FunctionFacts] = []
+        # Innermost function being analyzed, None at the top level
+        self.function: FunctionFacts | None = None
+        # Blocks around the current statement, within that function
+        self.blocks = 0
+
+    def analyze(self, statements: list[Stmt]):
+        self.facts = []
+        for statement in statements:
+            self.visit(statement)
+
+        self.invalidate()
+        self.infer()
+
+    def stable(self, name: str) -> bool:
+        return self.writes[name] <= 1
+
+    def invalidate(self):
+        """Drop pure functions depending on a global written since."""
+        impure = {declaration for declaration, names in self.dependencies.items()
+                  if not all(self.stable(name) for name in names)}
+
+        if impure:
+            for declaration in impure:
+                del self.dependencies[declaration]
+            self.memo.invalidate(impure)
+
+    def infer(self):
+        candidates = {facts.declaration: facts for facts in self.facts
+                      if facts.forced or (not facts.impure and
+                                          all(self.stable(name)
+                                              for name in facts.reads | facts.calls))}
+
+        # Only keep functions calling other pure functions, until none are left
+        # to remove (recursive functions call themselves)
+        changed = True
+        while changed:
+            changed = False
+            for declaration, facts in list(candidates.items()):
+                if facts.forced:
+                    continue
+
+                for name in facts.calls:
+                    callee = self.bindings.get(name)
+                    if callee not in candidates and callee not in self.memo.functions:
+                        del candidates[declaration]
+                        changed = True
+                        break
+
+        for declaration, facts in candidates.items():
+            self.memo.functions.add(declaration)
+            if not facts.forced:
+                self.dependencies[declaration] = facts.reads | facts.calls
+
+    def declare_global(self, name: str, function: Function | Lambda | None):
+        self.writes[name] += 1
+        if function:
+            self.bindings[name] = function
+        else:
+            self.bindings.pop(name, None)
+
+    def at_top_level(self) -> bool:
+        return self.function is None and self.blocks == 0
+
+    def analyze_function(self, declaration: Function | Lambda):
+        enclosing, blocks = self.function, self.blocks
+        if enclosing:
+            enclosing.impure = True
+
+        self.function = FunctionFacts(declaration)
+        self.facts.append(self.function)
+        self.blocks = 0
+
+        for statement in declaration.body:
+            self.visit(statement)
+
+        self.function, self.blocks = enclosing, blocks
+
+    def impure(self):
+        if self.function:
+            self.function.impure = True
+
+    # Statements
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        self.blocks += 1
+        for statement in stmt.statements:
+            self.visit(statement)
+        self.blocks -= 1
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        self.visit(stmt.expression)
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        if self.at_top_level():
+            self.declare_global(stmt.name.lexeme, stmt)
+        self.analyze_function(stmt)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        self.visit(stmt.condition)
+        self.visit(stmt.then_branch)
+        if stmt.else_branch:
+            self.visit(stmt.else_branch)
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        self.impure()
+        self.visit(stmt.expression)
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        if stmt.value:
+            self.visit(stmt.value)
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        if self.at_top_level():
+            function = stmt.initializer
+            if not isinstance(function, Lambda):
+                function = None
+            self.declare_global(stmt.name.lexeme, function)
+
+        if stmt.initializer != None:
+            self.visit(stmt.initializer)
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        self.visit(stmt.condition)
+        self.visit(stmt.body)
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        return
+
+    # Expressions
+
+    def outside(self, expr: Variable | Assign) -> bool:
+        """Whether a variable use reaches outside the current function."""
+        address = self.interpreter.addresses.get(expr)
+        # Past the function's own blocks and parameters lies its closure
+        return address is not None and address[0] > self.blocks
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        if expr not in self.interpreter.addresses:
+            self.writes[expr.name.lexeme] += 1
+            self.impure()
+        elif self.function and self.outside(expr):
+            self.impure()
+
+        self.visit(expr.value)
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        return
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        self.visit(expr.expression)
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        self.visit(expr.right)
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        if not self.function:
+            return
+
+        if expr not in self.interpreter.addresses:
+            self.function.reads.add(expr.name.lexeme)
+        elif self.outside(expr):
+            self.impure()
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        callee = expr.callee
+        if self.function:
+            if isinstance(callee, Variable) and callee not in self.interpreter.addresses:
+                self.function.calls.add(callee.name.lexeme)
+            else:
+                # Parameters, locals, results of other calls: can't tell
+                self.impure()
+
+        self.visit(callee)
+        for argument in expr.arguments:
+            self.visit(argument)
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        self.analyze_function(expr)
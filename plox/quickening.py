@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Quickening, for the tree-walker: once a Binary node has been evaluated, the
+# Interpreter swaps its class for one of the subclasses below, picked for the
+# operator and the types of the operands it got. Its visitor then does just
+# that one operation, after checking the operands still have those types. If
+# they don't, the node is deoptimized into a GenericBinary, which runs the
+# generic code from then on rather than going back and forth.
+#
+# Only the class of the node changes, not its identity, so it keeps its place
+# in the Interpreter's tables, and every other visitor takes it for the Binary
+# it is.
+
+from .token import TokenType
+from .expr import Binary
+
+class QuickenedBinary(Binary):
+    # An empty __slots__ keeps the layout of Binary, which is what allows
+    # swapping classes
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # But the fields, for repr(), replace() and the like, are Binary's
+        cls.__slots__ = Binary.__slots__
+
+    def __reduce__(self):
+        # Copies start over unquickened
+        return Binary, (self.left, self.operator, self.right)
+
+class GenericBinary(QuickenedBinary):
+    __slots__ = ()
+
+class AddNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class ConcatenateStrings(QuickenedBinary):
+    __slots__ = ()
+
+class SubtractNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class MultiplyNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class DivideNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class GreaterNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class GreaterEqualNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class LessNumbers(QuickenedBinary):
+    __slots__ = ()
+
+class LessEqualNumbers(QuickenedBinary):
+    __slots__ = ()
+
+QuickenedBinary.__slots__ = Binary.__slots__
+
+# (operator, left operand type, right operand type) -> what to quicken into
+QUICKENED: dict[tuple[TokenType, type, type], type[QuickenedBinary]] = {
+    (TokenType.PLUS, float, float): AddNumbers,
+    (TokenType.PLUS, str, str): ConcatenateStrings,
+    (TokenType.MINUS, float, float): SubtractNumbers,
+    (TokenType.STAR, float, float): MultiplyNumbers,
+    (TokenType.SLASH, float, float): DivideNumbers,
+    (TokenType.GREATER, float, float): GreaterNumbers,
+    (TokenType.GREATER_EQUAL, float, float): GreaterEqualNumbers,
+    (TokenType.LESS, float, float): LessNumbers,
+    (TokenType.LESS_EQUAL, float, float): LessEqualNumbers,
+}
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import sys
 from enum import Enum
+from typing import Callable
 from .error import error
-from .visitor import visitor
+from .visitor import visitor, visits
 from .token import Token
 from .expr import *
 from .stmt import *
@@ -12,41 +13,109 @@ class FunctionType(Enum):
     FUNCTION = 2
     LAMBDA = 3
 
+class LocalVariable:
+    __slots__ = ("slot", "declaration", "captured", "references")
+
+    def __init__(self, slot: int, declaration: Stmt | None):
+        self.slot = slot
+        # The Var or Function declaring it, None for parameters
+        self.declaration = declaration
+        self.captured = False
+        # (expression, depth) of every use from its own function, resolved
+        # once the scope ends and we know whether the variable needs a Cell
+        self.references: list[tuple[Expr, int]] = []
+
+class FunctionScope:
+    """What a function (or the top-level script) captures from outside."""
+
+    def __init__(self, enclosing: 'FunctionScope | None', depth: int):
+        self.enclosing = enclosing
+        # Index in Resolver.scopes of the function's parameter scope
+        self.depth = depth
+        # (distance, slot) of every captured Cell, relative to the scope the
+        # function is declared in
+        self.captures: list[tuple[int, int]] = []
+        self.upvalues: dict[LocalVariable, int] = {}
+
+# Like the Parser, the Resolver doesn't recurse in Python, so that whatever
+# parses also resolves however deeply it's nested. Work is a stack of
+# (method, argument) pairs: visit() does what it can for a node right away,
+# and pushes its children along with whatever has to happen after them, such
+# as the end of a scope.
+
+@visits(Expr, Stmt, exclude=(Ternary,))
 class Resolver:
     def __init__(self, interpreter : 'Interpreter'):
         self.interpreter : 'Interpreter' = interpreter
         self.scopes : list[dict[str, bool]] = []
+        # Every local in its scope, slots given out in declaration order
+        self.variables : list[dict[str, LocalVariable]] = []
         self.current_function : FunctionType = FunctionType.NONE
+        self.function : FunctionScope = FunctionScope(None, 0)
 
         self.usage : list[dict[str, bool]] = [dict()]
+        # Everything printed about unused variables, for the ProgramCache
+        self.warnings : list[str] = []
+        self.work : list[tuple[Callable, object]] = []
 
     def begin_scope(self):
         self.scopes.append(dict())
+        self.variables.append(dict())
         self.usage.append(dict())
 
-    def end_scope(self):
+    def end_scope(self, _=None):
         self.scopes.pop()
         self.check_usages()
 
+        for variable in self.variables.pop().values():
+            address = (variable.slot, variable.captured)
+            for expr, depth in variable.references:
+                self.interpreter.resolve(expr, depth, (depth, *address))
+
+            if variable.captured and variable.declaration is not None:
+                self.interpreter.resolve_cell(variable.declaration)
+
     def check_usages(self):
         usage_scope = self.usage.pop()
         for name, used in usage_scope.items():
             if not used:
-                print(f"{name} is not used anywhere.")
+                warning = f"{name} is not used anywhere."
+                self.warnings.append(warning)
+                print(warning)
 
     def resolve(self, statements: list[Stmt]):
-        for statement in statements:
-            self.visit(statement)
+        self.run(statements)
 
         if len(self.usage) == 1:
             self.check_usages()
 
+    def resolve_declaration(self, statement: Stmt):
+        """Resolve one more top-level statement of a program being streamed
+        (see Plox.run_stream). Globals are only checked for use by end()."""
+        self.run([statement])
+
+    def run(self, nodes: list[Expr | Stmt]):
+        """Resolve nodes, and all the work that pushes."""
+        work = self.work
+        self.push(nodes)
+        while work:
+            method, argument = work.pop()
+            method(argument)
+
+    def push(self, nodes: list[Expr | Stmt]):
+        """Schedule nodes to be resolved in order."""
+        for node in reversed(nodes):
+            self.work.append((self.visit, node))
+
+    def end(self):
+        self.check_usages()
+
     def record_usage(self, name: Token):
         for i in range(len(self.usage) -1, -1, -1):
             if name.lexeme in self.usage[i]:
                 self.usage[i][name.lexeme] = True
 
-    def declare(self, name: Token):
+    def declare(self, name: Token, declaration: Stmt | None = None):
         usage_scope = self.usage[-1]
         usage_scope[name.lexeme] = False
 
@@ -61,6 +130,10 @@ class Resolver:
 
         scope[name.lexeme] = False
 
+        variables = self.variables[-1]
+        if name.lexeme not in variables:
+            variables[name.lexeme] = LocalVariable(len(variables), declaration)
+
     def define(self, name: Token):
         if len(self.scopes) == 0:
             return
@@ -70,26 +143,58 @@ class Resolver:
     def resolve_local(self, expr: Expr, name: Token):
         for i in range(len(self.scopes) - 1, -1, -1):
             if name.lexeme in self.scopes[i]:
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+                variable = self.variables[i][name.lexeme]
+                depth = len(self.scopes) - 1 - i
+
+                if self.function.depth <= i:
+                    variable.references.append((expr, depth))
+                    return
+
+                # Declared outside the current function: go through its
+                # closure, which sits right above its parameter scope
+                index = self.upvalue(self.function, variable, i)
+                distance = len(self.scopes) - self.function.depth
+                self.interpreter.resolve(expr, depth, (distance, index, True))
                 return # XXX: DID I FORGET THIS??
 
+    def upvalue(self, function: FunctionScope, variable: LocalVariable,
+                scope: int) -> int:
+        """Index in function's closure of the Cell for a variable declared
+        in an enclosing function, at self.scopes[scope]."""
+        if variable in function.upvalues:
+            return function.upvalues[variable]
+
+        enclosing = function.enclosing
+        declared_at = function.depth - 1
+
+        if enclosing.depth <= scope:
+            variable.captured = True
+            capture = (declared_at - scope, variable.slot)
+        else:
+            capture = (declared_at - enclosing.depth + 1,
+                       self.upvalue(enclosing, variable, scope))
+
+        function.captures.append(capture)
+        index = function.upvalues[variable] = len(function.captures) - 1
+        return index
+
     # HACK: Using the visitor decorator has come to bite me in the arse, it seems
     #
     @visitor(Block)
     def visit(self, stmt: Block):
         self.begin_scope()
-        self.resolve(stmt.statements)
-        self.end_scope()
+        self.work.append((self.end_scope, None))
+        self.push(stmt.statements)
 
     @visitor(Var)
     def visit(self, stmt: Var):
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
 
         if stmt.initializer:
-            # IMPLEMENT: self.resolve(stmt.initializer)?
-            self.visit(stmt.initializer)
-
-        self.define(stmt.name)
+            self.work.append((self.define, stmt.name))
+            self.work.append((self.visit, stmt.initializer))
+        else:
+            self.define(stmt.name)
 
     @visitor(Variable)
     def visit(self, expr: Variable):
@@ -103,12 +208,15 @@ class Resolver:
 
     @visitor(Assign)
     def visit(self, expr: Assign):
-        self.visit(expr.value)
+        self.work.append((self.resolve_assign, expr))
+        self.work.append((self.visit, expr.value))
+
+    def resolve_assign(self, expr: Assign):
         self.resolve_local(expr, expr.name)
 
     @visitor(Function)
     def visit(self, stmt: Function):
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
 
         self.resolve_function(stmt, FunctionType.FUNCTION)
@@ -120,34 +228,43 @@ class Resolver:
 
         enclosing_function = self.current_function
         self.current_function = type
+        self.function = FunctionScope(self.function, len(self.scopes) - 1)
 
         param: Token
         for param in function.params:
             self.declare(param)
             self.define(param)
 
-        self.resolve(function.body)
+        self.work.append((self.end_function, (function, enclosing_function)))
+        self.push(function.body)
+
+    def end_function(self, state: tuple[Function | Lambda, FunctionType]):
+        function, enclosing_function = state
+
+        # Parameters come first, so their slots are their indices
+        cells = tuple(variable.slot for variable in self.variables[-1].values()
+                      if variable.captured and variable.declaration is None)
+        self.interpreter.resolve_closure(function, self.function.captures, cells)
         self.end_scope()
 
         self.current_function = enclosing_function
+        self.function = self.function.enclosing
 
     ## Remaining, "uninteresting" ast nodes
 
     @visitor(Expression)
     def visit(self, stmt: Expression):
-        self.visit(stmt.expression)
+        self.work.append((self.visit, stmt.expression))
 
     @visitor(If)
     def visit(self, stmt: If):
-        self.visit(stmt.condition)
-        self.visit(stmt.then_branch)
-
         if stmt.else_branch:
-            self.visit(stmt.else_branch)
+            self.work.append((self.visit, stmt.else_branch))
+        self.push([stmt.condition, stmt.then_branch])
 
     @visitor(Print)
     def visit(self, stmt: Print):
-        self.visit(stmt.expression)
+        self.work.append((self.visit, stmt.expression))
 
     @visitor(Return)
     def visit(self, stmt: Return):
@@ -155,7 +272,7 @@ class Resolver:
             error(stmt.keyword,
                   "Can't return from top-level code.")
         if stmt.value:
-            self.visit(stmt.value)
+            self.work.append((self.visit, stmt.value))
 
     @visitor(While)
     def visit(self, stmt: While):
@@ -165,8 +282,7 @@ class Resolver:
         # because this might be why for loops are broken
         # NOTE: This is a non-issue because the parser already wraps the entire
         # for statement in a block as (Initializer, While)
-        self.visit(stmt.condition)
-        self.visit(stmt.body)
+        self.push([stmt.condition, stmt.body])
 
     @visitor(Break)
     def visit(self, stmt: Break):
@@ -176,20 +292,15 @@ class Resolver:
     ##
     @visitor(Binary)
     def visit(self, expr: Binary):
-        self.visit(expr.left)
-        self.visit(expr.right)
+        self.push([expr.left, expr.right])
 
     @visitor(Call)
     def visit(self, expr: Call):
-        self.visit(expr.callee)
-
-        argument: Expr
-        for argument in expr.arguments:
-            self.visit(argument)
+        self.push([expr.callee, *expr.arguments])
 
     @visitor(Grouping)
     def visit(self, expr: Grouping):
-        self.visit(expr.expression)
+        self.work.append((self.visit, expr.expression))
 
     @visitor(Literal)
     def visit(self, expr: Literal):
@@ -197,12 +308,11 @@ class Resolver:
 
     @visitor(Logical)
     def visit(self, expr: Logical):
-        self.visit(expr.left)
-        self.visit(expr.right)
+        self.push([expr.left, expr.right])
 
     @visitor(Unary)
     def visit(self, expr: Unary):
-        self.visit(expr.right)
+        self.work.append((self.visit, expr.right))
 
     @visitor(Lambda)
     def visit(self, expr: Lambda):
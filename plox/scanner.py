@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
-from .token import TokenType, Token
+from .token import TokenType, Token, TokenArray, make_token
 from .error import *
 
+import re
+import mmap
 import typing
+from typing import Iterable, Iterator
 Char : typing.TypeAlias = str
 
 globals().update(TokenType.__members__)
@@ -184,3 +187,155 @@ class Scanner:
 
     def is_at_end(self):
         return self.current >= len(self.__source)
+
+
+# Every token RegexScanner knows, with the blanks before it, most common first.
+# Lone characters that are nothing else are matched by CHARACTER, and the
+# blanks at the very end by '\Z'. Block comments are explained below.
+TOKEN_REGEX = r"""
+    BLANKS
+    (   [A-Za-z_][A-Za-z_0-9]*
+      | [!=<>]=?|[(){},.\-+;*?:]|/(?![/*])
+      | \n[ \t\r\n]*
+      | [0-9]+(?:\.[0-9]+)?
+      | "[^"]*"?
+      | //[^\n]*
+      | /\*(?:[^*](?!/))*(?:CHARACTER){0,2}
+      | CHARACTER
+      | \Z
+    )
+"""
+
+BLANKS = r"[ \t\r]*"
+
+TOKEN_PATTERN = re.compile(TOKEN_REGEX.replace("BLANKS", BLANKS).replace("CHARACTER", "."),
+                           re.VERBOSE | re.DOTALL)
+
+# The same, also capturing the blanks, to keep track of offsets in the source
+SPAN_PATTERN = re.compile(TOKEN_REGEX.replace("BLANKS", f"({BLANKS})").replace("CHARACTER", "."),
+                          re.VERBOSE | re.DOTALL)
+
+# The same over UTF-8, for memory-mapped files: a character is a lead byte
+# with its continuation bytes
+BYTES_TOKEN_PATTERN = re.compile(
+    TOKEN_REGEX.replace("BLANKS", BLANKS)
+               .replace("CHARACTER", r"[\xc0-\xff][\x80-\xbf]*|.").encode(),
+    re.VERBOSE | re.DOTALL)
+
+# Scanner.block_comment stops before a '*' or before the character preceding
+# a '/', whichever comes first, then skips two characters without counting
+# lines
+BLOCK_COMMENT_BODY = re.compile(r"(?:[^*](?!/))*", re.DOTALL)
+
+OPERATORS = {
+    "(": LEFT_PAREN, ")": RIGHT_PAREN, "{": LEFT_BRACE, "}": RIGHT_BRACE,
+    ",": COMMA, ".": DOT, "-": MINUS, "+": PLUS, ";": SEMICOLON, "*": STAR,
+    "?": QUESTION_MARK, ":": COLON, "/": SLASH,
+    "!": BANG, "!=": BANG_EQUAL, "=": EQUAL, "==": EQUAL_EQUAL,
+    "<": LESS, "<=": LESS_EQUAL, ">": GREATER, ">=": GREATER_EQUAL,
+}
+
+# Lexemes that always make the same type of token
+FIXED_TYPES = {**OPERATORS, **Scanner.keywords}
+
+IDENTIFIER_START = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+DIGITS = frozenset("0123456789")
+
+def token_fields(lexemes: Iterable[str]) -> Iterator[tuple]:
+    """(type, lexeme, literal, line) of the Token for each lexeme matched by
+    TOKEN_PATTERN, reporting errors along the way, then of the EOF Token."""
+    fixed_types = FIXED_TYPES
+    line = 1
+
+    for text in lexemes:
+        type = fixed_types.get(text)
+        if type is not None:
+            yield (type, text, None, line)
+            continue
+
+        c = text[:1]
+        if c in IDENTIFIER_START:
+            yield (IDENTIFIER, text, None, line)
+        elif c == "\n":
+            line += text.count("\n")
+        elif c in DIGITS:
+            yield (NUMBER, text, float(text), line)
+        elif c == '"':
+            line += text.count("\n")
+            if len(text) > 1 and text.endswith('"'):
+                yield (STRING, text, text[1:-1], line)
+            else:
+                error(line, "Unterminated string.")
+        elif text.startswith("/*"):
+            line += BLOCK_COMMENT_BODY.match(text, 2).group().count("\n")
+        elif text and not text.startswith("//"):
+            error(line, "Unexpected character.")
+
+    yield (EOF, "", None, line)
+
+class RegexScanner:
+    """Scanner splitting the source into lexemes with TOKEN_PATTERN instead
+    of going character by character. Produces the same tokens and errors as
+    Scanner."""
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def scan_tokens(self) -> list[Token]:
+        return list(map(make_token, token_fields(TOKEN_PATTERN.findall(self.source))))
+
+    def scan_array(self) -> TokenArray:
+        """Scan into a TokenArray instead, leaving lexemes in the source."""
+        tokens = TokenArray(self.source)
+        add_type, add_start = tokens.types.append, tokens.starts.append
+        add_length, add_line = tokens.lengths.append, tokens.lines.append
+
+        codes = {lexeme: type.value for lexeme, type in FIXED_TYPES.items()}
+        identifier, number, string = IDENTIFIER.value, NUMBER.value, STRING.value
+        offset = 0
+        line = 1
+
+        # As in token_fields(), but keeping offsets instead of lexemes
+        for blanks, text in SPAN_PATTERN.findall(self.source):
+            start = offset + len(blanks)
+            offset = start + len(text)
+
+            code = codes.get(text)
+            if code is None:
+                c = text[:1]
+                if c in IDENTIFIER_START:
+                    code = identifier
+                elif c == "\n":
+                    line += text.count("\n")
+                    continue
+                elif c in DIGITS:
+                    code = number
+                elif c == '"':
+                    line += text.count("\n")
+                    if len(text) > 1 and text.endswith('"'):
+                        code = string
+                    else:
+                        error(line, "Unterminated string.")
+                        continue
+                else:
+                    if text.startswith("/*"):
+                        line += BLOCK_COMMENT_BODY.match(text, 2).group().count("\n")
+                    elif text and not text.startswith("//"):
+                        error(line, "Unexpected character.")
+                    continue
+
+            add_type(code)
+            add_start(start)
+            add_length(len(text))
+            add_line(line)
+
+        add_type(EOF.value)
+        add_start(offset)
+        add_length(0)
+        add_line(line)
+        return tokens
+
+def stream_tokens(buffer: bytes | mmap.mmap) -> Iterator[Token]:
+    """Scan UTF-8 source lazily, one Token at a time, as RegexScanner would."""
+    lexemes = (match[1].decode() for match in BYTES_TOKEN_PATTERN.finditer(buffer))
+    return map(make_token, token_fields(lexemes))
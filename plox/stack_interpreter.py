@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+# Tree-walker that keeps its own stacks instead of recursing in Python
+# (plox --engine stack), so Lox recursion is limited by max_depth rather than
+# by sys.getrecursionlimit().
+#
+# Work is a stack of (method, argument) pairs: step(node) runs a node, which
+# does what it can right away and pushes the rest of its work (its children,
+# followed by a method that combines their values) in reverse order. Values of
+# expressions go on a separate stack.
+#
+# Loops and calls leave a marker on the work stack, holding the Environment
+# to go back to (and for loops, the number of values), which 'break' and
+# 'return' unwind to.
+
+from .exceptions import *
+from .completion import BREAK_MESSAGE
+from .interpreter import Interpreter, Uninitialized, is_truthy, stringify
+from .plox_callable import TAIL_CALLABLES, MEMOIZED_CALLABLES, MEMO_SIZE, \
+    MISSING, bind_arguments
+from .environment import Environment, Cell
+from .token import TokenType
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+# Default limit on the number of Lox calls in progress
+MAX_DEPTH = 200_000
+
+@visits(Expr, Stmt, exclude=(Ternary,), method="step")
+class StackInterpreter(Interpreter):
+    def __init__(self, max_depth: int = MAX_DEPTH, memoize: bool = False,
+                 memo_size: int = MEMO_SIZE):
+        super().__init__(memoize=memoize, memo_size=memo_size)
+        self.max_depth = max_depth
+        self.depth = 0
+        self.work: list[tuple] = []
+        self.values: list = []
+
+    def execute(self, stmt: Stmt):
+        self.work.append((self.step, stmt))
+        self.run()
+        return None
+
+    def evaluate(self, expr: Expr):
+        self.work.append((self.step, expr))
+        self.run()
+        return self.values.pop()
+
+    def run(self):
+        work = self.work
+        try:
+            while work:
+                method, argument = work.pop()
+                method(argument)
+        except PloxRuntimeError:
+            # Whatever was in progress is abandoned, the REPL carries on
+            # from the top level
+            work.clear()
+            self.values.clear()
+            self.depth = 0
+            self.environment = self.globals
+            raise
+
+    def push(self, nodes):
+        """Schedule nodes to run in order."""
+        for node in reversed(nodes):
+            self.work.append((self.step, node))
+
+    # Continuations and markers
+
+    def restore(self, environment: Environment):
+        self.environment = environment
+
+    def end_loop(self, entry: tuple[Environment, int]):
+        pass
+
+    def end_call(self, environment: Environment):
+        # The body ran off its end
+        self.environment = environment
+        self.depth -= 1
+        self.values.append(None)
+
+    # Statements
+
+    @visitor(Block)
+    def step(self, stmt: Block):
+        self.work.append((self.restore, self.environment))
+        self.environment = Environment(self.environment)
+        self.push(stmt.statements)
+
+    @visitor(Expression)
+    def step(self, stmt: Expression):
+        self.work.append((self.discard, stmt))
+        self.work.append((self.step, stmt.expression))
+
+    def discard(self, stmt: Expression):
+        self.values.pop()
+
+    @visitor(Function)
+    def step(self, stmt: Function):
+        Interpreter.visit(self, stmt)
+
+    @visitor(If)
+    def step(self, stmt: If):
+        self.work.append((self.branch, stmt))
+        self.work.append((self.step, stmt.condition))
+
+    def branch(self, stmt: If):
+        if is_truthy(self.values.pop()):
+            self.work.append((self.step, stmt.then_branch))
+        elif stmt.else_branch:
+            self.work.append((self.step, stmt.else_branch))
+
+    @visitor(Print)
+    def step(self, stmt: Print):
+        self.work.append((self.print_value, stmt))
+        self.work.append((self.step, stmt.expression))
+
+    def print_value(self, stmt: Print):
+        self.output.print(stringify(self.values.pop()))
+
+    @visitor(Return)
+    def step(self, stmt: Return):
+        self.work.append((self.leave, stmt))
+        if stmt.value:
+            self.work.append((self.step, stmt.value))
+        else:
+            self.values.append(None)
+
+    def leave(self, stmt: Return):
+        value = self.values.pop()
+        # The resolver only allows 'return' in functions, so there's a call
+        work = self.work
+        while True:
+            method, environment = work.pop()
+            if method == self.end_call:
+                break
+
+        self.environment = environment
+        self.depth -= 1
+        self.values.append(value)
+
+    @visitor(Var)
+    def step(self, stmt: Var):
+        if stmt in self.cells:
+            # Functions in the initializer may capture the variable itself
+            cell = Cell(Uninitialized)
+            self.environment.define(stmt.name.lexeme, cell)
+            if stmt.initializer != None:
+                self.work.append((self.fill_cell, cell))
+                self.work.append((self.step, stmt.initializer))
+        elif stmt.initializer != None:
+            self.work.append((self.define, stmt))
+            self.work.append((self.step, stmt.initializer))
+        else:
+            self.environment.define(stmt.name.lexeme, Uninitialized)
+
+    def fill_cell(self, cell: Cell):
+        cell.value = self.values.pop()
+
+    def define(self, stmt: Var):
+        self.environment.define(stmt.name.lexeme, self.values.pop())
+
+    @visitor(While)
+    def step(self, stmt: While):
+        self.work.append((self.end_loop, (self.environment, len(self.values))))
+        self.work.append((self.loop, stmt))
+        self.work.append((self.step, stmt.condition))
+
+    def loop(self, stmt: While):
+        if is_truthy(self.values.pop()):
+            self.work.append((self.loop, stmt))
+            self.work.append((self.step, stmt.condition))
+            self.work.append((self.step, stmt.body))
+
+    @visitor(Break)
+    def step(self, stmt: Break):
+        # Like the tree-walker, this ends the nearest loop of the function,
+        # or else that of the nearest caller whose loop body the call is in
+        work = self.work
+        calls = 0
+        for i in range(len(work) - 1, -1, -1):
+            method, argument = work[i]
+            if method == self.end_call:
+                calls += 1
+            elif method == self.end_loop and (not calls or self.in_body(i)):
+                del work[i:]
+                self.environment, values = argument
+                del self.values[values:]
+                self.depth -= calls
+                return
+
+        raise LoopBreakException(stmt.token, BREAK_MESSAGE)
+
+    def in_body(self, i: int) -> bool:
+        """Whether the loop whose end_loop is work[i] is running its body,
+        rather than its condition."""
+        _, stmt = self.work[i + 1]
+        method, node = self.work[i + 2]
+        return method == self.step and node is stmt.condition
+
+    # Expressions
+
+    @visitor(Assign)
+    def step(self, expr: Assign):
+        self.work.append((self.store, expr))
+        self.work.append((self.step, expr.value))
+
+    def store(self, expr: Assign):
+        self.assign(expr, self.values[-1])
+
+    @visitor(Literal)
+    def step(self, expr: Literal):
+        self.values.append(expr.value)
+
+    @visitor(Logical)
+    def step(self, expr: Logical):
+        self.work.append((self.short_circuit, expr))
+        self.work.append((self.step, expr.left))
+
+    def short_circuit(self, expr: Logical):
+        left = self.values[-1]
+
+        if expr.operator.type == TokenType.OR:
+            if is_truthy(left): return
+        else:
+            if not is_truthy(left): return
+
+        self.values.pop()
+        self.work.append((self.step, expr.right))
+
+    @visitor(Grouping)
+    def step(self, expr: Grouping):
+        self.work.append((self.step, expr.expression))
+
+    @visitor(Unary)
+    def step(self, expr: Unary):
+        self.work.append((self.apply_unary, expr))
+        self.work.append((self.step, expr.right))
+
+    def apply_unary(self, expr: Unary):
+        self.values[-1] = self.unary(expr, self.values[-1])
+
+    @visitor(Variable)
+    def step(self, expr: Variable):
+        self.values.append(self.look_up_variable(expr.name, expr))
+
+    @visitor(Binary)
+    def step(self, expr: Binary):
+        self.work.append((self.apply_binary, expr))
+        self.work.append((self.step, expr.right))
+        self.work.append((self.step, expr.left))
+
+    def apply_binary(self, expr: Binary):
+        right = self.values.pop()
+        self.values[-1] = self.binary(expr, self.values[-1], right)
+
+    @visitor(Call)
+    def step(self, expr: Call):
+        self.work.append((self.call, expr))
+        self.push(expr.arguments)
+        self.work.append((self.step, expr.callee))
+
+    def call(self, expr: Call):
+        values = self.values
+        start = len(values) - len(expr.arguments)
+        arguments = values[start:]
+        del values[start:]
+
+        function, arguments = self.check_call(expr, values.pop(), arguments)
+
+        if function.__class__ not in TAIL_CALLABLES:
+            values.append(function.call(self, arguments))
+            return
+
+        if function.__class__ in MEMOIZED_CALLABLES \
+           and function.declaration in self.memo.functions:
+            key = self.memo.key(function, arguments)
+            value = self.memo.get(key)
+            if value is not MISSING:
+                values.append(value)
+                return
+            self.work.append((self.remember, key))
+
+        if self.depth >= self.max_depth:
+            raise PloxRuntimeError(expr.paren, "Stack overflow.")
+
+        self.depth += 1
+        self.work.append((self.end_call, self.environment))
+        self.environment = bind_arguments(function, arguments)
+        self.push(function.declaration.body)
+
+    def remember(self, key: tuple):
+        self.memo.put(key, self.values[-1])
+
+    @visitor(Lambda)
+    def step(self, expr: Lambda):
+        self.values.append(Interpreter.visit(self, expr))
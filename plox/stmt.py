@@ -1,54 +1,106 @@
 #!/usr/bin/env python3
 
-from abc import ABC
 from .token import Token
-from dataclasses import dataclass
 from .expr import Expr
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
-class Stmt(ABC):
-    pass
+class Stmt:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+    def replace(self, **changes) -> 'Stmt':
+        """A copy with some fields changed, like dataclasses.replace()."""
+        values = [changes[name] if name in changes else getattr(self, name)
+                  for name in self.__slots__]
+        return self.__class__(*values)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Block(Stmt):
-    statements: list[Stmt]
+    __slots__ = ('statements',)
+
+    def __init__(self, statements: list[Stmt]):
+        self.statements = statements
+
+    def __reduce__(self):
+        return self.__class__, (self.statements,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Expression(Stmt):
-    expression: Expr
+    __slots__ = ('expression',)
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def __reduce__(self):
+        return self.__class__, (self.expression,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Function(Stmt):
-    name: Token
-    params: list[Token]
-    body: list[Stmt]
+    __slots__ = ('name', 'params', 'body')
+
+    def __init__(self, name: Token, params: list[Token], body: list[Stmt]):
+        self.name = name
+        self.params = params
+        self.body = body
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.params, self.body)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class If(Stmt):
-    condition: Expr
-    then_branch: Stmt
-    else_branch: Stmt
+    __slots__ = ('condition', 'then_branch', 'else_branch')
+
+    def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt):
+        self.condition = condition
+        self.then_branch = then_branch
+        self.else_branch = else_branch
+
+    def __reduce__(self):
+        return self.__class__, (self.condition, self.then_branch, self.else_branch)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Print(Stmt):
-    expression: Expr
+    __slots__ = ('expression',)
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def __reduce__(self):
+        return self.__class__, (self.expression,)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Return(Stmt):
-    keyword: Token
-    value: Expr
+    __slots__ = ('keyword', 'value')
+
+    def __init__(self, keyword: Token, value: Expr):
+        self.keyword = keyword
+        self.value = value
+
+    def __reduce__(self):
+        return self.__class__, (self.keyword, self.value)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Var(Stmt):
-    name: Token
-    initializer: Expr = None
+    __slots__ = ('name', 'initializer')
+
+    def __init__(self, name: Token, initializer: Expr = None):
+        self.name = name
+        self.initializer = initializer
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.initializer)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class While(Stmt):
-    condition: Expr
-    body: Stmt
+    __slots__ = ('condition', 'body')
+
+    def __init__(self, condition: Expr, body: Stmt):
+        self.condition = condition
+        self.body = body
+
+    def __reduce__(self):
+        return self.__class__, (self.condition, self.body)
 
-@dataclass(eq=False, frozen=True, unsafe_hash=True)
 class Break(Stmt):
-    token: Token
+    __slots__ = ('token',)
+
+    def __init__(self, token: Token):
+        self.token = token
+
+    def __reduce__(self):
+        return self.__class__, (self.token,)
 
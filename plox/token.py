@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 
-from dataclasses import dataclass
-from enum import Enum
-from dataclasses import dataclass
+from enum import Enum, IntEnum
+from array import array
 import typing
+import functools
 
 
-TokenType = Enum("TokenType",
+# An IntEnum so a TokenArray can hand out the types it stores as small ints,
+# which compare equal to them
+TokenType = IntEnum("TokenType",
                  """LEFT_PAREN, RIGHT_PAREN, LEFT_BRACE, RIGHT_BRACE
                  COMMA, DOT, MINUS, PLUS, SEMICOLON, SLASH, STAR,
                  BANG, BANG_EQUAL,
@@ -19,12 +21,17 @@ TokenType = Enum("TokenType",
                  BREAK,
                  QUESTION_MARK, COLON,
                  EOF""")
+# But printed like any Enum
+TokenType.__str__ = Enum.__str__
+TokenType.__format__ = Enum.__format__
 
 # https://stackoverflow.com/a/28130684
 globals().update(TokenType.__members__)
 
-@dataclass(eq=True, frozen=True, unsafe_hash=True)
-class Token:
+# A NamedTuple rather than a frozen dataclass: same immutability, equality
+# and hashing, but several times cheaper to create, and the scanners create
+# one per token
+class Token(typing.NamedTuple):
     type: TokenType
     lexeme: str
     literal: object
@@ -36,3 +43,52 @@ class Token:
 
     def __repr__(self) -> str:
         return f"{self.type} {self.lexeme} {self.literal}"
+
+# Token(*fields) without going through NamedTuple.__new__
+make_token = functools.partial(tuple.__new__, Token)
+
+# TokenTypes by value, to turn them back into Enum members
+TYPES: dict[int, TokenType] = {type.value: type for type in TokenType}
+
+class TokenArray:
+    """The tokens of one source, as parallel arrays of type codes, start
+    offsets, lengths and lines instead of one Token each.
+
+    Indexing makes the Token, slicing its lexeme out of the source and
+    parsing its literal again. The Parser reads types with type_at(), which
+    gives the value of the TokenType, so only the tokens that end up in the
+    AST are ever made.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("B")
+        self.starts = array("I")
+        self.lengths = array("I")
+        self.lines = array("I")
+        self.type_at: typing.Callable[[int], int] = self.types.__getitem__
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        type = TYPES[self.types[index]]
+        start = self.starts[index]
+        lexeme = self.source[start:start + self.lengths[index]]
+
+        literal = None
+        if type is NUMBER:
+            literal = float(lexeme)
+        elif type is STRING:
+            literal = lexeme[1:-1]
+
+        return make_token((type, lexeme, literal, self.lines[index]))
+
+    def __iter__(self) -> typing.Iterator[Token]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def nbytes(self) -> int:
+        """Size of the arrays, not counting the source."""
+        return sum(len(a) * a.itemsize
+                   for a in (self.types, self.starts, self.lengths, self.lines))
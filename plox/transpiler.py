@@ -0,0 +1,760 @@
+#!/usr/bin/env python3
+
+# Lox-to-Python transpiler: turns a resolved program into Python source, which
+# is then compiled with compile() and run by CPython itself.
+#
+# - Lox globals become Python globals, prefixed with 'g_' so they can never
+#   collide with Python keywords, builtins or our helpers
+# - Lox locals become Python locals, renamed '<name>_<n>' so that shadowing
+#   and block scopes need no Python scope of their own
+# - Functions and lambdas become nested 'def's. Locals captured by an inner
+#   function are kept in one-element lists ("boxes") that the inner function
+#   receives as keyword-only defaults, so that every execution of a block gets
+#   fresh variables, exactly like the tree-walker's Environment per block
+#
+# Which variables are local, and where they live, comes straight from the
+# resolver's depth table in Interpreter.locals.
+
+import sys
+import math
+from typing import Any, Callable
+
+from .exceptions import *
+from .environment import Environment, GlobalEnvironment
+from .interpreter import Interpreter, Uninitialized, stringify, \
+    check_number_operand, check_number_operands
+from .plox_callable import PloxCallable
+from .token import Token, TokenType
+from .expr import *
+from .stmt import *
+from .visitor import visitor, visits
+
+FILENAME = "<plox>"
+
+# Longest chain of binary operators generated as nested expressions
+CHAIN = 8
+
+# What compile() (or the Transpiler, on deep trees) can fail with on programs
+# that are too deeply nested for CPython, but which the tree-walker still runs
+TOO_COMPLEX = (SyntaxError, RecursionError, MemoryError)
+
+class TranspiledFunction(PloxCallable):
+    __slots__ = ("fn", "name", "nparams")
+
+    def __init__(self, fn: Callable, name: str, nparams: int):
+        self.fn = fn
+        self.name = name
+        self.nparams = nparams
+
+    def arity(self) -> int:
+        return self.nparams
+
+    def call(self, interpreter, arguments: list) -> Any:
+        return self.fn(*arguments)
+
+    def __str__(self) -> str:
+        return f"<fn {self.name}>"
+
+class Binding:
+    """A local variable declaration and the Python name it was given."""
+    __slots__ = ("name", "function", "boxed")
+
+    def __init__(self, name: str, function: Function | Lambda | None):
+        self.name = name
+        self.function = function
+        self.boxed = False
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class CaptureAnalyzer:
+    """Names every local and finds out which ones inner functions capture."""
+
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self.scopes: list[dict[str, Binding]] = []
+        self.functions: list[Function | Lambda | None] = [None]
+
+        self.counter = 0
+        self.declarations: dict[int, Binding] = dict()
+        self.uses: dict[int, Binding] = dict()
+        self.free: dict[int, list[Binding]] = dict()
+        self.globals: set[str] = set()
+
+    def fresh(self, name: str) -> str:
+        self.counter += 1
+        return f"{name}_{self.counter}"
+
+    def analyze(self, statements: list[Stmt]):
+        for statement in statements:
+            self.visit(statement)
+
+    def declare(self, name: Token):
+        if len(self.scopes) == 0:
+            self.globals.add(name.lexeme)
+            return
+
+        binding = Binding(self.fresh(name.lexeme), self.functions[-1])
+        self.scopes[-1][name.lexeme] = binding
+        self.declarations[id(name)] = binding
+
+    def use(self, expr: Variable | Assign):
+        depth: int | None = self.interpreter.locals.get(expr)
+        if depth == None:
+            return
+
+        binding = self.scopes[-1 - depth][expr.name.lexeme]
+        self.uses[id(expr)] = binding
+
+        if binding.function is self.functions[-1]:
+            return
+
+        # Captured: box it, and thread it through every function in between
+        binding.boxed = True
+        for function in reversed(self.functions):
+            if function is binding.function:
+                break
+            free = self.free[id(function)]
+            if binding not in free:
+                free.append(binding)
+
+    def function(self, function: Function | Lambda):
+        self.functions.append(function)
+        self.free[id(function)] = []
+        self.scopes.append(dict())
+
+        for param in function.params:
+            self.declare(param)
+        self.analyze(function.body)
+
+        self.scopes.pop()
+        self.functions.pop()
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        self.scopes.append(dict())
+        self.analyze(stmt.statements)
+        self.scopes.pop()
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        # Declared first: the initializer may close over the variable
+        self.declare(stmt.name)
+        if stmt.initializer != None:
+            self.visit(stmt.initializer)
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        self.declare(stmt.name)
+        self.function(stmt)
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        self.visit(stmt.expression)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        self.visit(stmt.condition)
+        self.visit(stmt.then_branch)
+        if stmt.else_branch:
+            self.visit(stmt.else_branch)
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        self.visit(stmt.expression)
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        if stmt.value:
+            self.visit(stmt.value)
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        self.visit(stmt.condition)
+        self.visit(stmt.body)
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        return
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        self.visit(expr.value)
+        self.use(expr)
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        self.use(expr)
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        self.visit(expr.callee)
+        for argument in expr.arguments:
+            self.visit(argument)
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        self.visit(expr.expression)
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        self.visit(expr.right)
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        return
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        self.function(expr)
+
+class FunctionContext:
+    """Python code being generated for one function body."""
+
+    def __init__(self):
+        self.lines: list[tuple[int, str, int]] = []
+        self.globals: set[str] = set()
+        self.temporaries = 0
+
+@visits(Expr, Stmt, exclude=(Ternary,))
+class Transpiler:
+    def __init__(self, interpreter: Interpreter, namespace: dict):
+        self.interpreter = interpreter
+        self.namespace = namespace
+        self.analyzer: CaptureAnalyzer | None = None
+
+        self.context = FunctionContext()
+        self.indent = 0
+        self.line = 0
+        self.loops = 0
+        self.defs = 0
+
+        # Tokens referenced by the generated code, for error reporting
+        self.tokens: list[Token] = namespace.setdefault("_tokens", [])
+
+    # Generating code
+
+    def emit(self, text: str):
+        self.context.lines.append((self.indent, text, self.line))
+
+    def temporary(self) -> str:
+        self.context.temporaries += 1
+        return f"_t{self.context.temporaries}"
+
+    def token(self, token: Token) -> str:
+        self.tokens.append(token)
+        return f"_tokens[{len(self.tokens) - 1}]"
+
+    def at(self, token: Token):
+        self.line = token.line
+
+    def global_name(self, name: str) -> str:
+        return f"g_{name}"
+
+    def render(self, name: str, params: list[str], context: FunctionContext,
+               free: list[str] = []) -> list[tuple[int, str, int]]:
+        """Wrap a finished function body in its 'def' header."""
+        signature = ", ".join(params)
+        if free:
+            captured = ", ".join(f"{box}={box}" for box in free)
+            signature = f"{signature}, *, {captured}" if signature else f"*, {captured}"
+
+        lines = [(0, f"def {name}({signature}):", self.line)]
+        if context.globals:
+            lines.append((1, f"global {', '.join(sorted(context.globals))}", self.line))
+
+        body = context.lines or [(0, "pass", self.line)]
+        lines += [(indent + 1, text, line) for indent, text, line in body]
+        return lines
+
+    def transpile(self, statements: list[Stmt]) -> tuple[str, list[int]]:
+        """Transpile a program to the source of a '_main' function.
+
+        Returns the source along with a table mapping each Python line to
+        the Lox line it was generated from.
+        """
+        self.analyzer = CaptureAnalyzer(self.interpreter)
+        self.analyzer.analyze(statements)
+
+        for statement in statements:
+            self.visit(statement)
+
+        return self.assemble(self.render("_main", [], self.context))
+
+    def transpile_expression(self, expr: Expr) -> tuple[str, list[int]]:
+        self.analyzer = CaptureAnalyzer(self.interpreter)
+        self.analyzer.visit(expr)
+
+        value = self.visit(expr)
+        self.emit(f"return {value}")
+
+        return self.assemble(self.render("_main", [], self.context))
+
+    def assemble(self, lines: list[tuple[int, str, int]]) -> tuple[str, list[int]]:
+        source = "\n".join(indent * 4 * " " + text for indent, text, _ in lines)
+        # Python line numbers are 1-based
+        line_table = [0] + [line for _, _, line in lines]
+        return source + "\n", line_table
+
+    # Variables
+
+    def read(self, expr: Variable | Assign) -> str:
+        binding = self.analyzer.uses.get(id(expr))
+        if binding is None:
+            return self.global_name(expr.name.lexeme)
+        return f"{binding.name}[0]" if binding.boxed else binding.name
+
+    def is_defined_global(self, name: str) -> bool:
+        # Globals declared without a value by an earlier program are only in _declared
+        global_name = self.global_name(name)
+        return name in self.analyzer.globals or global_name in self.namespace \
+            or global_name in self.namespace["_declared"]
+
+    def declare(self, name: Token) -> Binding | None:
+        """Start a declaration; returns the local binding, or None for globals."""
+        binding = self.analyzer.declarations.get(id(name))
+        if binding is not None and binding.boxed:
+            self.emit(f"{binding.name} = [_UNINIT]")
+        return binding
+
+    def define(self, name: Token, binding: Binding | None, value: str):
+        if binding is None:
+            global_name = self.global_name(name.lexeme)
+            self.context.globals.add(global_name)
+            self.emit(f"{global_name} = {value}")
+        elif binding.boxed:
+            self.emit(f"{binding.name}[0] = {value}")
+        else:
+            self.emit(f"{binding.name} = {value}")
+
+    def function(self, function: Function | Lambda, name: str) -> str:
+        """Generate a 'def' for function ahead of the current statement."""
+        self.defs += 1
+        def_name = f"{name}_def{self.defs}"
+
+        context, indent, loops = self.context, self.indent, self.loops
+        self.context, self.indent, self.loops = FunctionContext(), 0, 0
+
+        params = []
+        for param in function.params:
+            binding = self.analyzer.declarations[id(param)]
+            params.append(binding.name)
+            if binding.boxed:
+                self.emit(f"{binding.name} = [{binding.name}]")
+
+        for statement in function.body:
+            self.visit(statement)
+
+        body = self.context
+        self.context, self.indent, self.loops = context, indent, loops
+
+        free = [binding.name for binding in self.analyzer.free[id(function)]]
+        for offset, text, line in self.render(def_name, params, body, free):
+            self.context.lines.append((self.indent + offset, text, line))
+
+        return f"_Function({def_name}, {name!r}, {len(function.params)})"
+
+    def truthy(self, value: str) -> str:
+        temporary = self.temporary()
+        return f"(({temporary} := {value}) is not None and {temporary} is not False)"
+
+    # Statements
+
+    @visitor(Block)
+    def visit(self, stmt: Block):
+        if not stmt.statements:
+            self.emit("pass")
+        for statement in stmt.statements:
+            self.visit(statement)
+
+    @visitor(Expression)
+    def visit(self, stmt: Expression):
+        expression = stmt.expression
+
+        # Plain assignment statements are by far the most common kind
+        if isinstance(expression, Assign):
+            binding = self.analyzer.uses.get(id(expression))
+            if binding is not None or self.is_defined_global(expression.name.lexeme):
+                value = self.visit(expression.value)
+                self.at(expression.name)
+                target = self.read(expression)
+                if binding is None:
+                    self.context.globals.add(target)
+                self.emit(f"{target} = {value}")
+                return
+
+        self.emit(self.visit(expression))
+
+    @visitor(Function)
+    def visit(self, stmt: Function):
+        self.at(stmt.name)
+        binding = self.declare(stmt.name)
+        function = self.function(stmt, stmt.name.lexeme)
+        self.define(stmt.name, binding, function)
+
+    @visitor(If)
+    def visit(self, stmt: If):
+        condition = self.truthy(self.visit(stmt.condition))
+        self.emit(f"if {condition}:")
+
+        self.indent += 1
+        self.visit(stmt.then_branch)
+        self.indent -= 1
+
+        if stmt.else_branch:
+            self.emit("else:")
+            self.indent += 1
+            self.visit(stmt.else_branch)
+            self.indent -= 1
+
+    @visitor(Print)
+    def visit(self, stmt: Print):
+        self.emit(f"_print(_stringify({self.visit(stmt.expression)}))")
+
+    @visitor(Return)
+    def visit(self, stmt: Return):
+        self.at(stmt.keyword)
+        if stmt.value:
+            self.emit(f"return {self.visit(stmt.value)}")
+        else:
+            self.emit("return None")
+
+    @visitor(Var)
+    def visit(self, stmt: Var):
+        self.at(stmt.name)
+        binding = self.declare(stmt.name)
+
+        if stmt.initializer != None:
+            self.define(stmt.name, binding, self.visit(stmt.initializer))
+        elif binding is None:
+            # Uninitialized globals stay unbound, see _unset() below
+            self.emit(f"_unset({self.global_name(stmt.name.lexeme)!r})")
+        else:
+            self.define(stmt.name, binding, "_UNINIT")
+
+    @visitor(While)
+    def visit(self, stmt: While):
+        condition = self.truthy(self.visit(stmt.condition))
+        self.emit(f"while {condition}:")
+
+        # A 'break' escaping from a function called in the body ends the
+        # loop too, like on the tree-walker
+        self.indent += 1
+        self.emit("try:")
+        self.indent += 1
+        self.loops += 1
+        self.visit(stmt.body)
+        self.loops -= 1
+        self.indent -= 1
+        self.emit("except _LoopBreak:")
+        self.emit("    break")
+        self.indent -= 1
+
+    @visitor(Break)
+    def visit(self, stmt: Break):
+        self.at(stmt.token)
+        if self.loops:
+            self.emit("break")
+        else:
+            self.emit(f"_break_outside_loop({self.token(stmt.token)})")
+
+    # Expressions
+
+    @visitor(Assign)
+    def visit(self, expr: Assign):
+        value = self.visit(expr.value)
+        self.at(expr.name)
+
+        binding = self.analyzer.uses.get(id(expr))
+        if binding is not None:
+            if binding.boxed:
+                return f"_store({binding.name}, {value})"
+            return f"({binding.name} := {value})"
+
+        if not self.is_defined_global(expr.name.lexeme):
+            return f"_assign_undefined({value}, {self.token(expr.name)})"
+
+        global_name = self.global_name(expr.name.lexeme)
+        self.context.globals.add(global_name)
+        return f"({global_name} := {value})"
+
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        # repr() of infinities and NaN ('inf', 'nan') isn't Python
+        if isinstance(expr.value, float) and not math.isfinite(expr.value):
+            return f"float({str(expr.value)!r})"
+        return repr(expr.value)
+
+    @visitor(Logical)
+    def visit(self, expr: Logical):
+        left = self.visit(expr.left)
+        right = self.visit(expr.right)
+
+        temporary = self.temporary()
+        condition = f"(({temporary} := {left}) is not None and {temporary} is not False)"
+
+        if expr.operator.type == TokenType.OR:
+            return f"({temporary} if {condition} else {right})"
+        return f"({right} if {condition} else {temporary})"
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        return f"({self.visit(expr.expression)})"
+
+    @visitor(Unary)
+    def visit(self, expr: Unary):
+        right = self.visit(expr.right)
+        temporary = self.temporary()
+
+        match expr.operator.type:
+            case TokenType.MINUS:
+                token = self.token(expr.operator)
+                return f"(-{temporary} if ({temporary} := {right}).__class__ is float " \
+                    f"else _check_number_operand({token}, {temporary}))"
+            case TokenType.BANG:
+                return f"(({temporary} := {right}) is None or {temporary} is False)"
+
+        # Unreachable
+        return "None"
+
+    @visitor(Variable)
+    def visit(self, expr: Variable):
+        self.at(expr.name)
+        return self.read(expr)
+
+    @visitor(Binary)
+    def visit(self, expr: Binary):
+        # Left operands of left operands... nest one in the other, deeper than
+        # CPython's parser goes for long chains like 'a + b + c + ...'. Past
+        # CHAIN of them, each step goes to a temporary instead, all in a row
+        chain = [expr]
+        while isinstance(chain[-1].left, Binary):
+            chain.append(chain[-1].left)
+
+        if len(chain) <= CHAIN:
+            return self.binary(expr, self.visit(expr.left), self.visit(expr.right))
+
+        steps = []
+        value = self.visit(chain[-1].left)
+        for link in reversed(chain):
+            temporary = self.temporary()
+            steps.append(f"{temporary} := {self.binary(link, value, self.visit(link.right))}")
+            value = temporary
+        return f"({', '.join(steps)})[-1]"
+
+    def binary(self, expr: Binary, left: str, right: str) -> str:
+        self.at(expr.operator)
+
+        match expr.operator.type:
+            # Mirrors Interpreter.visit(Binary)
+            case TokenType.BANG_EQUAL:
+                return f"({left}, {right}, False)[2]"
+            case TokenType.EQUAL_EQUAL:
+                return f"({left}, {right}, True)[2]"
+
+        a = self.temporary()
+        b = self.temporary()
+        token = self.token(expr.operator)
+
+        # Both operands are always evaluated before the type check, hence '&'
+        numbers = f"(({a} := {left}).__class__ is float) & (({b} := {right}).__class__ is float)"
+
+        match expr.operator.type:
+            case TokenType.PLUS:
+                return f"({a} + {b} if {numbers} else _add({a}, {b}, {token}))"
+            case TokenType.SLASH:
+                return f"({a} / {b} if {numbers} & ({b} != 0.0) " \
+                    f"else _check_number_operands({token}, {a}, {b}))"
+
+        operator = expr.operator.lexeme
+        return f"({a} {operator} {b} if {numbers} " \
+            f"else _check_number_operands({token}, {a}, {b}))"
+
+    @visitor(Call)
+    def visit(self, expr: Call):
+        callee = self.visit(expr.callee)
+        arguments = ", ".join(self.visit(argument) for argument in expr.arguments)
+        self.at(expr.paren)
+
+        function = self.temporary()
+        token = self.token(expr.paren)
+        return f"({function}.fn({arguments}) " \
+            f"if ({function} := {callee}).__class__ is _Function " \
+            f"and {function}.nparams == {len(expr.arguments)} " \
+            f"else _call({function}, [{arguments}], {token}))"
+
+    @visitor(Lambda)
+    def visit(self, expr: Lambda):
+        self.at(expr.token)
+        return self.function(expr, "lambda")
+
+class NamespaceValues:
+    """The 'g_' globals of a namespace, as the values of a GlobalEnvironment:
+    those declared without a value (only in '_declared') are Uninitialized."""
+
+    def __init__(self, namespace: dict[str, Any]):
+        self.namespace = namespace
+        self.declared: set[str] = namespace["_declared"]
+
+    def __contains__(self, name: str) -> bool:
+        global_name = f"g_{name}"
+        return global_name in self.namespace or global_name in self.declared
+
+    def __getitem__(self, name: str) -> Any:
+        return self.namespace.get(f"g_{name}", Uninitialized)
+
+    def __setitem__(self, name: str, value: Any):
+        global_name = f"g_{name}"
+        if value is Uninitialized:
+            self.namespace.pop(global_name, None)
+            self.declared.add(global_name)
+        else:
+            self.namespace[global_name] = value
+            self.declared.discard(global_name)
+
+class NamespaceEnvironment(GlobalEnvironment):
+    """Globals of the tree-walker, kept in the transpiled code's namespace."""
+
+    def __init__(self, namespace: dict[str, Any]):
+        self.values = NamespaceValues(namespace)
+        self.enclosing = None
+
+class TranspilingInterpreter(Interpreter):
+    """Interpreter that translates each program to Python and lets CPython run it."""
+
+    def __init__(self, dump_python: bool = False):
+        super().__init__(memoize=False)
+        self.dump_python = dump_python
+        self.namespace: dict[str, Any] = self.make_namespace()
+
+        # Runs what CPython can't compile, sharing the resolver's tables and
+        # the globals with the transpiled code (see walker())
+        self.fallback = Interpreter(memoize=False)
+        self.fallback.globals = self.fallback.environment = NamespaceEnvironment(self.namespace)
+        for table in ("locals", "addresses", "cells", "closures", "call_sites"):
+            setattr(self.fallback, table, getattr(self, table))
+
+    def walker(self) -> Interpreter:
+        self.fallback.output = self.output
+        return self.fallback
+
+    def make_namespace(self) -> dict[str, Any]:
+        namespace: dict[str, Any] = {}
+        declared: set[str] = set()
+
+        def add(a, b, token: Token):
+            if isinstance(a, str) and isinstance(b, str):
+                return a + b
+            if isinstance(a, (str, float)) and isinstance(b, (str, float)):
+                return stringify(a) + stringify(b)
+            raise PloxRuntimeError(token,
+                                   "Operands must be two numbers or two strings, or either of each.")
+
+        def call(callee, arguments: list, paren: Token):
+            if not isinstance(callee, PloxCallable):
+                raise PloxRuntimeError(paren,
+                                       "Can only call functions and classes.")
+
+            if len(arguments) != callee.arity():
+                raise PloxRuntimeError(paren,
+                                       f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+
+            # Functions declared by the tree-walker run there
+            return callee.call(self.walker(), arguments)
+
+        def store(box: list, value):
+            box[0] = value
+            return value
+
+        def unset(name: str):
+            namespace.pop(name, None)
+            declared.add(name)
+
+        def assign_undefined(value, name: Token):
+            raise PloxRuntimeError(name, f"Undefined variable {name.lexeme}.")
+
+        def break_outside_loop(token: Token):
+            raise LoopBreakException(token, "'break' statements are only allowed inside loops.")
+
+        namespace.update({
+            "_Function": TranspiledFunction,
+            "_UNINIT": Uninitialized,
+            "_print": print,
+            "_stringify": stringify,
+            "_check_number_operand": check_number_operand,
+            "_check_number_operands": check_number_operands,
+            "_add": add,
+            "_call": call,
+            "_store": store,
+            "_unset": unset,
+            "_declared": declared,
+            "_assign_undefined": assign_undefined,
+            "_break_outside_loop": break_outside_loop,
+            "_LoopBreak": LoopBreakException,
+        })
+
+        for name, value in self.globals.values.items():
+            namespace[f"g_{name}"] = value
+
+        return namespace
+
+    def load(self, source: str):
+        if self.dump_python:
+            print(source, file=sys.stderr)
+
+        exec(compile(source, FILENAME, "exec"), self.namespace)
+        return self.namespace.pop("_main")
+
+    def undefined_variable(self, error: NameError, line_table: list[int]) -> PloxRuntimeError:
+        # Find the line of generated code that failed, innermost frame last
+        line = 0
+        traceback = error.__traceback__
+        while traceback:
+            if traceback.tb_frame.f_code.co_filename == FILENAME:
+                line = line_table[traceback.tb_lineno]
+            traceback = traceback.tb_next
+
+        name = error.name.removeprefix("g_")
+        token = Token(TokenType.IDENTIFIER, name, None, line)
+
+        if error.name in self.namespace["_declared"]:
+            return PloxRuntimeError(token, f"Uninitialized variable '{name}'")
+        return PloxRuntimeError(token, f"Undefined variable '{name}'.")
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            source, line_table = Transpiler(self, self.namespace).transpile(statements)
+            main = self.load(source)
+        except TOO_COMPLEX:
+            self.walker().interpret(statements)
+            return
+        self.namespace["_print"] = self.output.print
+
+        try:
+            main()
+        except NameError as error:
+            self.runtime_error(self.undefined_variable(error, line_table))
+        except PloxRuntimeError as error:
+            self.runtime_error(error)
+        finally:
+            self.output.flush()
+
+    def evaluate(self, expr: Expr):
+        try:
+            source, line_table = Transpiler(self, self.namespace).transpile_expression(expr)
+            main = self.load(source)
+        except TOO_COMPLEX:
+            return self.walker().evaluate(expr)
+
+        try:
+            return main()
+        except NameError as error:
+            raise self.undefined_variable(error, line_table)
@@ -6,6 +6,11 @@
 #   - https://refactoring.guru/design-patterns/visitor
 #   - https://refactoring.guru/design-patterns/visitor/python/example
 #   - https://abhinnpandey.medium.com/understanding-the-visitor-pattern-in-python-a-practical-example-a911f17f0776
+#
+# Unlike the original, the (class, type) -> method lookup is not done on every
+# call: when a class using @visitor is created, its decorated methods (plus
+# those it inherits) are gathered into a type -> method table, and the method
+# itself is replaced with a function that indexes that table directly.
 
 # A couple helper functions first
 
@@ -18,24 +23,100 @@ def _declaring_class(obj):
     name = _qualname(obj)
     return name[:name.rfind('.')]
 
-# Stores the actual visitor methods
+# Visitor methods waiting for their class to be created, keyed by
+# (declaring class, method name)
 _methods = {}
 
-# Delegating visitor implementation
-def _visitor_impl(self, arg):
-    """Actual visitor method implementation."""
-    method = _methods[(_qualname(type(self)), type(arg))]
-    return method(self, arg)
+class DispatchTable(dict):
+    """Maps argument types to visitor methods for one class.
+
+    Types without a handler of their own fall back to the handler of their
+    closest base class, which is then cached.
+    """
+
+    def __init__(self, owner: type, name: str):
+        super().__init__()
+        self.owner = owner
+        self.name = name
+
+    def __missing__(self, arg_type):
+        for base in arg_type.__mro__[1:]:
+            if base in self:
+                method = self[arg_type] = dict.__getitem__(self, base)
+                return method
+
+        raise TypeError(f"{self.owner.__name__}.{self.name}() has no visitor "
+                        f"for {arg_type.__name__}")
+
+def _inherited_table(owner: type, name: str) -> dict:
+    """Merge the dispatch tables of every base class of owner, nearest last."""
+    table = {}
+    for base in reversed(owner.__mro__[1:]):
+        method = base.__dict__.get(name)
+        table.update(getattr(method, "table", {}))
+    return table
+
+class _PendingVisitor:
+    """Stands in for a visitor method until its class is created."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def __set_name__(self, owner, name):
+        table = DispatchTable(owner, name)
+        table.update(_inherited_table(owner, name))
+        table.update(_methods.pop(self.key, {}))
+
+        def dispatch(self, arg):
+            return table[arg.__class__](self, arg)
+
+        dispatch.__name__ = name
+        dispatch.__qualname__ = f"{owner.__qualname__}.{name}"
+        dispatch.table = table
+        setattr(owner, name, dispatch)
+
+    def __call__(self, *args):
+        raise TypeError(f"@visitor method {self.key[1]}() used outside a class")
 
 # The actual @visitor decorator
 def visitor(arg_type):
     """Decorator that creates a visitor method."""
 
     def decorator(fn):
-        declaring_class = _declaring_class(fn)
-        _methods[(declaring_class, arg_type)] = fn
+        key = (_declaring_class(fn), fn.__name__)
+        _methods.setdefault(key, {})[arg_type] = fn
+
+        # Replace all decorated methods with a placeholder, the last one of
+        # which builds the class's dispatch table
+        return _PendingVisitor(key)
+
+    return decorator
+
+def _subclasses(base: type):
+    for subclass in base.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+def visits(*bases, exclude=(), method="visit"):
+    """Class decorator checking that a visitor handles every subclass of bases.
+
+    Catches a forgotten @visitor when the class is defined rather than with a
+    TypeError halfway through a run. Node types in exclude are knowingly left
+    unhandled, and so are their subclasses, while those of a handled type are
+    handled like it.
+    """
+
+    def decorator(cls):
+        table = getattr(cls, method).table
+        missing = [node.__name__
+                   for base in bases
+                   for node in _subclasses(base)
+                   if not any(ancestor in exclude or ancestor in table
+                              for ancestor in node.__mro__)]
 
-        # Replace all decorated methods with _visitor_impl
-        return _visitor_impl
+        if missing:
+            raise TypeError(f"{cls.__name__}.{method}() has no visitor for "
+                            f"{', '.join(missing)}")
+        return cls
 
     return decorator
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+
+# Stack-based virtual machine for the bytecode produced by BytecodeCompiler,
+# following clox's vm.c. Lox calls push a frame onto the VM's own frame list
+# instead of recursing in Python, and 'return'/'break' are plain jumps.
+#
+# See:
+#   - https://craftinginterpreters.com/a-virtual-machine.html
+#   - https://craftinginterpreters.com/calls-and-functions.html
+
+from typing import Any
+
+from .bytecode import OpCode, FunctionProto
+from .bytecode_compiler import BytecodeCompiler
+from .exceptions import *
+from .interpreter import Interpreter, Uninitialized, stringify, check_number_operands
+from .plox_callable import PloxCallable
+from .stmt import Stmt
+from .expr import Expr
+from .token import Token, TokenType
+
+# The dispatch loop compares against plain ints, which is considerably
+# cheaper than comparing against IntEnum members
+CONSTANT = OpCode.CONSTANT.value
+NIL = OpCode.NIL.value
+TRUE = OpCode.TRUE.value
+FALSE = OpCode.FALSE.value
+UNINITIALIZED = OpCode.UNINITIALIZED.value
+POP = OpCode.POP.value
+GET_LOCAL = OpCode.GET_LOCAL.value
+SET_LOCAL = OpCode.SET_LOCAL.value
+GET_GLOBAL = OpCode.GET_GLOBAL.value
+DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+SET_GLOBAL = OpCode.SET_GLOBAL.value
+GET_UPVALUE = OpCode.GET_UPVALUE.value
+SET_UPVALUE = OpCode.SET_UPVALUE.value
+EQUAL = OpCode.EQUAL.value
+NOT_EQUAL = OpCode.NOT_EQUAL.value
+GREATER = OpCode.GREATER.value
+GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+LESS = OpCode.LESS.value
+LESS_EQUAL = OpCode.LESS_EQUAL.value
+ADD = OpCode.ADD.value
+SUBTRACT = OpCode.SUBTRACT.value
+MULTIPLY = OpCode.MULTIPLY.value
+DIVIDE = OpCode.DIVIDE.value
+NOT = OpCode.NOT.value
+NEGATE = OpCode.NEGATE.value
+PRINT = OpCode.PRINT.value
+JUMP = OpCode.JUMP.value
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+LOOP = OpCode.LOOP.value
+CALL = OpCode.CALL.value
+CLOSURE = OpCode.CLOSURE.value
+CLOSE_UPVALUE = OpCode.CLOSE_UPVALUE.value
+RETURN = OpCode.RETURN.value
+BREAK_OUTSIDE_LOOP = OpCode.BREAK_OUTSIDE_LOOP.value
+
+# Operator tokens, to report errors exactly like the tree-walker does
+OPERATOR_TOKENS = {
+    GREATER: (TokenType.GREATER, ">"),
+    GREATER_EQUAL: (TokenType.GREATER_EQUAL, ">="),
+    LESS: (TokenType.LESS, "<"),
+    LESS_EQUAL: (TokenType.LESS_EQUAL, "<="),
+    ADD: (TokenType.PLUS, "+"),
+    SUBTRACT: (TokenType.MINUS, "-"),
+    MULTIPLY: (TokenType.STAR, "*"),
+    DIVIDE: (TokenType.SLASH, "/"),
+    NEGATE: (TokenType.MINUS, "-"),
+}
+
+FRAMES_MAX = 10_000
+
+class Upvalue:
+    """A captured variable: a stack slot while open, its own value once closed."""
+    __slots__ = ("location", "value", "closed")
+
+    def __init__(self, location: int):
+        self.location = location
+        self.value = None
+        self.closed = False
+
+class VMClosure:
+    __slots__ = ("proto", "upvalues")
+
+    def __init__(self, proto: FunctionProto, upvalues: list[Upvalue]):
+        self.proto = proto
+        self.upvalues = upvalues
+
+    def __str__(self) -> str:
+        return str(self.proto)
+
+class VM:
+    def __init__(self, interpreter: Interpreter, frames_max: int = FRAMES_MAX):
+        self.interpreter = interpreter
+        self.frames_max = frames_max
+        self.stack: list[Any] = []
+        self.open_upvalues: dict[int, Upvalue] = {}
+
+    def error(self, line: int, message: str, lexeme: str = "",
+              type: TokenType = TokenType.EOF) -> PloxRuntimeError:
+        return PloxRuntimeError(Token(type, lexeme, None, line), message)
+
+    def operand_error(self, op: int, line: int, left, right=None) -> PloxRuntimeError:
+        type, lexeme = OPERATOR_TOKENS[op]
+        token = Token(type, lexeme, None, line)
+
+        if op == NEGATE:
+            return PloxRuntimeError(token, "Operand must be a number.")
+        if op == ADD:
+            return PloxRuntimeError(token,
+                                    "Operands must be two numbers or two strings, or either of each.")
+        try:
+            check_number_operands(token, left, right)
+        except PloxRuntimeError as error:
+            return error
+
+        # Unreachable: the operands were fine after all
+        return PloxRuntimeError(token, "Invalid operands.")
+
+    def close_upvalues(self, last: int):
+        stack = self.stack
+        open_upvalues = self.open_upvalues
+        for location in [l for l in open_upvalues if l >= last]:
+            upvalue = open_upvalues.pop(location)
+            upvalue.value = stack[location]
+            upvalue.closed = True
+
+    def run(self, script: FunctionProto) -> Any:
+        try:
+            return self.dispatch(script)
+        except PloxRuntimeError:
+            # Leave the VM in a usable state, e.g. for the next line in the REPL
+            self.stack.clear()
+            self.open_upvalues.clear()
+            raise
+
+    def dispatch(self, script: FunctionProto) -> Any:
+        stack = self.stack
+        open_upvalues = self.open_upvalues
+        interpreter = self.interpreter
+        globals = interpreter.globals
+        global_values = globals.values
+        output = interpreter.output
+        frames: list[tuple[VMClosure, int, int]] = []
+        frames_max = self.frames_max
+
+        closure = VMClosure(script, [])
+        stack.append(closure)
+
+        code = script.chunk.code
+        constants = script.chunk.constants
+        upvalues = closure.upvalues
+        base = 0
+        ip = 0
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            # Ordered roughly by how often they run in typical programs
+            if op == GET_LOCAL:
+                stack.append(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                stack.append(constants[code[ip]])
+                ip += 1
+            elif op == GET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                value = global_values.get(name, Uninitialized)
+                if value is Uninitialized:
+                    # Let the environment raise the appropriate error
+                    globals.get(Token(TokenType.IDENTIFIER, name, None,
+                                      closure.proto.chunk.lines[ip - 2]))
+                stack.append(value)
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip]
+                else:
+                    ip += 1
+            elif op == POP:
+                stack.pop()
+            elif op == LESS:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a < b
+            elif op == ADD:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a + b
+                elif type(a) is str and type(b) is str:
+                    stack[-1] = a + b
+                elif isinstance(a, (str, float)) and isinstance(b, (str, float)):
+                    stack[-1] = stringify(a) + stringify(b)
+                else:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+            elif op == SUBTRACT:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a - b
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == LOOP:
+                ip = code[ip]
+            elif op == JUMP:
+                ip = code[ip]
+            elif op == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name in global_values:
+                    global_values[name] = stack[-1]
+                else:
+                    line = closure.proto.chunk.lines[ip - 2]
+                    globals.assign(Token(TokenType.IDENTIFIER, name, None, line), None)
+            elif op == CALL:
+                argc = code[ip]
+                ip += 1
+                callee = stack[-1 - argc]
+
+                if callee.__class__ is VMClosure:
+                    proto = callee.proto
+                    if argc != proto.arity:
+                        raise self.error(closure.proto.chunk.lines[ip - 2],
+                                         f"Expected {proto.arity} arguments but got {argc}.")
+                    if len(frames) >= frames_max:
+                        raise self.error(closure.proto.chunk.lines[ip - 2], "Stack overflow.")
+
+                    frames.append((closure, ip, base))
+                    closure = callee
+                    code = proto.chunk.code
+                    constants = proto.chunk.constants
+                    upvalues = callee.upvalues
+                    base = len(stack) - argc - 1
+                    ip = 0
+                    continue
+
+                line = closure.proto.chunk.lines[ip - 2]
+                if not isinstance(callee, PloxCallable):
+                    raise self.error(line, "Can only call functions and classes.")
+                if argc != callee.arity():
+                    raise self.error(line,
+                                     f"Expected {callee.arity()} arguments but got {argc}.")
+
+                arguments = stack[len(stack) - argc:]
+                result = callee.call(interpreter, arguments)
+                del stack[len(stack) - argc - 1:]
+                stack.append(result)
+            elif op == RETURN:
+                result = stack.pop()
+                if open_upvalues:
+                    self.close_upvalues(base)
+                del stack[base:]
+
+                if not frames:
+                    return result
+
+                stack.append(result)
+                closure, ip, base = frames.pop()
+                code = closure.proto.chunk.code
+                constants = closure.proto.chunk.constants
+                upvalues = closure.upvalues
+            elif op == GET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                ip += 1
+                stack.append(upvalue.value if upvalue.closed else stack[upvalue.location])
+            elif op == SET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                ip += 1
+                if upvalue.closed:
+                    upvalue.value = stack[-1]
+                else:
+                    stack[upvalue.location] = stack[-1]
+            elif op == GREATER:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a > b
+            elif op == LESS_EQUAL:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a <= b
+            elif op == GREATER_EQUAL:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a >= b
+            elif op == MULTIPLY:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a * b
+            elif op == DIVIDE:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float or b == 0.0:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], a, b)
+                stack[-1] = a / b
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                value = stack[-1]
+                if type(value) is not float:
+                    raise self.operand_error(op, closure.proto.chunk.lines[ip - 1], value)
+                stack[-1] = -value
+            elif op == PRINT:
+                output.print(stringify(stack.pop()))
+            elif op == NIL:
+                stack.append(None)
+            elif op == TRUE:
+                stack.append(True)
+            elif op == FALSE:
+                stack.append(False)
+            elif op == UNINITIALIZED:
+                stack.append(Uninitialized)
+            elif op == EQUAL:
+                # Mirrors Interpreter.visit(Binary)
+                stack.pop()
+                stack[-1] = True
+            elif op == NOT_EQUAL:
+                stack.pop()
+                stack[-1] = False
+            elif op == DEFINE_GLOBAL:
+                global_values[constants[code[ip]]] = stack.pop()
+                ip += 1
+            elif op == CLOSURE:
+                proto = constants[code[ip]]
+                ip += 1
+
+                captured = []
+                for _ in range(proto.upvalue_count):
+                    is_local = code[ip]
+                    index = code[ip + 1]
+                    ip += 2
+
+                    if is_local:
+                        location = base + index
+                        upvalue = open_upvalues.get(location)
+                        if upvalue is None:
+                            upvalue = open_upvalues[location] = Upvalue(location)
+                        captured.append(upvalue)
+                    else:
+                        captured.append(upvalues[index])
+
+                stack.append(VMClosure(proto, captured))
+            elif op == CLOSE_UPVALUE:
+                self.close_upvalues(len(stack) - 1)
+                stack.pop()
+            elif op == BREAK_OUTSIDE_LOOP:
+                # Like the tree-walker, end the loop of the nearest caller
+                # whose body the call is in
+                error = self.error(closure.proto.chunk.lines[ip - 1],
+                                   "'break' statements are only allowed inside loops.",
+                                   "break", TokenType.BREAK)
+                loop = None
+                while loop is None:
+                    if not frames:
+                        raise error
+                    closure, ip, base = frames.pop()
+                    # ip is past the CALL and its operand
+                    loop = next((loop for loop in closure.proto.loops
+                                 if loop[0] <= ip - 2 < loop[1]), None)
+
+                _, _, ip, slots = loop
+                if open_upvalues:
+                    self.close_upvalues(base + slots)
+                del stack[base + slots:]
+                code = closure.proto.chunk.code
+                constants = closure.proto.chunk.constants
+                upvalues = closure.upvalues
+            else:
+                raise self.error(closure.proto.chunk.lines[ip - 1],
+                                 f"Unknown opcode {op}.")
+
+class VMInterpreter(Interpreter):
+    """Interpreter that compiles each program to bytecode and runs it on a VM."""
+
+    def __init__(self, max_depth: int = FRAMES_MAX):
+        super().__init__(memoize=False)
+        self.vm = VM(self, max_depth)
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            script = BytecodeCompiler().compile(statements)
+            self.vm.run(script)
+        except PloxRuntimeError as error:
+            self.runtime_error(error)
+        finally:
+            self.output.flush()
+
+    def evaluate(self, expr: Expr):
+        return self.vm.run(BytecodeCompiler().compile_expression(expr))
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from plox.plox import Plox
+
+class PloxTestCase(unittest.TestCase):
+    """Starts and ends every test with Plox's error flags cleared."""
+
+    def setUp(self):
+        Plox.had_error = False
+        Plox.had_runtime_error = False
+
+    tearDown = setUp
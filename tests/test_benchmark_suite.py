@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import contextlib
+
+from plox.plox import Plox
+from benchmarks.suite import CONFIGURATIONS, DEFAULT_CONFIGURATIONS, compare
+
+def results(*medians: tuple[str, str, float]) -> dict:
+    return {"results": [{"benchmark": benchmark, "configuration": configuration,
+                         "median": median}
+                        for benchmark, configuration, median in medians]}
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def compare(self, base: dict, new: dict, threshold: float = 0.05) -> tuple[int, list[str]]:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            regressions = compare(base, new, threshold)
+        return regressions, output.getvalue().splitlines()
+
+    def test_compare(self):
+        base = results(("fib", "vm", 1.0), ("fib", "python", 1.0), ("zoo", "vm", 2.0),
+                       ("gone", "vm", 1.0))
+        new = results(("fib", "vm", 1.2), ("fib", "python", 0.5), ("zoo", "vm", 2.05),
+                      ("added", "vm", 1.0))
+
+        regressions, lines = self.compare(base, new)
+
+        self.assertEqual(1, regressions)
+        # Header, the three results in both, and the summary
+        self.assertEqual(5, len(lines))
+        self.assertTrue(lines[1].startswith("fib              vm"))
+        self.assertTrue(lines[1].endswith("+20.0%  REGRESSION"))
+        self.assertTrue(lines[2].endswith("-50.0%  improvement"))
+        self.assertTrue(lines[3].endswith("+2.5%"))
+        self.assertEqual("1 regressions past 5%.", lines[4])
+
+    def test_threshold(self):
+        base = results(("fib", "vm", 1.0), ("zoo", "vm", 1.0))
+        new = results(("fib", "vm", 1.2), ("zoo", "vm", 1.02))
+
+        self.assertEqual(2, self.compare(base, new, 0.01)[0])
+        self.assertEqual(1, self.compare(base, new, 0.1)[0])
+        self.assertEqual(0, self.compare(base, new, 0.5)[0])
+
+    def test_defaults_dont_memoize(self):
+        for configuration in DEFAULT_CONFIGURATIONS:
+            with self.subTest(configuration=configuration):
+                plox = Plox(**CONFIGURATIONS[configuration])
+                plox.start()
+                self.assertIsNone(plox.interpreter.memo)
+
+if __name__ == '__main__':
+    unittest.main()
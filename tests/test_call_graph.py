@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import itertools
+import contextlib
+
+from plox.plox import Plox
+from plox.call_graph import CallGraph, CallGraphInterpreter
+
+from .plox_test_case import PloxTestCase
+
+class TestCallGraph(PloxTestCase):
+    def profile(self, source: str) -> tuple[CallGraph, str]:
+        # A clock that ticks once every time it's read
+        graph = CallGraph(clock=itertools.count().__next__)
+        plox = Plox(call_graph=graph, memoize=False)
+        plox.engine = CallGraphInterpreter
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            plox.run(source)
+        return graph, stdout.getvalue()
+
+    def test_calls(self):
+        graph, _ = self.profile("""
+        fun leaf() { return clock(); }
+        fun mid() { leaf(); leaf(); }
+        mid();
+        mid();
+        """)
+
+        self.assertEqual({
+            "<script>": {"calls": 1, "inclusive": 21, "exclusive": 3},
+            "mid": {"calls": 2, "inclusive": 18, "exclusive": 6},
+            "leaf": {"calls": 4, "inclusive": 12, "exclusive": 8},
+            "clock": {"calls": 4, "inclusive": 4, "exclusive": 4},
+        }, graph.functions())
+        self.assertEqual({
+            ("<script>", "mid"): {"calls": 2, "inclusive": 18},
+            ("mid", "leaf"): {"calls": 4, "inclusive": 12},
+            ("leaf", "clock"): {"calls": 4, "inclusive": 4},
+        }, graph.edges())
+
+        collapsed = io.StringIO()
+        graph.write(collapsed)
+        self.assertEqual("<script> 3000000\n"
+                         "<script>;mid 6000000\n"
+                         "<script>;mid;leaf 8000000\n"
+                         "<script>;mid;leaf;clock 4000000\n", collapsed.getvalue())
+
+        result = io.StringIO()
+        graph.write(result, "json")
+        result = json.loads(result.getvalue())
+        self.assertEqual(graph.functions(), result["functions"])
+        self.assertIn({"caller": "mid", "callee": "leaf", "calls": 4, "inclusive": 12},
+                      result["edges"])
+
+    def test_recursion(self):
+        graph, output = self.profile("""
+        var countdown = fun (n) { if (n > 0) countdown(n - 1); };
+        countdown(2);
+        """)
+
+        # Recursive calls only count once towards inclusive time
+        self.assertEqual({"calls": 3, "inclusive": 5, "exclusive": 5},
+                         graph.functions()["<lambda line 2>"])
+        self.assertEqual({"calls": 2, "inclusive": 3},
+                         graph.edges()["<lambda line 2>", "<lambda line 2>"])
+
+    def test_runtime_error(self):
+        graph, output = self.profile("""
+        fun fail() { return nil + 1; }
+        fun call() { fail(); }
+        call();
+        """)
+
+        self.assertTrue(Plox.had_runtime_error)
+        self.assertIn("Operands must be", output)
+        self.assertIs(graph.root, graph.current)
+        self.assertEqual(1, graph.functions()["fail"]["calls"])
+
+if __name__ == '__main__':
+    unittest.main()
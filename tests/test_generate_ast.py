@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+from pathlib import Path
+
+from plox import generate_ast
+from plox.token import Token, TokenType
+from plox.expr import *
+from plox.stmt import *
+
+class TestGenerateAst(unittest.TestCase):
+    def test_up_to_date(self):
+        with tempfile.TemporaryDirectory() as directory:
+            generate_ast.main([directory])
+            for name in ["expr.py", "stmt.py"]:
+                with self.subTest(name=name):
+                    self.assertEqual((Path("plox") / name).read_text(),
+                                     (Path(directory) / name).read_text())
+
+    def test_nodes(self):
+        name = Token(TokenType.IDENTIFIER, "x", None, 1)
+        a, b = Variable(name), Variable(name)
+
+        self.assertFalse(hasattr(a, "__dict__"))
+        # Nodes are told apart by identity
+        self.assertNotEqual(a, b)
+        self.assertEqual(2, len({a: 1, b: 2}))
+
+        var = Var(name)
+        self.assertIsNone(var.initializer)
+        self.assertEqual(f"Var(name={name!r}, initializer=None)", repr(var))
+
+        copy = var.replace(initializer=a)
+        self.assertIs(name, copy.name)
+        self.assertIs(a, copy.initializer)
+        self.assertIsNone(var.initializer)
+
+if __name__ == '__main__':
+    unittest.main()
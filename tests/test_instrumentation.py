@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import contextlib
+
+from plox.plox import Plox
+from plox.instrumentation import Counters, InstrumentedInterpreter
+from plox.expr import *
+
+from .plox_test_case import PloxTestCase
+
+SOURCE = """
+fun outer() {
+  var a = 1;
+  fun inner() {
+    {
+      { print a + clock() * 0; }
+    }
+  }
+  return inner;
+}
+var f = outer();
+for (var i = 0; i < 3; i = i + 1) f();
+fun escape() { break; }
+while (true) escape();
+"""
+
+class TestInstrumentation(PloxTestCase):
+    def count(self, source: str) -> Counters:
+        counters = Counters()
+        plox = Plox(counters=counters)
+        plox.engine = InstrumentedInterpreter
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            plox.run(source)
+        self.assertEqual("1\n1\n1\n", stdout.getvalue())
+        return counters
+
+    def test_counters(self):
+        counters = self.count(SOURCE)
+
+        self.assertEqual({
+            # 5 calls and 3 closures, the 'for' loop and its body 3 times,
+            # and the 2 blocks of inner() every time it's called
+            "environments": 5 + 3 + 1 + 3 + 2 * 3,
+            # 'a', from the innermost block
+            "max_environment_depth": 3,
+            "environment_hops": 15,
+            # The 'break' out of escape()
+            "control_flow_exceptions": 1,
+            "calls": 8,
+            "native_calls": 3,
+        }, counters.totals())
+
+        types = counters.node_types()
+        self.assertEqual(8, types["Call"])
+        # Quickened or not
+        self.assertEqual(13, types["Binary"])
+        self.assertEqual(sum(counters.nodes.values()), sum(types.values()))
+
+        [(node, count)] = counters.hottest(1)
+        self.assertEqual(4, count)
+        self.assertIsInstance(node, Expr)
+
+    def test_formats(self):
+        counters = self.count(SOURCE)
+
+        result = io.StringIO()
+        counters.write(result)
+        result = json.loads(result.getvalue())
+        self.assertEqual(3, result["native_calls"])
+        self.assertEqual(counters.node_types(), result["node_types"])
+        self.assertEqual(len(counters.nodes), len(result["nodes"]))
+        self.assertIn({"type": "Binary", "line": 12, "count": 4}, result["nodes"])
+
+        result = io.StringIO()
+        counters.write(result, "prometheus")
+        lines = result.getvalue().splitlines()
+        self.assertIn("# TYPE plox_node_executions_total counter", lines)
+        self.assertIn('plox_node_executions_total{type="Call"} 8', lines)
+        self.assertIn("plox_environment_max_depth 3", lines)
+        self.assertIn('plox_calls_total{kind="native"} 3', lines)
+
+        with self.assertRaises(ValueError):
+            counters.write(io.StringIO(), "xml")
+
+if __name__ == '__main__':
+    unittest.main()
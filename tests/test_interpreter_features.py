@@ -5,16 +5,19 @@ import io
 import contextlib
 
 from plox.plox import Plox
+from plox.plox_callable import PloxFunction
 
 from .nostderr import nostderr
 
 class TestInterpreterFeatures(unittest.TestCase):
+    engine = "tree"
+
     def __init__(self, methodName: str = "runTest") -> None:
         super().__init__(methodName)
         self.maxDiff = None
 
     def run_script(self, filepath: str) -> str:
-        plox: Plox = Plox()
+        plox: Plox = Plox(engine=self.engine)
 
         f: io.StringIO = io.StringIO()
         with contextlib.redirect_stdout(f):
@@ -102,5 +105,328 @@ global c\n"""
         expected="b is not used anywhere.\na is not used anywhere.\n"
         self.assertEqual(expected, output)
 
+    def test_closure_capture(self):
+        filepath = "tests/lox/closure-capture.lox"
+        output = self.run_script(filepath)
+
+        expected = "10\n20\n3\n1\n3\n"
+        self.assertEqual(expected, output)
+
+    def test_slots(self):
+        filepath = "tests/lox/slots.lox"
+        output = self.run_script(filepath)
+
+        expected = "ab\nab\nb\n10\n11\n"
+        self.assertEqual(expected, output)
+
+    def test_nested_functions(self):
+        filepath = "tests/lox/nested-functions.lox"
+        output = self.run_script(filepath)
+
+        expected = "2\n3\n120\ndone\nset\na1b\ninner\nparam\n<fn lambda>\nTrue\nx\nFalse\nTrue\n"
+        self.assertEqual(expected, output)
+
+    def test_return_fibonacci(self):
+        filepath = "examples/return-fibonacci.lox"
+        output = self.run_script(filepath)
+
+        self.assertTrue(output.startswith("0\n1\n1\n2\n3\n5\n"))
+        self.assertTrue(output.endswith("2584\n4181\n"))
+
+    def test_runtime_error(self):
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run('print "before";\nprint -"after";\n')
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        expected = "before\nOperand must be a number.\n[line 2]\n"
+        self.assertEqual(expected, f.getvalue())
+
+    def test_flat_closures(self):
+        filepath = "tests/lox/flat-closures.lox"
+        output = self.run_script(filepath)
+
+        expected = "2\n3\naBc\n1\ndone\n120\n"
+        self.assertEqual(expected, output)
+
+    def test_completions(self):
+        filepath = "tests/lox/completions.lox"
+        output = self.run_script(filepath)
+
+        expected = "0\n10\n11\n20\n21\n22\n5\nlambda 0\nnone\nNone\n"
+        self.assertEqual(expected, output)
+
+    def test_break_from_call(self):
+        filepath = "tests/lox/break-from-call.lox"
+        output = self.run_script(filepath)
+
+        expected = "3\n0\n1\n2\n5\n0\n"
+        self.assertEqual(expected, output)
+
+    def test_break_outside_loop(self):
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run('print "before";\nbreak;\nprint "after";\n')
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        expected = "before\n'break' statements are only allowed inside loops.\n[line 2]\n"
+        self.assertEqual(expected, f.getvalue())
+
+    def test_closure_keeps_only_captures(self):
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("""
+fun make(a, unused) {
+  var big = "big";
+  { var b = a; fun get() { return b; } return get; }
+}
+var get = make(1, 2);
+""")
+
+        self.assertEqual("unused is not used anywhere.\nbig is not used anywhere.\n"
+                         "get is not used anywhere.\n", f.getvalue())
+        function = plox.interpreter.globals.values.get("get")
+        if not isinstance(function, PloxFunction):
+            self.skipTest("engine has its own closure representation")
+
+        # Just the Cell for 'b', not the frames of make() and its block
+        self.assertIsNone(function.closure.enclosing)
+        self.assertEqual([1], [cell.value for cell in function.closure.values])
+
+class TestTailCalls(unittest.TestCase):
+    def run_source(self, source: str) -> str:
+        plox: Plox = Plox(tail_calls=True)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run(source)
+
+        return f.getvalue()
+
+    def test_million_deep_tail_recursion(self):
+        output = self.run_source("""
+fun countdown(n) {
+  if (n < 1) return "done";
+  return countdown(n - 1);
+}
+print countdown(1000000);
+""")
+
+        self.assertEqual("done\n", output)
+
+    def test_mutual_recursion_and_lambdas(self):
+        output = self.run_source("""
+fun isEven(n) { if (n < 1) return true; return isOdd(n - 1); }
+fun isOdd(n) { if (n < 1) return false; return isEven(n - 1); }
+print isEven(100001);
+
+var sum = fun (n, acc) {
+  while (true) {
+    if (n < 1) return acc;
+    return sum(n - 1, acc + n);
+  }
+};
+print sum(100000, 0);
+""")
+
+        # The resolver's usage check doesn't see forward references
+        self.assertEqual("isOdd is not used anywhere.\nFalse\n5000050000\n", output)
+
+    def test_tail_call_errors(self):
+        output = self.run_source("""
+fun now() { return clock(); }
+print now() > 0;
+fun f() {
+  return g(1);
+}
+fun g() {}
+f();
+""")
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        expected = "g is not used anywhere.\nTrue\nExpected 0 arguments but got 1.\n[line 5]\n"
+        self.assertEqual(expected, output)
+
+class TestInlineCaches(unittest.TestCase):
+    def test_hits(self):
+        plox: Plox = Plox()
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("""
+fun add(a, b) { return a + b; }
+var sum = 0;
+for (var i = 0; i < 10; i = i + 1) sum = add(sum, i);
+print sum;
+""")
+
+        self.assertEqual("45\n", f.getvalue())
+        stats = plox.interpreter.call_stats()
+        self.assertEqual(1, stats["sites"])
+        self.assertEqual(10, stats["calls"])
+        self.assertEqual(9, stats["hits"])
+
+    def test_polymorphic_site(self):
+        plox: Plox = Plox()
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("""
+fun apply(f) { return f(); }
+fun one() { return 1; }
+fun two() { return 2; }
+for (var i = 0; i < 3; i = i + 1) {
+  print apply(one) + apply(two) + apply(fun () { return 3; });
+}
+var notAFunction = 4;
+apply(notAFunction);
+""")
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        # Every lambda is a new callee, so the site in apply() ends up megamorphic
+        self.assertEqual("6\n6\n6\nCan only call functions and classes.\n[line 2]\n",
+                         f.getvalue())
+        self.assertEqual(1, plox.interpreter.call_stats()["megamorphic"])
+
+class TestClosureEngineFeatures(TestInterpreterFeatures):
+    engine = "closure"
+
+class TestVMEngineFeatures(TestInterpreterFeatures):
+    engine = "vm"
+
+    def test_stack_overflow(self):
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("fun recurse(n) {\n  return recurse(n + 1);\n}\nrecurse(0);\n")
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        self.assertEqual("Stack overflow.\n[line 2]\n", f.getvalue())
+
+    def test_signed_zero_constants(self):
+        plox: Plox = Plox(engine=self.engine, optimize=True)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("print -0;\nprint 0;\nprint -0;\n")
+
+        self.assertEqual("-0\n0\n-0\n", f.getvalue())
+
+class TestStackEngineFeatures(TestInterpreterFeatures):
+    engine = "stack"
+
+    def run_source(self, source: str, **options) -> str:
+        plox: Plox = Plox(engine=self.engine, **options)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run(source)
+
+        return f.getvalue()
+
+    def test_deep_recursion(self):
+        output = self.run_source("""
+fun sum(n) {
+  if (n < 1) return 0;
+  return n + sum(n - 1);
+}
+print sum(100000);
+""")
+
+        self.assertEqual("5000050000\n", output)
+
+    def test_deeply_nested_program(self):
+        # Parsed, resolved and run without recursing in Python
+        output = self.run_source("print " + " + ".join(["1"] * 100_000) + ";\n" +
+                                 "print " + "(" * 50_000 + "2" + ")" * 50_000 + ";\n" +
+                                 "{" * 3000 + "var a = 3; print a;" + "}" * 3000)
+
+        self.assertEqual("100000\n2\n3\n", output)
+
+    def test_stack_overflow(self):
+        output = self.run_source("fun recurse(n) {\n  return recurse(n + 1);\n}\nrecurse(0);\n",
+                                 max_depth=1000)
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        self.assertEqual("Stack overflow.\n[line 2]\n", output)
+
+class TestPythonEngineFeatures(TestInterpreterFeatures):
+    engine = "python"
+
+    def test_dump_python(self):
+        plox: Plox = Plox(engine=self.engine, dump_python=True)
+
+        out: io.StringIO = io.StringIO()
+        err: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            plox.run("var answer = 42;\nprint answer;\n")
+
+        self.assertEqual("42\n", out.getvalue())
+        self.assertIn("def _main():", err.getvalue())
+        self.assertIn("g_answer = 42.0", err.getvalue())
+
+    def test_undefined_variable_line(self):
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("fun f() {\n  return missing;\n}\nprint f();\n")
+
+        self.assertTrue(Plox.had_runtime_error)
+        Plox.had_runtime_error = False
+
+        self.assertEqual("Undefined variable 'missing'.\n[line 2]\n", f.getvalue())
+
+    def run_source(self, *sources: str) -> str:
+        plox: Plox = Plox(engine=self.engine)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            for source in sources:
+                plox.run(source)
+
+        self.assertFalse(Plox.had_error or Plox.had_runtime_error)
+        return f.getvalue()
+
+    def test_infinite_literals(self):
+        output = self.run_source(f"print {'9' * 400};\nprint -{'9' * 400};\n")
+
+        self.assertEqual("inf\n-inf\n", output)
+
+    def test_long_binary_chain(self):
+        output = self.run_source(f"print {' + '.join(['1'] * 250)};\n"
+                                 f"print {' - '.join(['1'] * 250)} < 0;\n")
+
+        self.assertEqual("250\nTrue\n", output)
+
+    def test_too_deeply_nested_for_python(self):
+        # Run by the tree-walker, but with the same globals as the rest
+        output = self.run_source(
+            "var n = 0;\nvar last;\nfun double(x) { return 2 * x; }\n" +
+            "".join(f"while (n < {i + 1}) {{\n" for i in range(22)) +
+            "n = double(n) + 1;\nfun f() { return n; }\nlast = f;\n" + "}\n" * 22 +
+            "print last();\n",
+            "print n;\nprint double(last());\n")
+
+        self.assertEqual("31\n31\n62\n", output)
+
 if __name__ == "__main__":
     unittest.main()
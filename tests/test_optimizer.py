@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import contextlib
+
+from plox.plox import Plox
+from plox.interpreter import Interpreter
+from plox.optimizer import Optimizer
+from plox.resolver import Resolver
+from plox.scanner import Scanner
+from plox.parser import Parser
+from plox.expr import *
+from plox.stmt import *
+
+def optimize(source: str) -> tuple[list[Stmt], Optimizer]:
+    interpreter = Interpreter()
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+
+    optimizer = Optimizer(interpreter)
+    return optimizer.optimize(statements), optimizer
+
+class TestOptimizer(unittest.TestCase):
+    def assertPrints(self, value, statement: Stmt):
+        self.assertIsInstance(statement, Print)
+        self.assertIsInstance(statement.expression, Literal)
+        self.assertEqual(value, statement.expression.value)
+
+    def test_constant_folding(self):
+        statements, optimizer = optimize("print (1 + 2) * -3;")
+
+        self.assertPrints(-9.0, statements[0])
+        self.assertEqual(6, optimizer.removed)
+
+    def test_mixed_plus(self):
+        statements, _ = optimize('print "n" + 1; print 2 + "s"; print "a" + "b";')
+
+        self.assertPrints("n1", statements[0])
+        self.assertPrints("2s", statements[1])
+        self.assertPrints("ab", statements[2])
+
+    def test_logical(self):
+        statements, _ = optimize('print nil or "default"; print false and "never";')
+
+        self.assertPrints("default", statements[0])
+        self.assertPrints(False, statements[1])
+
+    def test_runtime_errors_are_kept(self):
+        statements, _ = optimize('print -"a";\nprint 1 / (2 - 2);\nprint true + 1;')
+
+        self.assertIsInstance(statements[0].expression, Unary)
+        self.assertIsInstance(statements[1].expression, Binary)
+        self.assertIsInstance(statements[2].expression, Binary)
+
+    def test_dead_branches(self):
+        statements, _ = optimize("""
+if (false) print 1;
+while (nil) print 2;
+if (1 < 2) print 3; else print 4;
+""")
+
+        self.assertEqual(1, len(statements))
+        self.assertPrints(3.0, statements[0])
+
+    def test_resolved_locals(self):
+        plox: Plox = Plox(optimize=True)
+
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run("""
+{
+  var a = 1 + 1;
+  fun add(b) { return a + b * (2 - 1); }
+  a = a + (1 + 1);
+  print add(3);
+}
+""")
+
+        self.assertEqual("7\n", f.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import os
+import pty
+import contextlib
+
+from plox.plox import Plox, ENGINES
+from plox.output import Output
+
+from .plox_test_case import PloxTestCase
+
+SOURCE = """
+for (var i = 0; i < 3; i = i + 1) print i;
+print "done";
+"""
+
+class RecordingOutput(Output):
+    """Output that remembers every write()."""
+
+    def __init__(self, **options):
+        self.writes: list[str] = []
+        super().__init__(file=io.StringIO(), **options)
+
+    def write(self, text: str):
+        self.writes.append(text)
+        super().write(text)
+
+class TestOutput(PloxTestCase):
+    def test_engines(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                output = RecordingOutput()
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    Plox(engine=engine, output=output).run(SOURCE)
+
+                self.assertEqual("", stdout.getvalue())
+                # All in one go, when the program is done
+                self.assertEqual(["0\n1\n2\ndone\n"], output.writes)
+
+    def test_policies(self):
+        output = RecordingOutput(flush="line")
+        for text in ["a", "b"]:
+            output.print(text)
+        self.assertEqual(["a\n", "b\n"], output.writes)
+
+        output = RecordingOutput(flush="size", buffer_size=10)
+        for text in ["aaaa", "bbbb", "cccc", "d"]:
+            output.print(text)
+        self.assertEqual(["aaaa\nbbbb\ncccc\n"], output.writes)
+        output.flush()
+        self.assertEqual("aaaa\nbbbb\ncccc\nd\n", output.file.getvalue())
+
+        output = RecordingOutput(flush="exit", buffer_size=10)
+        for text in ["aaaa", "bbbb", "cccc", "d"]:
+            output.print(text)
+        self.assertEqual([], output.writes)
+        output.flush()
+        output.flush()
+        self.assertEqual(["aaaa\nbbbb\ncccc\nd\n"], output.writes)
+
+        with self.assertRaises(ValueError):
+            Output(flush="never")
+
+    def test_terminal(self):
+        leader, follower = pty.openpty()
+        self.addCleanup(os.close, leader)
+        self.addCleanup(os.close, follower)
+
+        self.assertEqual(0, Output(file=follower).limit)
+        self.assertEqual(0, Output(file=io.StringIO(), flush="line").limit)
+        self.assertGreater(Output(file=io.StringIO()).limit, 0)
+
+    def test_file_descriptor(self):
+        read, write = os.pipe()
+        self.addCleanup(os.close, read)
+        try:
+            output = Output(file=write)
+            output.print("héllo")
+            output.print("world")
+            output.flush()
+        finally:
+            os.close(write)
+
+        with os.fdopen(read, "rb", closefd=False) as f:
+            self.assertEqual("héllo\nworld\n".encode(), f.read())
+
+    def test_redirected_stdout(self):
+        output = Output()
+        for name in ["first", "second"]:
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                output.print(name)
+                output.flush()
+            self.assertEqual(name + "\n", stdout.getvalue())
+
+    def test_order_with_runtime_errors(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                Plox.had_runtime_error = False
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    Plox(engine=engine, output=Output(flush="exit")).run(
+                        'print 1;\nprint 2;\nprint nil + 1;\n')
+
+                self.assertTrue(Plox.had_runtime_error)
+                self.assertEqual("1\n2\nOperands must be two numbers or two strings, "
+                                 "or either of each.\n[line 3]\n", stdout.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import contextlib
+import tempfile
+from pathlib import Path
+
+from plox.plox import Plox, ENGINES
+from plox.token import TokenType
+from plox.scanner import RegexScanner
+from plox.parser import Parser, TokenBuffer
+from plox.expr import *
+from plox.stmt import *
+
+from .plox_test_case import PloxTestCase
+
+# Well past what recursing in Python would get through
+DEPTH = 100_000
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(RegexScanner(source).scan_array()).parse()
+
+def descend(node, *path: str) -> tuple[int, object]:
+    """Follow the attributes in path, round and round, for as long as they
+    lead to a node of the same type. Returns how many times it did, and
+    where it stopped."""
+    depth = 0
+    while True:
+        child = node
+        for name in path:
+            child = getattr(child, name)
+            if isinstance(child, list):
+                child = child[-1] if child else None
+        if type(child) is not type(node):
+            return depth, child
+        node = child
+        depth += 1
+
+class TestParserDepth(PloxTestCase):
+    def parse_one(self, source: str) -> Stmt:
+        [statement] = parse(source)
+        self.assertFalse(Plox.had_error)
+        return statement
+
+    def test_groupings(self):
+        statement = self.parse_one("print " + "(" * DEPTH + "1" + ")" * DEPTH + ";")
+        depth, innermost = descend(statement.expression, "expression")
+        self.assertEqual((DEPTH - 1, 1.0), (depth, innermost.value))
+
+    def test_operators(self):
+        for source, node_type, path in [
+            ("-" * DEPTH + "a", Unary, ("right",)),
+            ("a = " * DEPTH + "1", Assign, ("value",)),
+            ("f(" * DEPTH + ")" * DEPTH, Call, ("arguments",)),
+        ]:
+            with self.subTest(source=source[:10]):
+                statement = self.parse_one(source + ";")
+                self.assertIsInstance(statement.expression, node_type)
+                depth, _ = descend(statement.expression, *path)
+                self.assertEqual(DEPTH - 1, depth)
+
+    def test_mixed_expression(self):
+        statement = self.parse_one(
+            "print " + "-(a + f(" * DEPTH + "1" + "))" * DEPTH + ";")
+        depth, _ = descend(statement.expression,
+                           "right", "expression", "right", "arguments")
+        self.assertEqual(DEPTH - 1, depth)
+
+    def test_blocks(self):
+        statement = self.parse_one("{" * DEPTH + "print 1;" + "}" * DEPTH)
+        depth, innermost = descend(statement, "statements")
+        self.assertEqual((DEPTH - 1, Print), (depth, type(innermost)))
+
+    def test_else_if_chain(self):
+        source = "if (a) print 0;" + "".join(f" else if (a) print {i};" for i in range(1, DEPTH))
+        statement = self.parse_one(source + " else print 0;")
+        depth, last = descend(statement, "else_branch")
+        self.assertEqual((DEPTH - 1, Print), (depth, type(last)))
+
+    def test_nested_statements(self):
+        for source, node_type, path in [
+            ("if (a) " * DEPTH + "print 1;", If, ("then_branch",)),
+            ("for (;;) " * DEPTH + "print 1;", While, ("body",)),
+            ("fun f() {" * DEPTH + "}" * DEPTH, Function, ("body",)),
+        ]:
+            with self.subTest(source=source[:10]):
+                statement = self.parse_one(source)
+                self.assertIsInstance(statement, node_type)
+                depth, _ = descend(statement, *path)
+                self.assertEqual(DEPTH - 1, depth)
+
+    def test_lambdas(self):
+        statement = self.parse_one(
+            "var f = " + "fun () { return " * DEPTH + "1" + "; }" * DEPTH + ";")
+        depth, _ = descend(statement.initializer, "body", "value")
+        self.assertEqual(DEPTH - 1, depth)
+
+    def test_streamed(self):
+        tokens = RegexScanner("{ print -(1);" * DEPTH + "}" * DEPTH).scan_tokens()
+        [block] = Parser(TokenBuffer(iter(tokens))).parse()
+        self.assertFalse(Plox.had_error)
+        self.assertEqual(DEPTH - 1, descend(block, "statements")[0])
+
+    def test_errors(self):
+        # Each block recovers from its own error, and carries on
+        source = "{ print ; print 1;" * DEPTH + "}" * DEPTH
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            statement = self.parse_one_with_errors(source)
+
+        self.assertEqual(DEPTH, errors.getvalue().count("Expected expression."))
+        depth, innermost = descend(statement, "statements")
+        self.assertEqual((DEPTH - 1, Print), (depth, type(innermost)))
+        self.assertIsNone(statement.statements[0])
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual([None], parse("print " + "(" * DEPTH + "1;"))
+
+    def parse_one_with_errors(self, source: str) -> Stmt:
+        [statement] = parse(source)
+        self.assertTrue(Plox.had_error)
+        return statement
+
+class TestDeepPrograms(PloxTestCase):
+    def run_file(self, source: str, **options) -> tuple[int, str, str]:
+        """Exit status, output and errors of running source from a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "deep.lox"
+            path.write_text(source)
+
+            out, err = io.StringIO(), io.StringIO()
+            status = 0
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    Plox(**options).run_file(str(path))
+                except SystemExit as exit:
+                    status = exit.code
+        self.setUp()
+        return status, out.getvalue(), err.getvalue()
+
+    def test_end_to_end(self):
+        source = "var one = 1;\nprint " + " + ".join(["one"] * DEPTH) + ";\n"
+
+        # Runs where nothing recurses in Python, a Lox error everywhere else
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                if engine == "stack":
+                    expected = (0, f"{DEPTH}\n", "")
+                else:
+                    expected = (70, "Stack overflow.\n[line 2]\n", "")
+                self.assertEqual(expected, self.run_file(source, engine=engine))
+
+        with self.subTest(optimize=True):
+            self.assertEqual((65, "", "[2] Error: Too deeply nested.\n"),
+                             self.run_file(source, engine="stack", optimize=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ from plox.expr import *
 from plox.ast_matcher import AstMatcher
 
 from .nostderr import nostderr
+from .plox_test_case import PloxTestCase
 
 globals().update(TokenType.__members__)
 
@@ -22,8 +23,7 @@ Expected:\n{expected} {printer.print(expected)}
 Actual:\n{actual} {printer.print(actual)}"""
     return msg
 
-@unittest.skip("Skip until eq() issues are resolved")
-class TestParserGrammar(unittest.TestCase):
+class TestParserGrammar(PloxTestCase):
     def parse_expression(self, source: str) -> Expr | None:
         scanner = Scanner(source)
         tokens: list[Token] = scanner.scan_tokens()
@@ -148,6 +148,81 @@ class TestParserGrammar(unittest.TestCase):
         self.assertTrue(matcher.match(actual, expected),
                         mismatch(actual, expected))
 
+    def token(self, type: TokenType, lexeme: str) -> Token:
+        return Token(type, lexeme, None, 1)
+
+    def test_precedence(self):
+        source = "1 + 2 * -3 < 4 == !true"
+        actual = self.parse_expression(source)
+        expected = Binary(
+            Binary(
+                Binary(Literal(1.0),
+                       self.token(PLUS, "+"),
+                       Binary(Literal(2.0),
+                              self.token(STAR, "*"),
+                              Unary(self.token(MINUS, "-"), Literal(3.0)))),
+                self.token(LESS, "<"),
+                Literal(4.0)),
+            self.token(EQUAL_EQUAL, "=="),
+            Unary(self.token(BANG, "!"), Literal(True))
+        )
+        self.assertTrue(matcher.match(actual, expected),
+                        mismatch(actual, expected))
+
+    def test_left_associative(self):
+        source = "1 - 2 - 3 / 4 / 5"
+        actual = self.parse_expression(source)
+        expected = Binary(
+            Binary(Literal(1.0), self.token(MINUS, "-"), Literal(2.0)),
+            self.token(MINUS, "-"),
+            Binary(Binary(Literal(3.0), self.token(SLASH, "/"), Literal(4.0)),
+                   self.token(SLASH, "/"),
+                   Literal(5.0))
+        )
+        self.assertTrue(matcher.match(actual, expected),
+                        mismatch(actual, expected))
+
+    def test_logical(self):
+        source = "a or b and c or d"
+        actual = self.parse_expression(source)
+        variable = lambda name: Variable(self.token(IDENTIFIER, name))
+        expected = Logical(
+            Logical(variable("a"),
+                    self.token(OR, "or"),
+                    Logical(variable("b"), self.token(AND, "and"), variable("c"))),
+            self.token(OR, "or"),
+            variable("d")
+        )
+        self.assertTrue(matcher.match(actual, expected),
+                        mismatch(actual, expected))
+
+    def test_assignment(self):
+        source = "a = b = f(1)(c = 2, -d)"
+        actual = self.parse_expression(source)
+        name = lambda name: self.token(IDENTIFIER, name)
+        expected = Assign(name("a"), Assign(name("b"), Call(
+            Call(Variable(name("f")), self.token(RIGHT_PAREN, ")"), [Literal(1.0)]),
+            self.token(RIGHT_PAREN, ")"),
+            [Assign(name("c"), Literal(2.0)),
+             Unary(self.token(MINUS, "-"), Variable(name("d")))])))
+        self.assertTrue(matcher.match(actual, expected),
+                        mismatch(actual, expected))
+
+    def test_invalid_assignment_target(self):
+        import io
+        import contextlib
+
+        f = io.StringIO()
+        with contextlib.redirect_stderr(f):
+            actual = self.parse_expression("a + b = c")
+
+        expected = Binary(Variable(self.token(IDENTIFIER, "a")),
+                          self.token(PLUS, "+"),
+                          Variable(self.token(IDENTIFIER, "b")))
+        self.assertTrue(matcher.match(actual, expected),
+                        mismatch(actual, expected))
+        self.assertRegex(f.getvalue(), "Invalid assignment target")
+
     def test_discard_malformed_binary(self):
         # https://stackoverflow.com/a/61533524
         import io
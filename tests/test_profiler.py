@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import contextlib
+
+from plox.plox import Plox
+from plox.profiler import SamplingProfiler, SCRIPT
+
+from .plox_test_case import PloxTestCase
+
+SOURCE = """
+fun spin(n) {
+  var sum = 0;
+  for (var i = 0; i < n; i = i + 1) sum = sum + i;
+  return sum;
+}
+
+var twice = fun (n) { return spin(n) + spin(n); };
+print twice(%(n)d);
+"""
+
+class TestProfiler(PloxTestCase):
+    def test_profile(self):
+        profiler = SamplingProfiler(interval=0.001)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), profiler:
+            Plox(memoize=False).run(SOURCE % {"n": 30_000})
+
+        self.assertEqual("899970000\n", stdout.getvalue())
+        self.assertGreater(profiler.samples, 10)
+        self.assertEqual(profiler.samples, sum(profiler.stacks.values()))
+        # Nearly all the time goes into the loop
+        [(line, _)] = profiler.lines.most_common(1)
+        self.assertEqual(4, line)
+
+        functions = profiler.functions()
+        self.assertEqual((0, profiler.samples), functions[SCRIPT])
+        self.assertGreater(functions["spin"][0], profiler.samples // 2)
+        self.assertEqual(functions["spin"][1], functions["<lambda line 8>"][1])
+        self.assertIn((SCRIPT, "<lambda line 8>", "spin"), profiler.stacks)
+
+        report = io.StringIO()
+        profiler.report(report, limit=1)
+        self.assertIn("Hottest lines:", report.getvalue())
+        self.assertRegex(report.getvalue(), r"\d+\.\d%  4\n")
+
+    def test_no_samples(self):
+        report = io.StringIO()
+        SamplingProfiler().report(report)
+        self.assertEqual("Profile: no samples.\n", report.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
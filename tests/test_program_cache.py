@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import os
+import contextlib
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from plox.plox import Plox
+from plox import program_cache
+from plox.program_cache import ProgramCache
+
+from .nostderr import nostderr
+from .plox_test_case import PloxTestCase
+
+SOURCE = """
+var unused = 1;
+fun fib(n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); }
+fun counter() { var i = 0; return fun () { i = i + 1; return i; }; }
+var c = counter();
+c();
+print c();
+print fib(20);
+"""
+
+class TestProgramCache(PloxTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.script = self.directory / "script.lox"
+        self.script.write_text(SOURCE)
+
+    def run_script(self, cache: ProgramCache | None = None, **options) -> tuple[str, Plox]:
+        plox: Plox = Plox(cache=cache or ProgramCache(self.directory / "cache"), **options)
+        output: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            plox.run_file(str(self.script))
+        return output.getvalue(), plox
+
+    def entries(self) -> list[Path]:
+        return sorted((self.directory / "cache").glob("*.ploxc"))
+
+    def test_hit(self):
+        expected = "unused is not used anywhere.\n2\n6765\n"
+        output, plox = self.run_script(memoize=True)
+        self.assertEqual(expected, output)
+        self.assertEqual((0, 1), (plox.cache.hits, plox.cache.misses))
+
+        output, plox = self.run_script(memoize=True)
+        self.assertEqual(expected, output)
+        self.assertEqual((1, 0), (plox.cache.hits, plox.cache.misses))
+        # fib() is still known to be pure
+        self.assertEqual(1, plox.interpreter.memo_stats()["functions"])
+
+    def test_options_and_sources(self):
+        self.run_script()
+        self.run_script(optimize=True)
+        self.run_script(memoize=True)
+        # Engines share their entries
+        self.run_script(engine="vm")
+        self.assertEqual(3, len(self.entries()))
+
+        self.script.write_text(SOURCE + "print 1;\n")
+        output, plox = self.run_script()
+        self.assertTrue(output.endswith("1\n"))
+        self.assertEqual(1, plox.cache.misses)
+
+        with mock.patch.object(program_cache, "FORMAT", program_cache.FORMAT + 1):
+            _, plox = self.run_script()
+        self.assertEqual(1, plox.cache.misses)
+
+    def test_corrupt(self):
+        expected, _ = self.run_script()
+        [entry] = self.entries()
+        data = entry.read_bytes()
+
+        for corrupt in [b"", data[:10], data[:-1], data[:-5] + b"xxxxx", b"x" + data[1:]]:
+            with self.subTest(corrupt=corrupt[:12]):
+                entry.write_bytes(corrupt)
+                output, plox = self.run_script()
+
+                self.assertEqual(expected, output)
+                self.assertEqual((0, 1), (plox.cache.hits, plox.cache.misses))
+                # Replaced by a good entry
+                self.assertEqual(data, entry.read_bytes())
+
+    def test_untrusted_entries(self):
+        expected, _ = self.run_script()
+        [entry] = self.entries()
+        self.assertEqual(0o700, (self.directory / "cache").stat().st_mode & 0o777)
+        self.assertEqual(0o600, entry.stat().st_mode & 0o777)
+
+        # Writable by others, then owned by somebody else: never unpickled
+        entry.chmod(0o666)
+        with mock.patch("pickle.loads") as loads:
+            output, plox = self.run_script()
+        self.assertEqual(expected, output)
+        self.assertEqual((0, 1), (plox.cache.hits, plox.cache.misses))
+        loads.assert_not_called()
+
+        entry.chmod(0o600)
+        with mock.patch("os.getuid", return_value=os.getuid() + 1), \
+             mock.patch("pickle.loads") as loads:
+            _, plox = self.run_script()
+        self.assertEqual((0, 1), (plox.cache.hits, plox.cache.misses))
+        loads.assert_not_called()
+
+    def test_errors_are_not_cached(self):
+        self.script.write_text("print 1;\nprint ;\n")
+        with nostderr(), self.assertRaises(SystemExit):
+            self.run_script()
+
+        self.assertEqual([], self.entries())
+
+    def test_eviction(self):
+        cache = ProgramCache(self.directory / "cache")
+        self.run_script(cache)
+        [first] = self.entries()
+        # Room for two entries, not three
+        cache.max_size = first.stat().st_size * 2 + 100
+
+        for i in range(3):
+            self.script.write_text(SOURCE + f"print {i};\n")
+            self.run_script(cache)
+            # Make sure mtimes tell the entries apart
+            for entry in self.entries():
+                os.utime(entry, (entry.stat().st_mtime - 10,) * 2)
+
+        self.assertEqual(2, len(self.entries()))
+        self.assertFalse(first.exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import contextlib
+
+from plox.plox import Plox
+from plox.interpreter import Interpreter
+from plox.purity import PurityAnalyzer
+from plox.resolver import Resolver
+from plox.scanner import Scanner
+from plox.parser import Parser
+
+def pure_functions(source: str) -> set[str]:
+    interpreter = Interpreter(memoize=True)
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Resolver(interpreter).resolve(statements)
+
+    PurityAnalyzer(interpreter).analyze(statements)
+    return {function.name.lexeme for function in interpreter.memo.functions}
+
+class TestPurity(unittest.TestCase):
+    def test_pure(self):
+        self.assertEqual({"fib", "square", "locals"}, pure_functions("""
+var limit = 2;
+fun fib(n) { if (n < limit) return n; return fib(n - 2) + fib(n - 1); }
+fun square(x) { return x * x; }
+fun locals(n) { var sum = 0; for (var i = 0; i < n; i = i + 1) sum = sum + square(i); return sum; }
+"""))
+
+    def test_impure(self):
+        self.assertEqual(set(), pure_functions("""
+var count = 0;
+var changes = 0;
+changes = 1;
+fun prints(x) { print x; return x; }
+fun assigns(x) { count = count + x; return count; }
+fun reads(x) { return x + changes; }
+fun calls(x) { return prints(x); }
+fun native() { return clock(); }
+fun parameter(f) { return f(); }
+fun nested(x) { fun inner() { return x; } return inner; }
+"""))
+
+    def test_captures(self):
+        self.assertEqual(set(), pure_functions("""
+fun outer() {
+  var n = 1;
+  fun inner(x) { return x + n; }
+  n = 2;
+  return inner;
+}
+"""))
+
+    def test_forced(self):
+        self.assertEqual({"logged", "caller"}, pure_functions("""
+fun logged(x) { "memoize"; print x; return x; }
+fun caller(x) { return logged(x) + 1; }
+"""))
+
+class TestMemoization(unittest.TestCase):
+    def run_source(self, source: str, plox: Plox) -> str:
+        f: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            plox.run(source)
+
+        return f.getvalue()
+
+    def test_exponential_becomes_linear(self):
+        plox: Plox = Plox(memoize=True)
+        output = self.run_source("""
+fun fib(n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); }
+print fib(60);
+""", plox)
+
+        self.assertEqual("1548008755920\n", output)
+        stats = plox.interpreter.memo_stats()
+        self.assertEqual(61, stats["misses"])
+        self.assertEqual(58, stats["hits"])
+
+    def test_eviction(self):
+        plox: Plox = Plox(memoize=True, memo_size=2)
+        self.run_source("""
+fun square(x) { return x * x; }
+square(1); square(2); square(1); square(3); square(2);
+""", plox)
+
+        stats = plox.interpreter.memo_stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(2, stats["evictions"])
+        self.assertEqual(2, stats["entries"])
+
+    def test_booleans_are_not_numbers(self):
+        plox: Plox = Plox(memoize=True)
+        output = self.run_source("""
+fun same(x) { return x; }
+print same(1); print same(true); print same(0); print same(false);
+""", plox)
+
+        self.assertEqual("1\nTrue\n0\nFalse\n", output)
+
+    def test_signed_zeros(self):
+        for engine in ("tree", "stack"):
+            with self.subTest(engine=engine):
+                output = self.run_source("fun f(x) { return x; } print f(0); print f(-0);",
+                                         Plox(engine=engine, memoize=True))
+
+                self.assertEqual("0\n-0\n", output)
+
+    def test_global_declared_again(self):
+        plox: Plox = Plox(memoize=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            plox.run("var n = 1;")
+            plox.run("fun f(x) { return x + n; }")
+        self.assertEqual("2\n", self.run_source("print f(1);", plox))
+        self.assertEqual("n is not used anywhere.\n", self.run_source("var n = 10;", plox))
+
+        self.assertEqual("11\n", self.run_source("print f(1);", plox))
+        self.assertEqual(0, plox.interpreter.memo_stats()["functions"])
+
+    def test_opt_in(self):
+        plox: Plox = Plox()
+        self.run_source("fun f(x) { return x; } print f(1);", plox)
+
+        self.assertIsNone(plox.interpreter.memo_stats())
+
+    def test_stack_engine(self):
+        plox: Plox = Plox(engine="stack", memoize=True)
+        output = self.run_source("""
+var fib = fun (n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); };
+print fib(60);
+""", plox)
+
+        self.assertEqual("1548008755920\n", output)
+        self.assertEqual(58, plox.interpreter.memo_stats()["hits"])
+
+if __name__ == '__main__':
+    unittest.main()
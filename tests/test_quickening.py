@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import copy
+import pickle
+import contextlib
+
+from plox.plox import Plox
+from plox.expr import *
+from plox.stmt import *
+from plox.quickening import *
+
+from .plox_test_case import PloxTestCase
+
+def binaries(node) -> list[Binary]:
+    """Every Binary under node, in order."""
+    found = []
+    if isinstance(node, Binary):
+        found.append(node)
+    if isinstance(node, list):
+        for child in node:
+            found += binaries(child)
+    elif isinstance(node, (Expr, Stmt)):
+        for name in node.__slots__:
+            found += binaries(getattr(node, name))
+    return found
+
+class TestQuickening(PloxTestCase):
+    def run_program(self, source: str) -> tuple[str, list[Binary]]:
+        plox = Plox()
+        program = plox.compile(source)
+        self.assertIsNotNone(program)
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            plox.interpreter.interpret(program.statements)
+        return stdout.getvalue(), binaries(program.statements)
+
+    def test_quickened(self):
+        output, nodes = self.run_program("""
+        var s = "";
+        for (var i = 0; i <= 2; i = i + 1) {
+          s = s + "x";
+          print i * 3 - i / 2 >= 1;
+        }
+        print s;
+        print 1 > 2 or 1 == 1;
+        """)
+
+        self.assertEqual("False\nTrue\nTrue\nxxx\nTrue\n", output)
+        # The increment comes after the body, once 'for' is desugared
+        self.assertEqual([LessEqualNumbers, ConcatenateStrings, GreaterEqualNumbers,
+                          SubtractNumbers, MultiplyNumbers, DivideNumbers,
+                          AddNumbers, GreaterNumbers, GenericBinary],
+                         [type(node) for node in nodes])
+
+    def test_deoptimized(self):
+        output, nodes = self.run_program("""
+        fun add(a, b) { return a + b; }
+        fun divide(a, b) { return a / b; }
+        fun less(a, b) { return a < b; }
+        print add(1, 2);
+        print add("a", "b");
+        print add(3, 4);
+        print divide(1, 2);
+        print less(1, 2);
+        print divide(1, 0);
+        """)
+
+        self.assertEqual("3\nab\n7\n0.5\nTrue\nAttempting division by zero.\n[line 3]\n", output)
+        self.assertTrue(Plox.had_runtime_error)
+        self.assertEqual([GenericBinary, GenericBinary, LessNumbers],
+                         [type(node) for node in nodes])
+
+        Plox.had_runtime_error = False
+        output, _ = self.run_program("""
+        fun less(a, b) { return a < b; }
+        print less(1, 2);
+        print less("a", 2);
+        """)
+        self.assertTrue(output.startswith("True\n"))
+        self.assertTrue(output.endswith("Operands must be numbers.\n[line 2]\n"))
+
+    def test_node(self):
+        _, [node] = self.run_program("print 1 + 2;")
+        self.assertIs(AddNumbers, type(node))
+        self.assertEqual(("left", "operator", "right"), node.__slots__)
+        self.assertTrue(repr(node).startswith("AddNumbers("))
+
+        for twin in [pickle.loads(pickle.dumps(node)), copy.deepcopy(node)]:
+            self.assertIs(Binary, type(twin))
+            self.assertEqual(node.operator.lexeme, twin.operator.lexeme)
+
+if __name__ == '__main__':
+    unittest.main()
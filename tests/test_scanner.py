@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import unittest
+import glob
+import io
+import contextlib
+
+from plox.plox import Plox
+from plox.scanner import Scanner, RegexScanner
+from plox.parser import Parser
+from plox.token import Token, TokenType
+
+from .nostderr import nostderr
+
+def scan(scanner, source: str, method: str = "scan_tokens") -> tuple[list[Token], str]:
+    err: io.StringIO = io.StringIO()
+    with contextlib.redirect_stderr(err):
+        tokens = getattr(scanner(source), method)()
+
+    Plox.had_error = False
+    return tokens, err.getvalue()
+
+class TestRegexScanner(unittest.TestCase):
+    def assertSameTokens(self, source: str):
+        self.assertEqual(scan(Scanner, source), scan(RegexScanner, source))
+
+    def test_lox_files(self):
+        for path in glob.glob("examples/**/*.lox", recursive=True) + glob.glob("tests/lox/*.lox"):
+            with self.subTest(path=path), open(path) as f:
+                self.assertSameTokens(f.read())
+
+    def test_tokens(self):
+        tokens, _ = scan(RegexScanner, 'var x = 1.5;\nprint x >= 2 and "a\nb";')
+
+        self.assertEqual([
+            Token(TokenType.VAR, "var", None, 1),
+            Token(TokenType.IDENTIFIER, "x", None, 1),
+            Token(TokenType.EQUAL, "=", None, 1),
+            Token(TokenType.NUMBER, "1.5", 1.5, 1),
+            Token(TokenType.SEMICOLON, ";", None, 1),
+            Token(TokenType.PRINT, "print", None, 2),
+            Token(TokenType.IDENTIFIER, "x", None, 2),
+            Token(TokenType.GREATER_EQUAL, ">=", None, 2),
+            Token(TokenType.NUMBER, "2", 2.0, 2),
+            Token(TokenType.AND, "and", None, 2),
+            # Strings get the line they end on
+            Token(TokenType.STRING, '"a\nb"', "a\nb", 3),
+            Token(TokenType.SEMICOLON, ";", None, 3),
+            Token(TokenType.EOF, "", None, 3),
+        ], tokens)
+
+    def test_block_comments(self):
+        for source in ["/* a\n */ x", "/* a/b */ x", "/**/x", "/* a\n*", "a/*\n/\nb",
+                       "/*/ x", "/* *\n/ x", "/* unterminated\n\n"]:
+            with self.subTest(source=source):
+                self.assertSameTokens(source)
+
+    def test_errors(self):
+        for source in ['print "a\nb', '"', 'a @ b\n#', '1.a 2. .3', 'é']:
+            with self.subTest(source=source):
+                self.assertSameTokens(source)
+
+        _, errors = scan(RegexScanner, 'x;\nprint "never\nclosed')
+        self.assertEqual("[3] Error: Unterminated string.\n", errors)
+
+class TestTokenArray(unittest.TestCase):
+    def tearDown(self):
+        # Some examples don't parse
+        Plox.had_error = False
+
+    def test_lox_files(self):
+        for path in glob.glob("examples/**/*.lox", recursive=True) + glob.glob("tests/lox/*.lox"):
+            with self.subTest(path=path), open(path) as f:
+                source = f.read()
+                tokens, errors = scan(RegexScanner, source)
+                array, array_errors = scan(RegexScanner, source, "scan_array")
+
+                self.assertEqual(tokens, list(array))
+                self.assertEqual(errors, array_errors)
+                with nostderr():
+                    self.assertEqual(repr(Parser(tokens).parse()), repr(Parser(array).parse()))
+
+    def test_storage(self):
+        array = RegexScanner('var s = "a\nb" + 1.5; // x').scan_array()
+
+        self.assertEqual(8, len(array))
+        self.assertEqual(13 * len(array), array.nbytes())
+        self.assertEqual(TokenType.STRING, array.type_at(3))
+        self.assertEqual(Token(TokenType.STRING, '"a\nb"', "a\nb", 2), array[3])
+        self.assertEqual(Token(TokenType.NUMBER, "1.5", 1.5, 2), array[5])
+        self.assertEqual("TokenType.NUMBER 1.5 1.5", repr(array[5]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import unittest
+import glob
+import io
+import os
+import tempfile
+import contextlib
+
+from plox.plox import Plox
+from plox.parser import Parser, TokenBuffer
+from plox.scanner import RegexScanner, stream_tokens
+
+from .nostderr import nostderr
+from .plox_test_case import PloxTestCase
+
+LOX_FILES = glob.glob("examples/**/*.lox", recursive=True) + glob.glob("tests/lox/*.lox")
+
+class TestStreaming(PloxTestCase):
+    def run_stream(self, source: str, engine: str = "tree") -> str:
+        with tempfile.NamedTemporaryFile("w", suffix=".lox", delete=False) as f:
+            f.write(source)
+        self.addCleanup(os.remove, f.name)
+
+        output: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(output), nostderr():
+            Plox(engine=engine).run_stream(f.name)
+        return output.getvalue()
+
+    def test_tokens(self):
+        for path in LOX_FILES:
+            with self.subTest(path=path), open(path, "rb") as f:
+                source = f.read()
+                with nostderr():
+                    expected = RegexScanner(source.decode()).scan_tokens()
+                    self.assertEqual(expected, list(stream_tokens(source)))
+
+    def test_token_buffer(self):
+        source = "var a = 1; fun f(x) { return x * (a + 2); } print f(a) > 2 and -a;"
+        tokens = RegexScanner(source).scan_tokens()
+        statements = Parser(tokens).parse()
+        streamed = Parser(TokenBuffer(iter(tokens))).parse()
+
+        self.assertEqual(repr(statements), repr(streamed))
+
+    def test_same_output(self):
+        for engine in ["tree", "stack", "closure", "vm", "python"]:
+            for path in ["examples/return-fibonacci.lox", "tests/lox/closures.lox", "examples/lookup.lox"]:
+                with self.subTest(engine=engine, path=path), open(path) as f:
+                    source = f.read()
+                    batch: io.StringIO = io.StringIO()
+                    with contextlib.redirect_stdout(batch), nostderr():
+                        Plox(engine=engine).run(source)
+
+                    # Unused globals are reported last when streaming
+                    self.assertEqual(sorted(batch.getvalue().splitlines()),
+                                     sorted(self.run_stream(source, engine).splitlines()))
+
+    def test_runs_as_parsed(self):
+        output = self.run_stream("print 1;\nprint 2;\nprint ;\nprint 3;\n")
+
+        self.assertEqual("1\n2\n", output)
+        self.assertTrue(Plox.had_error)
+
+    def test_runtime_error_stops(self):
+        output = self.run_stream("print 1;\nprint -\"a\";\nprint 2;\n")
+
+        self.assertEqual("1\nOperand must be a number.\n[line 2]\n", output)
+        self.assertTrue(Plox.had_runtime_error)
+
+    def test_forgets_top_level(self):
+        plox: Plox = Plox()
+        with tempfile.NamedTemporaryFile("w", suffix=".lox", delete=False) as f:
+            f.write("fun f(x) { return x + 1; }\n" +
+                    "var sum = 0;\n" + "sum = sum + f(1);\n" * 1000 + "print sum;\n")
+        self.addCleanup(os.remove, f.name)
+
+        output: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            plox.run_stream(f.name)
+
+        self.assertEqual("2000\n", output.getvalue())
+        # Only the body of f() is left
+        self.assertLess(len(plox.interpreter.call_sites), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import unittest
+from plox.visitor import visitor, visits
+from plox.expr import *
+
+class Named:
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        return "literal"
+
+    @visitor(Grouping)
+    def visit(self, expr: Grouping):
+        return "grouping"
+
+class Overriding(Named):
+    @visitor(Literal)
+    def visit(self, expr: Literal):
+        return "overridden"
+
+class TestVisitor(unittest.TestCase):
+    def test_dispatch(self):
+        literal = Literal(1.0)
+        self.assertEqual(Named().visit(literal), "literal")
+        self.assertEqual(Named().visit(Grouping(literal)), "grouping")
+
+    def test_subclass_overrides(self):
+        literal = Literal(1.0)
+        self.assertEqual(Overriding().visit(literal), "overridden")
+        self.assertEqual(Overriding().visit(Grouping(literal)), "grouping")
+        # The base class keeps its own table
+        self.assertEqual(Named().visit(literal), "literal")
+
+    def test_missing_visitor(self):
+        with self.assertRaisesRegex(TypeError, "Named.visit\\(\\) has no visitor for Unary"):
+            Named().visit(Unary(None, Literal(1.0)))
+
+    def test_missing_visitor_at_class_creation(self):
+        with self.assertRaisesRegex(TypeError, "has no visitor for .*Binary"):
+            @visits(Expr)
+            class Incomplete(Named):
+                pass
+
+    def test_node_subclasses(self):
+        class Parenthesized(Grouping):
+            __slots__ = ()
+
+        # Handled like the node type they're a subclass of
+        @visits(Expr, exclude=tuple(node for node in Expr.__subclasses__()
+                                    if node not in (Literal, Grouping)))
+        class Complete(Named):
+            pass
+
+        self.assertEqual(Complete().visit(Parenthesized(Literal(1.0))), "grouping")
+
+if __name__ == '__main__':
+    unittest.main()